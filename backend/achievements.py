@@ -0,0 +1,130 @@
+"""
+Achievement Rule Engine for the Escape Room Application
+"""
+import operator
+from flask import current_app
+from models import db, Achievement, StudentAchievement
+from upserts import insert_ignore
+
+DEFAULT_ACHIEVEMENT_RULES = [
+    {
+        # All questions in a single task are answered correctly
+        'name': 'Perfect Score',
+        'when': [['questions_count', '>', 0], ['correct_count', '==', {'metric': 'questions_count'}]]
+    },
+    {
+        # Task completed within 10 minutes of starting
+        'name': 'Fast Solver',
+        'when': [['minutes_taken', '<=', 10]]
+    },
+    {
+        # Overall accuracy rate reaches 90% or more
+        'name': 'Accuracy Master',
+        'when': [['accuracy_rate', '>=', 90]]
+    },
+    {
+        # Every task completed, with at least four tasks
+        'name': 'Quiz Warrior',
+        'when': [['total_tasks', '>=', 4], ['tasks_completed', '>=', {'metric': 'total_tasks'}]]
+    },
+]
+
+OPERATORS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '>':  operator.gt,
+    '>=': operator.ge,
+    '<':  operator.lt,
+    '<=': operator.le,
+}
+
+
+class Metrics:
+    """Metric values for rule evaluation; callables are computed on first use"""
+
+    def __init__(self, **values):
+        self._values = values
+
+    def __getitem__(self, name):
+        value = self._values.get(name)
+        if callable(value):
+            value = self._values[name] = value()
+        return value
+
+
+def _compile_condition(condition):
+    metric, op_name, expected = condition
+    op = OPERATORS[op_name]
+    if isinstance(expected, dict):
+        other = expected['metric']
+
+        def predicate(metrics):
+            left, right = metrics[metric], metrics[other]
+            return left is not None and right is not None and op(left, right)
+    else:
+        def predicate(metrics):
+            value = metrics[metric]
+            return value is not None and op(value, expected)
+    return predicate
+
+
+def compile_rule(rule):
+    """Compile a rule to (achievement name, predicate over Metrics)"""
+    conditions = [_compile_condition(c) for c in rule['when']]
+    return rule['name'], lambda metrics: all(check(metrics) for check in conditions)
+
+
+def _compiled_rules():
+    app = current_app._get_current_object()
+    rules = app.extensions.get('achievement_rules')
+    if rules is None:
+        source = app.config.get('ACHIEVEMENT_RULES', DEFAULT_ACHIEVEMENT_RULES)
+        rules = app.extensions['achievement_rules'] = [compile_rule(rule) for rule in source]
+    return rules
+
+
+def evaluate_achievements_bulk(candidates, unlocked_at):
+    """Evaluate every rule for many students and insert all new unlocks at once.
+
+    `candidates` is a list of (student_id, student_name, Metrics). Runs in the
+    caller's transaction and returns {student_id: [{'id', 'name'}]} of new unlocks.
+    """
+    rules = _compiled_rules()
+    achievements = {
+        a.name: a for a in Achievement.query.filter(Achievement.name.in_([name for name, _ in rules])).all()
+    }
+    unlocked_ids = {student_id: set() for student_id, _, _ in candidates}
+    rows = db.session.query(StudentAchievement.student_id, StudentAchievement.achievement_id).filter(
+        StudentAchievement.student_id.in_(list(unlocked_ids))
+    )
+    for student_id, achievement_id in rows:
+        unlocked_ids[student_id].add(achievement_id)
+
+    new_rows = []
+    new_unlocks = {}
+    for student_id, student_name, metrics in candidates:
+        unlocks = new_unlocks.setdefault(student_id, [])
+        for name, predicate in rules:
+            achievement = achievements.get(name)
+            if achievement is None or achievement.id in unlocked_ids[student_id]:
+                continue
+            if predicate(metrics):
+                unlocked_ids[student_id].add(achievement.id)
+                unlocks.append({'id': achievement.id, 'name': achievement.name})
+                new_rows.append({
+                    'student_id': student_id,
+                    'student_name': student_name,
+                    'achievement_id': achievement.id,
+                    'achievement_name': achievement.name,
+                    'unlocked_at': unlocked_at
+                })
+
+    # A concurrent submission may have unlocked the same achievement; the unique
+    # (student_id, achievement_id) constraint makes that a no-op
+    insert_ignore(StudentAchievement, new_rows, ['student_id', 'achievement_id'])
+    return new_unlocks
+
+
+def evaluate_achievements(student_id, student_name, metrics, unlocked_at):
+    """Evaluate every rule for one student; returns [{'id', 'name'}] of new unlocks"""
+    return evaluate_achievements_bulk([(student_id, student_name, metrics)], unlocked_at).get(student_id, [])
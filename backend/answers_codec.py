@@ -0,0 +1,146 @@
+"""
+Storage Codec for Saved Progress Answers
+"""
+import os
+import json
+import zlib
+from flask import current_app
+from models import db, StudentTaskProcess
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+ZLIB_TAG    = b'Z'
+MSGPACK_TAG = b'M'
+CODECS      = ('json', 'zlib', 'msgpack')
+
+# Both storage columns are always written, so changing the codec clears the other one
+ANSWERS_COLUMNS = ['answers_json', 'answers_blob']
+
+
+def _compact_json(answers):
+    return json.dumps(answers, separators=(',', ':'), ensure_ascii=False)
+
+
+def configured_codec(app=None):
+    app = app or current_app
+    codec = app.config.get('ANSWERS_CODEC') or os.getenv('ANSWERS_CODEC', 'json')
+    if codec not in CODECS:
+        raise ValueError(f'Unknown ANSWERS_CODEC {codec!r}, expected one of {", ".join(CODECS)}')
+    if codec == 'msgpack' and msgpack is None:
+        print("Warning: ANSWERS_CODEC=msgpack but msgpack is not installed; using zlib")
+        return 'zlib'
+    return codec
+
+
+def encode_answers(answers, codec='json'):
+    """Return the {answers_json, answers_blob} column values storing `answers`"""
+    if codec == 'json':
+        return {'answers_json': _compact_json(answers), 'answers_blob': None}
+    if codec == 'zlib':
+        blob = ZLIB_TAG + zlib.compress(_compact_json(answers).encode('utf-8'))
+    elif codec == 'msgpack':
+        blob = MSGPACK_TAG + msgpack.packb(answers, use_bin_type=True)
+    else:
+        raise ValueError(f'Unknown answers codec {codec!r}')
+    return {'answers_json': None, 'answers_blob': blob}
+
+
+def decode_answers(answers_json, answers_blob):
+    """Decode stored answers from whichever column holds them ({} if neither)"""
+    if answers_blob:
+        tag, payload = answers_blob[:1], answers_blob[1:]
+        if tag == ZLIB_TAG:
+            return json.loads(zlib.decompress(payload).decode('utf-8'))
+        if tag == MSGPACK_TAG:
+            if msgpack is None:
+                raise RuntimeError('Stored answers are msgpack-encoded but msgpack is not installed')
+            return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+        raise ValueError(f'Unknown answers format tag {tag!r}')
+    if answers_json:
+        return json.loads(answers_json)
+    return {}
+
+
+def answers_columns(answers):
+    """Column values for writing `answers` with the configured codec"""
+    return encode_answers(answers, configured_codec())
+
+
+def load_answers(process):
+    """Answers of a StudentTaskProcess row, in any stored format"""
+    return decode_answers(process.answers_json, process.answers_blob)
+
+
+def _stored_format(answers_json, answers_blob):
+    if answers_blob:
+        return {ZLIB_TAG: 'zlib', MSGPACK_TAG: 'msgpack'}.get(answers_blob[:1])
+    return 'json' if answers_json is not None else None
+
+
+def migrate_answers_storage(codec=None, chunk_size=500):
+    """Re-encode stored progress answers in `codec`, one transaction per chunk; returns rows converted"""
+    codec = codec or configured_codec()
+    converted = 0
+    last_id = 0
+    while True:
+        rows = db.session.query(
+            StudentTaskProcess.id, StudentTaskProcess.answers_json, StudentTaskProcess.answers_blob
+        ).filter(StudentTaskProcess.id > last_id).order_by(StudentTaskProcess.id).limit(chunk_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        updates = []
+        for row in rows:
+            stored = _stored_format(row.answers_json, row.answers_blob)
+            if stored is None or stored == codec:
+                continue
+            # Compare-and-set on the old value, so a concurrent save is never overwritten
+            updates.append((row, encode_answers(decode_answers(row.answers_json, row.answers_blob), codec)))
+        for row, values in updates:
+            converted += StudentTaskProcess.query.filter(
+                StudentTaskProcess.id == row.id,
+                _same_value(StudentTaskProcess.answers_json, row.answers_json),
+                _same_value(StudentTaskProcess.answers_blob, row.answers_blob)
+            ).update(values, synchronize_session=False)
+        db.session.commit()
+    return converted
+
+
+def _same_value(column, value):
+    return column.is_(None) if value is None else column == value
+
+
+def start_answers_migration(app):
+    """Convert stored answers to the configured codec on a background thread if ANSWERS_MIGRATE_ON_STARTUP is set"""
+    from background import get_executor, submit_in_app_context
+
+    enabled = app.config.get('ANSWERS_MIGRATE_ON_STARTUP', os.getenv('ANSWERS_MIGRATE_ON_STARTUP', ''))
+    if str(enabled).lower() not in ('1', 'true', 'yes'):
+        return None
+    executor = get_executor(app, 'answers-migration', 1)
+    if executor is None:
+        return None
+
+    def run():
+        converted = migrate_answers_storage(configured_codec(app), app.config.get('ANSWERS_MIGRATION_CHUNK_SIZE', 500))
+        print(f"Answers storage migration converted {converted} rows")
+    return submit_in_app_context(executor, app, run)
+
+
+if __name__ == '__main__':
+    import argparse
+    from app import create_app
+
+    parser = argparse.ArgumentParser(description='Re-encode stored progress answers')
+    parser.add_argument('--codec', choices=CODECS, default=None, help='target codec (default: ANSWERS_CODEC)')
+    parser.add_argument('--chunk-size', type=int, default=500)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        converted = migrate_answers_storage(args.codec, args.chunk_size)
+        print(f"Converted {converted} rows")
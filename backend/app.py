@@ -159,12 +159,16 @@ def initialize_database(app):
     """Initialize database and seed default data"""
     from models import db, Student, Teacher, Task, Achievement
     from seed_data import seed_all_data
+    from schema_upgrades import upgrade_schema
     
     with app.app_context():
         # Create all database tables
         
         db.create_all()
         
+        # Add columns introduced after existing tables were created
+        upgrade_schema()
+        
         # Seed default data from seed_data.py
         seed_all_data()
         
@@ -311,6 +315,16 @@ Put on your detective hat and let your statistical reasoning guide you through t
 
         db.session.commit()
         print('All tables recreated, default teacher accounts and escape room tasks ensured.')
+    
+    # Resume submissions and regrade jobs queued or interrupted before this process started
+    from submission_queue import start_submission_sweeper
+    from regrade import start_regrade_sweeper
+    start_submission_sweeper(app)
+    start_regrade_sweeper(app)
+
+    # Re-encode stored progress answers after an ANSWERS_CODEC change (opt-in)
+    from answers_codec import start_answers_migration
+    start_answers_migration(app)
 
 if __name__ == '__main__':
     app = create_app()
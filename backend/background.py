@@ -0,0 +1,65 @@
+"""
+Background Worker Pools for the Escape Room Application
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_lock = threading.Lock()
+
+
+def get_executor(app, name, max_workers):
+    """Return the app's thread pool called `name`, or None if max_workers is 0"""
+    if not max_workers:
+        return None
+    executors = app.extensions.setdefault('executors', {})
+    with _lock:
+        executor = executors.get(name)
+        if executor is None:
+            executor = executors[name] = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+    return executor
+
+
+def submit_in_app_context(executor, app, fn, *args, **kwargs):
+    """Run fn(*args, **kwargs) on the executor inside an app context"""
+    def run():
+        with app.app_context():
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                print(f"Background job {getattr(fn, '__name__', fn)} failed: {e}")
+                raise
+    return executor.submit(run)
+
+
+def shutdown_executors(app, wait=True):
+    """Stop accepting jobs and (optionally) wait for running ones to finish"""
+    for executor in app.extensions.get('executors', {}).values():
+        executor.shutdown(wait=wait)
+    app.extensions['executors'] = {}
+
+
+def start_periodic(app, name, interval, fn, *args):
+    """Run fn(*args) in an app context now and every `interval` seconds on a daemon thread.
+
+    At most one thread per name and app; returns its stop event, or None if one is already running.
+    """
+    periodic = app.extensions.setdefault('periodic', {})
+    with _lock:
+        if name in periodic:
+            return None
+        stop = periodic[name] = threading.Event()
+
+    def run():
+        from models import db
+        while True:
+            with app.app_context():
+                try:
+                    fn(*args)
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Warning: periodic job {name} failed: {e}")
+            if stop.wait(interval):
+                return
+
+    threading.Thread(target=run, name=name, daemon=True).start()
+    return stop
@@ -0,0 +1,214 @@
+"""
+Class-Wide Batch Grading for the Escape Room Application
+"""
+from grading import grade_submission
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+NOT_ANSWERED = 0
+INVALID_LETTER = 255
+MASK_NOT_ANSWERED = -1
+MASK_INVALID = -2
+MAX_OPTIONS = 62  # option bits that fit a non-negative int64
+
+
+_MISSING = object()
+
+# Lookup table for packing exact single_choice letters; other answers go through _letter_code
+_LETTER_CODES = {_MISSING: NOT_ANSWERED}
+for _code in range(1, 27):
+    _LETTER_CODES[chr(64 + _code)] = _LETTER_CODES[chr(96 + _code)] = _code
+
+
+def _letter_code(value):
+    """Code of a single_choice answer as the default grader would compare it"""
+    if isinstance(value, str):
+        upper = value.upper()
+        if len(upper) == 1 and 'A' <= upper <= 'Z':
+            return ord(upper) - 64
+    return INVALID_LETTER
+
+
+def _option_mask(value):
+    """Bitmask of a multiple_choice answer, or MASK_INVALID if it can never equal a packed key"""
+    if value is _MISSING:
+        return MASK_NOT_ANSWERED
+    if not isinstance(value, list):
+        return MASK_INVALID
+    mask = 0
+    for item in value:
+        # frozenset equality treats True == 1 and 2.0 == 2, so these pack like ints
+        if isinstance(item, float) and item.is_integer():
+            item = int(item)
+        if not isinstance(item, int) or not 0 <= item < MAX_OPTIONS:
+            return MASK_INVALID
+        mask |= 1 << int(item)
+    return mask
+
+
+def _split_columns(plan):
+    """Partition the plan's questions into packed single choice, packed multiple choice and scalar"""
+    single, multiple, scalar = [], [], []
+    for question in plan.questions.values():
+        key = question.key
+        if question.question_type == 'single_choice' and isinstance(key, str) \
+                and len(key) == 1 and 'A' <= key <= 'Z':
+            single.append(question)
+        elif question.question_type == 'multiple_choice' and key is not None \
+                and all(type(k) is int and 0 <= k < MAX_OPTIONS for k in key):
+            multiple.append(question)
+        else:
+            scalar.append(question)
+    return single, multiple, scalar
+
+
+class ClassGrades:
+    """Grades of many submissions of one task.
+
+    total_score, correct_count and questions_count are per-submission arrays (NumPy
+    arrays when available); submission(i) rebuilds the full GradedSubmission.
+    """
+
+    def __init__(self, plan, submissions, columns, correct, answered, fallback):
+        self.plan        = plan
+        self.submissions = submissions
+        self._columns    = columns   # question id -> column in correct/answered
+        self._correct    = correct
+        self._answered   = answered
+        self._fallback   = fallback  # row -> GradedSubmission graded without packing
+
+        if correct is not None:
+            scores = np.array([q.score for q in self._column_questions()], dtype=np.int64)
+            self.total_score     = correct.astype(np.int64) @ scores
+            self.correct_count   = correct.sum(axis=1)
+            self.questions_count = answered.sum(axis=1)
+            for row, graded in fallback.items():
+                self.total_score[row]     = graded.total_score
+                self.correct_count[row]   = graded.correct_count
+                self.questions_count[row] = graded.questions_count
+        else:
+            graded = [fallback[row] for row in range(len(submissions))]
+            self.total_score     = [g.total_score for g in graded]
+            self.correct_count   = [g.correct_count for g in graded]
+            self.questions_count = [g.questions_count for g in graded]
+
+    def _column_questions(self):
+        ordered = [None] * len(self._columns)
+        for question_id, column in self._columns.items():
+            ordered[column] = self.plan.get(question_id)
+        return ordered
+
+    def __len__(self):
+        return len(self.submissions)
+
+    def is_correct(self, row, question_id):
+        """Correctness of one answer, or None if the submission did not answer the question"""
+        if row in self._fallback:
+            for result in self._fallback[row].results:
+                if result['question_id'] == question_id:
+                    return result['is_correct']
+            return None
+        column = self._columns[question_id]
+        if not self._answered[row, column]:
+            return None
+        return bool(self._correct[row, column])
+
+    def submission(self, row):
+        """The GradedSubmission grade_submission would return for one submission"""
+        if row in self._fallback:
+            return self._fallback[row]
+        return grade_submission(_PackedPlan(self, row), self.submissions[row])
+
+
+class _PackedPlan:
+    """Plan view whose questions report the packed correctness of one row"""
+
+    def __init__(self, grades, row):
+        self._grades = grades
+        self._row    = row
+
+    def get(self, question_id):
+        question = self._grades.plan.get(question_id)
+        if question is None:
+            return None
+        return _PackedQuestion(question, self._grades.is_correct(self._row, question_id))
+
+
+class _PackedQuestion:
+    __slots__ = ('id', 'score', 'correct_answer', '_is_correct')
+
+    def __init__(self, question, is_correct):
+        self.id             = question.id
+        self.score          = question.score
+        self.correct_answer = question.correct_answer
+        self._is_correct    = is_correct
+
+    def grade(self, selected):
+        return self._is_correct
+
+
+def _pack_letters(by_id, question_ids):
+    try:
+        codes = [_LETTER_CODES.get(by_id.get(q_id, _MISSING)) for q_id in question_ids]
+    except TypeError:  # unhashable answer
+        codes = [None] * len(question_ids)
+    if None not in codes:
+        return codes
+    # Anything but an exact ASCII letter goes through str.upper() as in grade_submission ('ı' is 'I')
+    return [code if code is not None else
+            NOT_ANSWERED if by_id.get(q_id, _MISSING) is _MISSING else _letter_code(by_id[q_id])
+            for code, q_id in zip(codes, question_ids)]
+
+
+def grade_class(plan, submissions, use_numpy=True):
+    """Grade a list of {question id: answer} dicts against one grading plan"""
+    if np is None or not use_numpy:
+        return ClassGrades(plan, submissions, {}, None, None,
+                           {row: grade_submission(plan, answers) for row, answers in enumerate(submissions)})
+
+    single, multiple, scalar = _split_columns(plan)
+    ordered  = single + multiple + scalar
+    columns  = {q.id: column for column, q in enumerate(ordered)}
+    rows     = len(submissions)
+    correct  = np.zeros((rows, len(ordered)), dtype=bool)
+    answered = np.zeros((rows, len(ordered)), dtype=bool)
+
+    single_ids = [q.id for q in single]
+    multiple_ids = [q.id for q in multiple]
+    letters  = []
+    masks    = []
+    fallback = {}
+
+    for row, answers in enumerate(submissions):
+        by_id = {int(q_id): selected for q_id, selected in answers.items()}
+        if len(by_id) != len(answers):
+            # Two keys name the same question (e.g. "7" and "07"): grade as submit would
+            fallback[row] = grade_submission(plan, answers)
+            letters.append([NOT_ANSWERED] * len(single))
+            masks.append([MASK_NOT_ANSWERED] * len(multiple))
+            continue
+        letters.append(_pack_letters(by_id, single_ids))
+        masks.append([_option_mask(by_id.get(q_id, _MISSING)) for q_id in multiple_ids])
+        for offset, question in enumerate(scalar):
+            selected = by_id.get(question.id, _MISSING)
+            if selected is not _MISSING:
+                column = len(single) + len(multiple) + offset
+                answered[row, column] = True
+                correct[row, column] = question.grade(selected)
+
+    if single:
+        letters = np.array(letters, dtype=np.uint8).reshape(rows, len(single))
+        key = np.array([_letter_code(q.key) for q in single], dtype=np.uint8)
+        answered[:, :len(single)] = letters != NOT_ANSWERED
+        correct[:, :len(single)]  = letters == key
+    if multiple:
+        masks = np.array(masks, dtype=np.int64).reshape(rows, len(multiple))
+        key = np.array([sum(1 << k for k in q.key) for q in multiple], dtype=np.int64)
+        span = slice(len(single), len(single) + len(multiple))
+        answered[:, span] = masks != MASK_NOT_ANSWERED
+        correct[:, span]  = masks == key
+
+    return ClassGrades(plan, submissions, columns, correct, answered, fallback)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the progress answers storage codecs (answers_codec.py): stored size
+and encode/decode time of a realistic 100-question progress payload
+
+Usage (from the backend directory):
+    python benchmarks/bench_answers_codec.py [--questions 100] [--number 2000]
+"""
+import os
+import sys
+import json
+import random
+import argparse
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from answers_codec import CODECS, encode_answers, decode_answers, msgpack
+
+WORDS = ('energy', 'velocity', 'mole', 'reaction', 'gradient', 'integral', 'sample', 'variance',
+         'pressure', 'catalyst', 'photon', 'matrix', 'median', 'oxidation', 'momentum')
+
+
+def build_answers(question_count):
+    """Answers keyed by question id in the mix of types a task usually has"""
+    answers = {}
+    for question_id in range(1001, 1001 + question_count):
+        kind = question_id % 5
+        if kind == 0:
+            answer = random.choice('ABCD')
+        elif kind == 1:
+            answer = sorted(random.sample(range(6), random.randint(1, 3)))
+        elif kind == 2:
+            answer = random.choice([True, False])
+        elif kind == 3:
+            answer = [random.choice(WORDS) for _ in range(random.randint(1, 3))]
+        else:
+            answer = ' '.join(random.choice(WORDS) for _ in range(random.randint(8, 30)))
+        answers[str(question_id)] = answer
+    return answers
+
+
+def stored_size(columns):
+    if columns['answers_blob'] is not None:
+        return len(columns['answers_blob'])
+    return len(columns['answers_json'].encode('utf-8'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=100)
+    parser.add_argument('--number', type=int, default=2000)
+    args = parser.parse_args()
+
+    random.seed(0)
+    answers = build_answers(args.questions)
+
+    legacy = json.dumps(answers)
+    legacy_size = len(legacy.encode('utf-8'))
+    legacy_encode = timeit.timeit(lambda: json.dumps(answers), number=args.number) / args.number
+    legacy_decode = timeit.timeit(lambda: json.loads(legacy), number=args.number) / args.number
+    print(f"{'codec':<14}{'bytes':>8}{'ratio':>8}{'encode us':>12}{'decode us':>12}")
+    print(f"{'legacy json':<14}{legacy_size:>8}{1:>8.2f}{legacy_encode * 1e6:>12.1f}{legacy_decode * 1e6:>12.1f}")
+
+    for codec in CODECS:
+        if codec == 'msgpack' and msgpack is None:
+            print(f"{codec:<14}  (msgpack not installed)")
+            continue
+        columns = encode_answers(answers, codec)
+        assert decode_answers(**columns) == answers, f'{codec} must round-trip'
+        size = stored_size(columns)
+        encode = timeit.timeit(lambda: encode_answers(answers, codec), number=args.number) / args.number
+        decode = timeit.timeit(lambda: decode_answers(**columns), number=args.number) / args.number
+        print(f"{codec:<14}{size:>8}{legacy_size / size:>8.2f}{encode * 1e6:>12.1f}{decode * 1e6:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
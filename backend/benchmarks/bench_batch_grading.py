@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark of class-wide batch grading (batch_grading.py) against grading each
+submission with grade_submission
+
+Usage (from the backend directory):
+    python benchmarks/bench_batch_grading.py [--students 2000] [--questions 40]
+"""
+import os
+import sys
+import random
+import argparse
+import timeit
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from grading import GradingPlan, compile_question, grade_submission
+from batch_grading import grade_class, np
+
+
+def build_plan(question_count, options=6):
+    """Half single choice, half multiple choice questions"""
+    questions = {}
+    for i in range(1, question_count + 1):
+        if i % 2:
+            q = SimpleNamespace(id=i, question_type='single_choice', question_data=None,
+                                correct_answer=random.choice('ABCD'), score=2)
+        else:
+            q = SimpleNamespace(id=i, question_type='multiple_choice', correct_answer=None, score=3,
+                                question_data={
+                                    'options': [f'Option {n}' for n in range(options)],
+                                    'correct_answers': sorted(random.sample(range(options), 2))
+                                })
+        questions[i] = compile_question(q)
+    return GradingPlan(1, 0, questions)
+
+
+def build_submissions(plan, students, options=6):
+    submissions = []
+    for _ in range(students):
+        answers = {}
+        for q in plan.questions.values():
+            if q.question_type == 'single_choice':
+                answers[str(q.id)] = random.choice('abcdABCD')
+            else:
+                answers[str(q.id)] = random.sample(range(options), random.randint(1, 3))
+        submissions.append(answers)
+    return submissions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--questions', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    random.seed(0)
+    plan = build_plan(args.questions)
+    submissions = build_submissions(plan, args.students)
+
+    grades = grade_class(plan, submissions)
+    expected = [grade_submission(plan, answers).total_score for answers in submissions]
+    assert [int(s) for s in grades.total_score] == expected, 'batch grading must match grade_submission'
+
+    loop_time = min(timeit.repeat(lambda: [grade_submission(plan, a) for a in submissions], number=1, repeat=args.repeat))
+    print(f"grade_submission loop : {loop_time * 1000:9.1f} ms")
+    if np is None:
+        print("numpy not installed: grade_class uses the grade_submission loop")
+        return
+    batch_time = min(timeit.repeat(lambda: grade_class(plan, submissions), number=1, repeat=args.repeat))
+    print(f"grade_class (numpy)   : {batch_time * 1000:9.1f} ms  ({loop_time / batch_time:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the per-type graders in grading.py
+
+Usage (from the backend directory):
+    python benchmarks/bench_grading.py [--number 20000]
+"""
+import os
+import sys
+import argparse
+import timeit
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from grading import compile_question
+
+
+def _question(question_type, data=None, correct_answer=None):
+    return SimpleNamespace(
+        id=1,
+        question_type=question_type,
+        question_data=data,
+        correct_answer=correct_answer,
+        score=3
+    )
+
+
+def build_cases(size):
+    """Return (name, question, correct answer) cases with `size` items where it applies"""
+    matches = [{'left': i, 'right': (i + 1) % size} for i in range(size)]
+    return [
+        ('single_choice', _question('single_choice', correct_answer='B'), 'b'),
+        ('multiple_choice', _question('multiple_choice', {
+            'options': [f'Option {i}' for i in range(size)],
+            'correct_answers': list(range(0, size, 2))
+        }), list(range(size - 2, -1, -2))),
+        ('fill_blank', _question('fill_blank', {
+            'blank_answers': [f'Answer {i}' for i in range(size)]
+        }), [f' answer {i} ' for i in range(size)]),
+        ('puzzle_game', _question('puzzle_game', {
+            'puzzle_solution': '2H2 + O2 -> 2H2O'
+        }), ['2H2', '+', 'O2', '=>', '2H2O']),
+        ('matching_task', _question('matching_task', {
+            'correct_matches': matches
+        }), {str(m['left']): m['right'] for m in matches}),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=20000, help='gradings per measurement')
+    parser.add_argument('--size', type=int, default=50, help='options/blanks/pairs per question')
+    args = parser.parse_args()
+
+    print(f"{'question type':<16} {'compile (us)':>13} {'grade (us)':>11}")
+    for name, question, answer in build_cases(args.size):
+        compiled = compile_question(question)
+        assert compiled.grade(answer), f"{name}: benchmark answer should be graded correct"
+
+        compile_time = min(timeit.repeat(lambda: compile_question(question), number=args.number // 10, repeat=3))
+        grade_time = min(timeit.repeat(lambda: compiled.grade(answer), number=args.number, repeat=3))
+        print(f"{name:<16} {compile_time / (args.number // 10) * 1e6:>13.2f} {grade_time / args.number * 1e6:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the streaming question bank import (question_import.py): rows per
+second and peak Python memory for CSV files of growing size, against a
+temporary SQLite database. Peak memory should follow the chunk size, not the
+file size.
+
+Usage (from the backend directory):
+    python benchmarks/bench_question_import.py [--rows 2000 20000] [--chunk-size 500]
+"""
+import os
+import sys
+import csv
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+COLUMNS = ('question', 'question_type', 'option_a', 'option_b', 'option_c', 'option_d', 'correct_answer',
+           'options', 'correct_answers', 'blank_answers', 'puzzle_solution', 'puzzle_fragments',
+           'left_items', 'right_items', 'correct_matches', 'difficulty', 'score')
+WORDS = ('energy', 'velocity', 'mole', 'reaction', 'gradient', 'integral', 'sample', 'variance',
+         'pressure', 'catalyst', 'photon', 'matrix', 'median', 'oxidation', 'momentum')
+
+
+def _text(low, high):
+    return ' '.join(random.choice(WORDS) for _ in range(random.randint(low, high)))
+
+
+def build_row(i):
+    row = {'question': _text(8, 25) + '?', 'difficulty': random.choice(('Easy', 'Medium', 'Hard')), 'score': 3}
+    kind = i % 5
+    if kind == 0:
+        row.update(question_type='single_choice', option_a=_text(1, 4), option_b=_text(1, 4),
+                   option_c=_text(1, 4), option_d=_text(1, 4), correct_answer=random.choice('ABCD'))
+    elif kind == 1:
+        row.update(question_type='multiple_choice', options='|'.join(_text(1, 4) for _ in range(5)),
+                   correct_answers='0|3')
+    elif kind == 2:
+        row.update(question_type='fill_blank', blank_answers='|'.join(random.sample(WORDS, 3)))
+    elif kind == 3:
+        fragments = random.sample(WORDS, 5)
+        row.update(question_type='puzzle_game', puzzle_solution=' '.join(fragments),
+                   puzzle_fragments='|'.join(random.sample(fragments, 5)))
+    else:
+        row.update(question_type='matching_task', left_items='|'.join(_text(1, 3) for _ in range(4)),
+                   right_items='|'.join(_text(1, 3) for _ in range(4)), correct_matches='0-1|1-2|2-3|3-0')
+    return row
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        for i in range(rows):
+            writer.writerow(build_row(i))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[2000, 20000])
+    parser.add_argument('--chunk-size', type=int, default=500)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    from app import create_app
+    from models import db, Task
+    from question_import import import_questions, iter_csv_rows
+
+    app = create_app()
+    app.config['QUESTION_TASK_MAX'] = max(args.rows)  # one task per run holds the whole file
+    random.seed(0)
+    print(f"{'rows':>8}{'file KiB':>10}{'rows/s':>10}{'peak KiB':>10}")
+    with app.app_context():
+        db.create_all()
+        for rows in args.rows:
+            path = os.path.join(workdir, f'bank_{rows}.csv')
+            write_csv(path, rows)
+
+            def run(label):
+                task = Task(name=f'Import {rows} {label}', introduction='benchmark')
+                db.session.add(task)
+                db.session.commit()
+                with open(path, 'rb') as f:
+                    result = import_questions(task.id, iter_csv_rows(f), args.chunk_size)
+                assert result.imported == rows and result.failed == 0, result.to_dict()
+
+            start = time.perf_counter()
+            run('timed')
+            elapsed = time.perf_counter() - start
+
+            tracemalloc.start()
+            run('traced')
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            print(f"{rows:>8}{os.path.getsize(path) // 1024:>10}{rows / elapsed:>10.0f}{peak // 1024:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark of question list payload sizes: the v1 schema of
+GET /api/tasks/<id>/questions against the compact v2 schema
+(question_schema.py) for students and teachers, raw and gzip-compressed
+
+Usage (from the backend directory):
+    python benchmarks/bench_question_payloads.py [--questions 100]
+"""
+import os
+import sys
+import gzip
+import json
+import random
+import argparse
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from questions import _legacy_question
+from question_schema import compact_question
+
+TYPES = ('single_choice', 'multiple_choice', 'fill_blank', 'puzzle_game', 'matching_task')
+WORDS = ('energy', 'velocity', 'mole', 'reaction', 'gradient', 'integral', 'sample', 'variance',
+         'pressure', 'catalyst', 'photon', 'matrix', 'median', 'oxidation', 'momentum')
+
+
+def _text(low, high):
+    return ' '.join(random.choice(WORDS) for _ in range(random.randint(low, high)))
+
+
+def build_question(question_id, question_type):
+    fields = dict(id=question_id, question=_text(8, 25) + '?', question_type=question_type,
+                  question_data=None, correct_answer=None, option_a=None, option_b=None, option_c=None,
+                  option_d=None, difficulty=random.choice(('Easy', 'Medium', 'Hard')), score=3,
+                  description=_text(5, 15), image_path=None, video_path=None, video_type=None, video_url=None)
+    if question_type == 'single_choice':
+        fields.update(option_a=_text(1, 4), option_b=_text(1, 4), option_c=_text(1, 4), option_d=_text(1, 4),
+                      correct_answer=random.choice('ABCD'))
+    elif question_type == 'multiple_choice':
+        data = {'options': [_text(1, 4) for _ in range(5)], 'correct_answers': sorted(random.sample(range(5), 2))}
+    elif question_type == 'fill_blank':
+        data = {'blank_answers': [random.choice(WORDS) for _ in range(3)]}
+    elif question_type == 'puzzle_game':
+        fragments = [random.choice(WORDS) for _ in range(5)]
+        data = {'puzzle_solution': ' '.join(fragments), 'puzzle_fragments': random.sample(fragments, 5)}
+    else:
+        data = {'left_items': [_text(1, 3) for _ in range(4)], 'right_items': [_text(1, 3) for _ in range(4)],
+                'correct_matches': [{'left': i, 'right': (i + 1) % 4} for i in range(4)]}
+    if question_type != 'single_choice':
+        fields['question_data'] = data
+    if question_id % 4 == 0:
+        fields['image_path'] = f'task_1/{question_id:04d}_diagram.png'
+    return SimpleNamespace(**fields)
+
+
+def _encode(items):
+    # The way Flask's jsonify writes them outside debug mode
+    return json.dumps(items, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=100)
+    args = parser.parse_args()
+
+    random.seed(0)
+    questions = [build_question(i, TYPES[i % len(TYPES)]) for i in range(1, args.questions + 1)]
+    payloads = {
+        'v1': _encode([_legacy_question(q) for q in questions]),
+        'v2 student': _encode([compact_question(q) for q in questions]),
+        'v2 teacher': _encode([compact_question(q, include_answers=True) for q in questions]),
+    }
+
+    base, base_gzip = len(payloads['v1']), len(gzip.compress(payloads['v1']))
+    print(f"{'schema':<12}{'bytes':>9}{'vs v1':>8}{'gzip':>9}{'vs v1':>8}")
+    for name, payload in payloads.items():
+        size, compressed = len(payload), len(gzip.compress(payload))
+        print(f"{name:<12}{size:>9}{size / base:>8.0%}{compressed:>9}{compressed / base_gzip:>8.0%}")
+
+
+if __name__ == '__main__':
+    main()
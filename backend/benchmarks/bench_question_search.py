@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the question bank search (question_search.py): time to index a
+generated bank and per-query latency of ranked, paginated searches, against a
+temporary SQLite database
+
+Usage (from the backend directory):
+    python benchmarks/bench_question_search.py [--questions 100000] [--tasks 200]
+"""
+import os
+import sys
+import time
+import random
+import itertools
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+TOPIC_WORDS = ('energy', 'velocity', 'mole', 'reaction', 'gradient', 'integral', 'sample', 'variance',
+               'pressure', 'catalyst', 'photon', 'matrix', 'median', 'oxidation', 'momentum', 'isotope',
+               'enzyme', 'vector', 'quadratic', 'entropy', 'torque', 'titration', 'osmosis', 'polynomial')
+SYLLABLES = ('ka', 'lo', 'mi', 'ne', 'ra', 'tu', 'si', 'vo', 'de', 'pa', 'gu', 'te', 'zo', 'bi', 'fe')
+# Topic words among generated filler words, drawn with Zipf-like frequencies as in real text
+WORDS = TOPIC_WORDS + tuple(sorted({''.join(random.Random(i).choices(SYLLABLES, k=3)) for i in range(5000)}))
+CUM_WEIGHTS = list(itertools.accumulate(1 / rank for rank in range(1, len(WORDS) + 1)))
+QUERIES = ('energy', 'catalyst reaction', 'osmo', 'median variance sample', 'quadratic polynomial vector',
+           'entropy', 'photon momentum')
+
+
+def _text(low, high):
+    return ' '.join(random.choices(WORDS, cum_weights=CUM_WEIGHTS, k=random.randint(low, high)))
+
+
+def build_rows(count):
+    for i in range(count):
+        if i % 2:
+            yield {'question': _text(8, 25) + '?', 'question_type': 'multiple_choice',
+                   'options': [_text(1, 4) for _ in range(4)], 'correct_answers': [0],
+                   'description': _text(5, 15)}
+        else:
+            yield {'question': _text(8, 25) + '?', 'option_a': _text(1, 4), 'option_b': _text(1, 4),
+                   'option_c': _text(1, 4), 'option_d': _text(1, 4), 'correct_answer': 'A'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=100000)
+    parser.add_argument('--tasks', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    from app import create_app
+    from models import db, Task
+    from question_input import validate_question
+    from question_import import insert_question_rows
+    from question_search import index_questions, search_questions
+
+    app = create_app()
+    random.seed(0)
+    with app.app_context():
+        db.create_all()
+        tasks = [Task(name=f'Bench {i}', introduction='benchmark') for i in range(args.tasks)]
+        db.session.add_all(tasks)
+        db.session.commit()
+
+        start, indexing = time.perf_counter(), 0.0
+        chunk, per_task = [], max(args.questions // args.tasks, 1)
+        for i, values in enumerate(build_rows(args.questions)):
+            chunk.append(validate_question(values))
+            if len(chunk) == per_task or i == args.questions - 1:
+                ids = insert_question_rows(tasks[min(i // per_task, args.tasks - 1)].id, chunk)
+                t = time.perf_counter()
+                index_questions(ids)
+                indexing += time.perf_counter() - t
+                db.session.commit()
+                chunk = []
+        print(f"inserted {args.questions} questions in {time.perf_counter() - start:.1f} s "
+              f"({indexing:.1f} s of it indexing)")
+
+        print(f"{'query':<30}{'matches':>9}{'page 1 ms':>11}{'page 5 ms':>11}{'1 task ms':>11}")
+        for query in QUERIES:
+            timings = {}
+            for name, kwargs in (('page 1', {}), ('page 5', {'offset': 80}), ('1 task', {'task_id': tasks[0].id})):
+                samples = []
+                for _ in range(args.repeat):
+                    t = time.perf_counter()
+                    total, hits = search_questions(query, limit=20, **kwargs)
+                    samples.append(time.perf_counter() - t)
+                timings[name] = statistics.median(samples) * 1000
+                if name == 'page 1':
+                    matches = total
+            print(f"{query:<30}{matches:>9}{timings['page 1']:>11.1f}{timings['page 5']:>11.1f}{timings['1 task']:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+"""
+Grading Engine for the Escape Room Application
+"""
+import json
+import threading
+from collections import OrderedDict
+from flask import current_app
+from models import db, Task, Question
+
+
+class Grader:
+    """Base grader: compiles a question's answer key once and grades answers against it.
+
+    The default implementation compares a letter answer with correct_answer and is
+    used for single_choice and any question type without a registered grader.
+    """
+    question_type = None
+
+    def compile(self, question):
+        return question.correct_answer
+
+    def grade(self, key, selected):
+        return isinstance(selected, str) and selected.upper() == key
+
+
+GRADERS = {}
+DEFAULT_GRADER = Grader()
+
+
+def register_grader(cls):
+    """Class decorator registering a grader for its question_type"""
+    GRADERS[cls.question_type] = cls()
+    return cls
+
+
+def get_grader(question_type):
+    return GRADERS.get(question_type, DEFAULT_GRADER)
+
+
+@register_grader
+class SingleChoiceGrader(Grader):
+    question_type = 'single_choice'
+
+
+@register_grader
+class MultipleChoiceGrader(Grader):
+    """selected is a list of option indices; order and duplicates don't matter"""
+    question_type = 'multiple_choice'
+
+    def compile(self, question):
+        return frozenset(_load_question_data(question).get('correct_answers', []) or [])
+
+    def grade(self, key, selected):
+        if not isinstance(selected, list):
+            return False
+        try:
+            return frozenset(selected) == key
+        except TypeError:  # unhashable entries
+            return False
+
+
+@register_grader
+class FillBlankGrader(Grader):
+    """selected is a list of blank answers, compared trimmed and case-insensitively"""
+    question_type = 'fill_blank'
+
+    def compile(self, question):
+        return tuple(_normalize_blank(answer) for answer in _load_question_data(question).get('blank_answers', []))
+
+    def grade(self, key, selected):
+        if not isinstance(selected, list) or len(selected) != len(key):
+            return False
+        return all(_normalize_blank(user_answer) == correct for user_answer, correct in zip(selected, key))
+
+
+@register_grader
+class PuzzleGameGrader(Grader):
+    """selected is a list of fragments joined with spaces into the solution"""
+    question_type = 'puzzle_game'
+
+    def compile(self, question):
+        solution = _load_question_data(question).get('puzzle_solution', '') or ''
+        has_arrow = '→' in solution or '->' in solution or '=>' in solution
+        return {
+            'exact': solution.strip(),
+            'no_spaces': solution.replace(' ', ''),
+            'chemistry': _normalize_arrows(solution) if has_arrow else None,
+            'lower': solution.lower(),
+        }
+
+    def grade(self, key, selected):
+        if not isinstance(selected, list):
+            return False
+        try:
+            user_solution = ' '.join(selected).strip()
+        except TypeError:  # non-string fragments
+            return False
+        # 1. Exact match, 2. without spaces (for math/chemistry)
+        if user_solution == key['exact'] or user_solution.replace(' ', '') == key['no_spaces']:
+            return True
+        # 3. For chemistry reactions, normalize arrow formats
+        if key['chemistry'] is not None and _normalize_arrows(user_solution) == key['chemistry']:
+            return True
+        # 4. Case-insensitive comparison as fallback
+        return user_solution.lower() == key['lower']
+
+
+@register_grader
+class MatchingTaskGrader(Grader):
+    """selected maps left index (string key from the frontend) to right index"""
+    question_type = 'matching_task'
+
+    def compile(self, question):
+        correct_matches = _load_question_data(question).get('correct_matches', [])
+        if not isinstance(correct_matches, list):
+            return None
+        return {str(match.get('left')): match.get('right') for match in correct_matches}
+
+    def grade(self, key, selected):
+        # Every correct pair must be matched; extra pairs for other left items are ignored
+        if not isinstance(selected, dict):
+            return False
+        return all(selected.get(left) == right for left, right in key.items())
+
+
+class CompiledQuestion:
+    """Answer key of a single question, normalized for comparison"""
+    __slots__ = ('id', 'question_type', 'score', 'correct_answer', 'key', 'grader')
+
+    def __init__(self, id, question_type, score, correct_answer, key, grader):
+        self.id             = id
+        self.question_type  = question_type
+        self.score          = score
+        self.correct_answer = correct_answer
+        self.key            = key  # grader-specific answer key, None if it could not be parsed
+        self.grader         = grader
+
+    def grade(self, selected):
+        """Return True if `selected` is a correct answer to this question"""
+        if self.key is None:
+            return False
+        return self.grader.grade(self.key, selected)
+
+
+class GradingPlan:
+    """Compiled answer keys for every question of a task, keyed by question id"""
+
+    def __init__(self, task_id, version, questions):
+        self.task_id   = task_id
+        self.version   = version
+        self.questions = questions
+        self.max_score = sum(q.score for q in questions.values())
+
+    def get(self, question_id):
+        return self.questions.get(question_id)
+
+
+def _load_question_data(question):
+    """question_data of a question, {} when it has none"""
+    return question.question_data or {}
+
+
+def _normalize_blank(answer):
+    return str(answer or '').strip().lower()
+
+
+def _normalize_arrows(text):
+    return text.replace('->', '→').replace('=>', '→').replace('=', '→').strip()
+
+
+def compile_question(question):
+    grader = get_grader(question.question_type)
+    try:
+        key = grader.compile(question)
+    except (json.JSONDecodeError, TypeError, KeyError, AttributeError) as e:
+        print(f"Error parsing question data for question {question.id}: {e}")
+        key = None
+    return CompiledQuestion(
+        id=question.id,
+        question_type=question.question_type,
+        score=question.score,
+        correct_answer=question.correct_answer,
+        key=key,
+        grader=grader
+    )
+
+
+def compile_grading_plan(task_id, version=0):
+    """Load the task's questions in one query and compile their answer keys"""
+    questions = Question.query.filter_by(task_id=task_id).all()
+    return GradingPlan(task_id, version, {q.id: compile_question(q) for q in questions})
+
+
+class GradedSubmission:
+    """Outcome of grading a submission's answers against a plan"""
+
+    def __init__(self):
+        self.total_score     = 0
+        self.correct_count   = 0
+        self.questions_count = 0
+        self.correct_answers = {}  # question id (as sent) -> correct_answer, for the frontend
+        self.results         = []  # per-question results, for the frontend
+
+
+def grade_submission(plan, answers):
+    """Grade {question id: answer} against a plan; answers for unknown questions are skipped"""
+    graded = GradedSubmission()
+    for q_id_str, selected in answers.items():
+        question = plan.get(int(q_id_str))
+        if not question:
+            continue
+        graded.questions_count += 1
+        graded.correct_answers[q_id_str] = question.correct_answer
+
+        is_correct = question.grade(selected)
+        if is_correct:
+            graded.total_score   += question.score
+            graded.correct_count += 1
+
+        graded.results.append({
+            'question_id': question.id,
+            'is_correct': is_correct,
+            'score': question.score if is_correct else 0,
+            'user_answer': selected
+        })
+    return graded
+
+
+class GradingPlanCache:
+    """Thread-safe LRU cache of grading plans keyed by task id, each tagged with its content version"""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._plans  = OrderedDict()
+        self._lock   = threading.Lock()
+
+    def get(self, task_id, version):
+        with self._lock:
+            plan = self._plans.get(task_id)
+            if plan is None or plan.version != version:
+                return None
+            self._plans.move_to_end(task_id)
+            return plan
+
+    def put(self, plan):
+        with self._lock:
+            # A slower compile of an older version must not replace a newer plan
+            current = self._plans.get(plan.task_id)
+            if current is not None and current.version > plan.version:
+                return
+            self._plans[plan.task_id] = plan
+            self._plans.move_to_end(plan.task_id)
+            while len(self._plans) > self.maxsize:
+                self._plans.popitem(last=False)
+
+    def invalidate(self, task_id):
+        with self._lock:
+            self._plans.pop(task_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+
+
+def _get_cache(app=None):
+    app = app or current_app._get_current_object()
+    cache = app.extensions.get('grading_plans')
+    if cache is None:
+        cache = app.extensions.setdefault(
+            'grading_plans', GradingPlanCache(app.config.get('GRADING_PLAN_CACHE_SIZE', 256))
+        )
+    return cache
+
+
+def get_grading_plan(task_id):
+    """Return the compiled grading plan for a task, recompiling it when Task.content_version moved on"""
+    # The version is bumped in the same transaction as every question edit, so a plan
+    # compiled by this process is checked against edits made through any other process
+    version = db.session.query(Task.content_version).filter_by(id=task_id).scalar()
+    if version is None:
+        return compile_grading_plan(task_id)
+    cache = _get_cache()
+    plan = cache.get(task_id, version)
+    if plan is None:
+        # Questions are read after the version, so they are at least as new as it
+        plan = compile_grading_plan(task_id, version=version)
+        cache.put(plan)
+    return plan
+
+
+def invalidate_grading_plan(task_id):
+    """Drop this process's cached plan for a task after its questions change, freeing it early"""
+    _get_cache().invalidate(task_id)
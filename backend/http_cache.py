@@ -0,0 +1,70 @@
+"""
+HTTP Conditional Request Helpers for the Escape Room Application
+"""
+from datetime import timezone
+from flask import current_app, request, jsonify
+
+ANY_VERSION = '*'
+
+
+def version_etag(kind, version):
+    """Entity tag (without quotes) for a version of a record"""
+    return f'{kind}-v{version}'
+
+
+def _utc(moment):
+    """Stored datetimes come back naive from SQLite; they are always UTC"""
+    if moment is not None and moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment
+
+
+def is_not_modified(etag, last_modified=None):
+    """True if the request's validators show the client already has this version"""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        # HTTP dates have whole-second precision
+        return _utc(last_modified).replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def not_modified(etag, last_modified=None):
+    """Empty 304 response carrying the current validators"""
+    return with_etag(current_app.response_class(status=304), etag, last_modified)
+
+
+def expected_version(kind):
+    """Version required by the request's If-Match header.
+
+    Returns None without the header, ANY_VERSION for "*", and -1 for tags that
+    are not a version of `kind` (they can never match).
+    """
+    if_match = request.if_match
+    if if_match.star_tag:
+        return ANY_VERSION
+    tags = if_match.as_set()
+    if not tags:
+        return None
+    prefix = f'{kind}-v'
+    for tag in tags:
+        if tag.startswith(prefix) and tag[len(prefix):].isdigit():
+            return int(tag[len(prefix):])
+    return -1
+
+
+def precondition_failed(etag=None):
+    """412 response for a write whose If-Match no longer holds"""
+    response = jsonify({'error': 'The resource has been modified; reload it and retry'})
+    response.status_code = 412
+    if etag:
+        response.set_etag(etag)
+    return response
+
+
+def with_etag(response, etag, last_modified=None):
+    """Attach an ETag (and Last-Modified, if known) to a response and return it"""
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = _utc(last_modified)
+    return response
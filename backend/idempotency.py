@@ -0,0 +1,128 @@
+"""
+Idempotency Keys for the Escape Room Application
+"""
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request, jsonify
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+# Headers that describe the stored body and are recomputed on replay
+_SKIPPED_HEADERS = {'content-length', 'set-cookie'}
+
+
+class _Entry:
+    __slots__ = ('fingerprint', 'created', 'done', 'response')
+
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.created     = time.monotonic()
+        self.done        = threading.Event()
+        self.response    = None  # (body, status, headers) once completed
+
+
+class IdempotencyStore:
+    """Thread-safe LRU store of in-flight and completed requests keyed by idempotency scope"""
+
+    def __init__(self, maxsize=1024, ttl=3600):
+        self.maxsize  = maxsize
+        self.ttl      = ttl
+        self._entries = OrderedDict()
+        self._lock    = threading.Lock()
+
+    def begin(self, scope, fingerprint):
+        """Return (entry, True) if the caller should run the request, else the existing (entry, False)"""
+        with self._lock:
+            entry = self._entries.get(scope)
+            if entry is not None and time.monotonic() - entry.created > self.ttl:
+                del self._entries[scope]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(scope)
+                return entry, False
+
+            entry = self._entries[scope] = _Entry(fingerprint)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            return entry, True
+
+    def complete(self, entry, response):
+        """Store the response of a finished request and wake up waiting retries"""
+        entry.response = response
+        entry.done.set()
+
+    def abort(self, scope, entry):
+        """Forget a request that failed so a retry runs it again"""
+        with self._lock:
+            if self._entries.get(scope) is entry:
+                del self._entries[scope]
+        entry.done.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def get_idempotency_store(app=None):
+    """Return the app's idempotency store, creating it on first use"""
+    app = app or current_app._get_current_object()
+    store = app.extensions.get('idempotency')
+    if store is None:
+        store = app.extensions['idempotency'] = IdempotencyStore(
+            maxsize=app.config.get('IDEMPOTENCY_CACHE_SIZE', 1024),
+            ttl=app.config.get('IDEMPOTENCY_TTL', 3600)
+        )
+    return store
+
+
+def _replay(entry):
+    body, status, headers = entry.response
+    response = current_app.response_class(body, status=status, headers=headers)
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view):
+    """Route decorator honoring the Idempotency-Key header"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters'}), 400
+
+        store = get_idempotency_store()
+        scope = (request.method, request.path, key)
+        fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+        entry, owner = store.begin(scope, fingerprint)
+
+        if not owner:
+            if entry.fingerprint != fingerprint:
+                return jsonify({'error': f'{IDEMPOTENCY_HEADER} was already used with a different request'}), 422
+            entry.done.wait(current_app.config.get('IDEMPOTENCY_WAIT', 30))
+            if entry.response is None:
+                # Still running, or the first attempt failed: the client should retry later
+                return jsonify({'error': 'A request with this Idempotency-Key is still being processed'}), 409
+            return _replay(entry)
+
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        except Exception:
+            store.abort(scope, entry)
+            raise
+
+        if response.status_code >= 500 or response.is_streamed:
+            store.abort(scope, entry)
+        else:
+            headers = [(k, v) for k, v in response.headers.items() if k.lower() not in _SKIPPED_HEADERS]
+            store.complete(entry, (response.get_data(), response.status_code, headers))
+        return response
+    return wrapper
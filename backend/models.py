@@ -1,8 +1,11 @@
 """
 Database Models for the Escape Room Application
 """
+import json
 from datetime import datetime, timezone
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import validates
 
 db = SQLAlchemy()
 
@@ -32,6 +35,8 @@ class Task(db.Model):
     video_url    = db.Column(db.String(500), nullable=True)  # YouTube link
     video_type   = db.Column(db.String(20), nullable=True)   # 'local' or 'youtube'
     publish_at   = db.Column(db.DateTime, nullable=True) # Publish time
+    content_version    = db.Column(db.Integer, nullable=False, default=0)  # Bumped when the task or its questions change
+    content_updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=True)
 
 class Question(db.Model):
     __tablename__ = 'questions'
@@ -41,7 +46,9 @@ class Question(db.Model):
     
     # Question type and data
     question_type   = db.Column(db.String(50), nullable=False, default='single_choice')  # Question type
-    question_data   = db.Column(db.Text, nullable=True)  # JSON string storing question-specific data
+    # Question-specific data (options, answer keys), parsed once when the row is loaded
+    question_data   = db.Column(db.JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), 'postgresql'),
+                                nullable=True)
     
     # Legacy single choice fields (kept for backward compatibility)
     option_a        = db.Column(db.String(255), nullable=True)
@@ -64,6 +71,20 @@ class Question(db.Model):
 
     task = db.relationship('Task', backref=db.backref('questions', lazy=True))
 
+    @validates('question_data')
+    def _question_data_object(self, key, value):
+        """Keep question_data a dict or None; JSON text is decoded here, once, instead of by every reader"""
+        if isinstance(value, str):
+            try:
+                value = json.loads(value) if value.strip() else None
+            except json.JSONDecodeError:
+                print(f"Warning: Dropping question_data that is not valid JSON: {value[:80]!r}")
+                return None
+        if value is not None and not isinstance(value, dict):
+            print(f"Warning: Dropping question_data that is not a JSON object: {type(value).__name__}")
+            return None
+        return value or None
+
 class Achievement(db.Model):
     __tablename__ = 'achievements'
     id        = db.Column(db.Integer, primary_key=True)
@@ -85,6 +106,10 @@ class StudentAchievement(db.Model):
     student     = db.relationship('Student', foreign_keys=[student_id], backref='student_achievements')
     achievement = db.relationship('Achievement', backref='student_achievements')
 
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'achievement_id', name='uq_student_achievements_student_achievement'),
+    )
+
 class StudentTaskResult(db.Model):
     __tablename__ = 'student_task_results'
     id           = db.Column(db.Integer, primary_key=True)
@@ -95,10 +120,49 @@ class StudentTaskResult(db.Model):
     total_score  = db.Column(db.Integer, nullable=False)
     started_at   = db.Column(db.DateTime, nullable=True)  # Task start time
     completed_at = db.Column(db.DateTime, default=datetime.now(timezone.utc), nullable=False)
+    # Contribution of this result to the student's aggregates (NULL for results stored before student_stats)
+    question_count = db.Column(db.Integer, nullable=True)  # Graded questions in the submission
+    correct_count  = db.Column(db.Integer, nullable=True)  # Correctly answered questions
+    max_score      = db.Column(db.Integer, nullable=True)  # Task's possible score at submission time
+    answers_json   = db.Column(db.Text, nullable=True)     # Submitted answers, replayed when the task is regraded
 
     student = db.relationship('Student', foreign_keys=[student_id], backref='task_results')
     task    = db.relationship('Task', backref='task_results')
 
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'task_id', name='uq_student_task_results_student_task'),
+    )
+
+class StudentStats(db.Model):
+    __tablename__ = 'student_stats'
+    id                 = db.Column(db.Integer, primary_key=True)
+    student_id         = db.Column(db.String(20), db.ForeignKey('students.student_id'), unique=True, nullable=False)
+    questions_answered = db.Column(db.Integer, nullable=False, default=0)
+    correct_count      = db.Column(db.Integer, nullable=False, default=0)
+    total_score        = db.Column(db.Integer, nullable=False, default=0)
+    possible_score     = db.Column(db.Integer, nullable=False, default=0)
+    tasks_completed    = db.Column(db.Integer, nullable=False, default=0)
+    updated_at         = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    student = db.relationship('Student', foreign_keys=[student_id], backref=db.backref('stats', uselist=False))
+
+class StudentQuestionAnswer(db.Model):
+    __tablename__ = 'student_question_answers'
+    id          = db.Column(db.Integer, primary_key=True)
+    student_id  = db.Column(db.String(20), db.ForeignKey('students.student_id'), nullable=False)
+    task_id     = db.Column(db.Integer, db.ForeignKey('tasks.id'), nullable=False)
+    question_id = db.Column(db.Integer, db.ForeignKey('questions.id'), nullable=False, index=True)
+    is_correct  = db.Column(db.Boolean, nullable=False)
+    score       = db.Column(db.Integer, nullable=False, default=0)  # Points awarded for this answer
+    answer_json = db.Column(db.Text, nullable=True)  # JSON of the submitted answer
+    answered_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    __table_args__ = (
+        # Rows of one submission are replaced together on resubmit and regrade
+        db.Index('ix_student_question_answers_student_task', 'student_id', 'task_id'),
+        db.Index('ix_student_question_answers_task', 'task_id'),
+    )
+
 class StudentTaskProcess(db.Model):
     __tablename__ = 'student_task_processes'
     id                   = db.Column(db.Integer, primary_key=True)
@@ -108,8 +172,44 @@ class StudentTaskProcess(db.Model):
     task_name            = db.Column(db.String(80), nullable=False)  # redundant field for easy access
     current_question_index = db.Column(db.Integer, nullable=False, default=0)  # Current question index
     answers_json         = db.Column(db.Text, nullable=True)  # JSON storing selected answers
+    answers_blob         = db.Column(db.LargeBinary, nullable=True)  # Compressed answers (see answers_codec)
+    version              = db.Column(db.Integer, nullable=False, default=0)  # Incremented by every save
     saved_at             = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
     updated_at           = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
 
     student = db.relationship('Student', foreign_keys=[student_id], backref='task_processes')
-    task    = db.relationship('Task', backref='task_processes')
\ No newline at end of file
+    task    = db.relationship('Task', backref='task_processes')
+
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'task_id', name='uq_student_task_processes_student_task'),
+    )
+
+class SubmissionTicket(db.Model):
+    __tablename__ = 'submission_tickets'
+    id           = db.Column(db.String(32), primary_key=True)  # uuid4 hex, returned to the client
+    task_id      = db.Column(db.Integer, db.ForeignKey('tasks.id'), nullable=False)
+    student_id   = db.Column(db.String(20), nullable=False)
+    payload_json = db.Column(db.Text, nullable=False)  # JSON body of the original submit request
+    status       = db.Column(db.String(20), nullable=False, default='queued', index=True)  # queued, processing, done, failed
+    status_code  = db.Column(db.Integer, nullable=True)  # HTTP status the synchronous endpoint would have returned
+    result_json  = db.Column(db.Text, nullable=True)  # JSON response body once processed
+    created_at   = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    started_at   = db.Column(db.DateTime, nullable=True)
+    finished_at  = db.Column(db.DateTime, nullable=True)
+
+
+class RegradeJob(db.Model):
+    __tablename__ = 'regrade_jobs'
+    id          = db.Column(db.Integer, primary_key=True)
+    task_id     = db.Column(db.Integer, db.ForeignKey('tasks.id'), nullable=False)
+    question_id = db.Column(db.Integer, nullable=True)  # Question whose answer key changed (None = whole task)
+    status      = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    total       = db.Column(db.Integer, nullable=False, default=0)  # Results to regrade
+    processed   = db.Column(db.Integer, nullable=False, default=0)  # Results regraded so far
+    changed     = db.Column(db.Integer, nullable=False, default=0)  # Results whose score changed
+    skipped     = db.Column(db.Integer, nullable=False, default=0)  # Results without stored answers
+    error       = db.Column(db.Text, nullable=True)
+    created_at  = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    started_at  = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)  # Refreshed after every chunk while running
+    finished_at = db.Column(db.DateTime, nullable=True)
@@ -0,0 +1,90 @@
+"""
+Serialized Response Cache for the Escape Room Application
+"""
+import threading
+from collections import OrderedDict
+from flask import current_app
+
+DEFAULT_PAYLOAD_CACHE_BYTES = 32 * 1024 * 1024
+
+
+class PayloadCache:
+    """Thread-safe LRU of serialized payloads keyed by (task_id, view), bounded in bytes"""
+
+    def __init__(self, max_bytes=DEFAULT_PAYLOAD_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size      = 0
+        self.hits      = 0
+        self.misses    = 0
+        self.evictions = 0
+        self._entries  = OrderedDict()  # (task_id, view) -> (version, payload)
+        self._lock     = threading.Lock()
+
+    def get(self, task_id, view, version):
+        """Cached payload of this version, or None"""
+        key = (task_id, view)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, task_id, view, version, payload):
+        key = (task_id, view)
+        with self._lock:
+            self._pop(key)
+            if len(payload) > self.max_bytes:
+                return
+            self._entries[key] = (version, payload)
+            self.size += len(payload)
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+    def invalidate(self, task_id):
+        """Drop every view of a task"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == task_id]:
+                self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions
+            }
+
+
+def get_payload_cache(app=None):
+    app = app or current_app._get_current_object()
+    cache = app.extensions.get('payload_cache')
+    if cache is None:
+        cache = app.extensions.setdefault('payload_cache', PayloadCache(
+            int(app.config.get('PAYLOAD_CACHE_BYTES', DEFAULT_PAYLOAD_CACHE_BYTES))
+        ))
+    return cache
+
+
+def invalidate_task_payloads(task_id):
+    """Drop cached payloads of a task after its content changes"""
+    get_payload_cache().invalidate(task_id)
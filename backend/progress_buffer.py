@@ -0,0 +1,268 @@
+"""
+Write-Behind Buffer for Task Progress Autosaves
+"""
+import os
+import atexit
+import threading
+from datetime import datetime, timezone
+from flask import current_app
+from models import db, Student, Task, StudentTaskProcess
+from upserts import upsert_many
+from http_cache import ANY_VERSION
+from answers_codec import ANSWERS_COLUMNS, answers_columns, load_answers
+
+
+def apply_answer_changes(answers, changes):
+    """Merge changed answers into a progress answers dict; a None value removes the answer"""
+    for question_id, answer in changes.items():
+        if answer is None:
+            answers.pop(str(question_id), None)
+        else:
+            answers[str(question_id)] = answer
+    return answers
+
+
+def progress_write_behind_enabled(app=None):
+    app = app or current_app
+    value = app.config.get('PROGRESS_WRITE_BEHIND', os.getenv('PROGRESS_WRITE_BEHIND', ''))
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+
+class VersionConflict(Exception):
+    """A delta save was based on an outdated progress version"""
+
+    def __init__(self, version):
+        super().__init__(f'progress is at version {version}')
+        self.version = version
+
+
+class ProgressBuffer:
+    """Latest unsaved progress per (student_id, task_id), written in batches"""
+
+    def __init__(self, app, interval=2.0, max_entries=1000):
+        self.app         = app
+        self.interval    = interval
+        self.max_entries = max_entries
+        self._entries    = {}
+        self._lock       = threading.Lock()  # guards _entries and _generation
+        self._flush_lock = threading.Lock()  # one flush or discard at a time
+        self._generation = 0                 # bumped when a flush or discard starts and ends: odd while running
+        self._wakeup     = threading.Event()
+        self._stopped    = threading.Event()
+        self._thread     = None
+
+    def put(self, student_id, task_id, current_question_index, answers, expected_version=None):
+        """Buffer a full progress save; returns the new version when it is known"""
+        if expected_version is not None:
+            return self.patch(student_id, task_id, None, current_question_index, expected_version, replace=answers)
+        now = datetime.now(timezone.utc)
+        key = (str(student_id), task_id)
+        with self._lock:
+            previous = self._entries.get(key)
+            self._entries[key] = {
+                'current_question_index': current_question_index,
+                'answers': answers,
+                'saved_at': previous['saved_at'] if previous else now,
+                'updated_at': now,
+                'saves': previous['saves'] + 1 if previous else 1,  # added to the stored version on flush
+                'base_version': previous['base_version'] if previous else None  # stored version, if loaded
+            }
+            entry = self._entries[key]
+        self._saved()
+        return entry['base_version'] + entry['saves'] if entry['base_version'] is not None else None
+
+    def patch(self, student_id, task_id, changes, current_question_index=None, expected_version=None, replace=None):
+        """Merge changed answers (or `replace` all of them) into the buffered progress.
+
+        Returns the new version, or raises VersionConflict if expected_version is
+        given and is not the current version ("*": any existing progress).
+        """
+        key = (str(student_id), task_id)
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                generation = self._generation
+            process = None
+            read_stored = entry is None or entry['base_version'] is None
+            if read_stored:
+                # Read without holding a lock; a flush or discard running meanwhile may make it stale
+                process = StudentTaskProcess.query.filter_by(
+                    student_id=key[0], task_id=task_id).populate_existing().first()
+
+            with self._lock:
+                # Re-read: a full save may have replaced the entry, or a flush taken it, meanwhile
+                entry = self._entries.get(key)
+                retry = (entry is None or entry['base_version'] is None) and \
+                    (not read_stored or generation % 2 or self._generation != generation)
+                if not retry:
+                    version = self._apply(key, entry, process, changes, current_question_index,
+                                          expected_version, replace)
+            if not retry:
+                break
+            with self._flush_lock:
+                pass  # wait for the flush that wrote or is writing the stored row
+        self._saved()
+        return version + 1
+
+    def _apply(self, key, entry, process, changes, current_question_index, expected_version, replace):
+        """Merge one patch into the entry (under _lock); returns the version it was based on"""
+        if entry is None:
+            now = datetime.now(timezone.utc)
+            entry = {
+                'current_question_index': process.current_question_index if process else 0,
+                'answers': load_answers(process) if process else {},
+                'saved_at': now,
+                'saves': 0,
+                'base_version': process.version if process else 0
+            }
+        elif entry['base_version'] is None:
+            entry = dict(entry, base_version=process.version if process else 0)
+
+        version = entry['base_version'] + entry['saves']
+        if expected_version == ANY_VERSION:
+            if version == 0:
+                raise VersionConflict(version)
+        elif expected_version is not None and expected_version != version:
+            raise VersionConflict(version)
+
+        self._entries[key] = dict(
+            entry,
+            answers=replace if replace is not None else apply_answer_changes(dict(entry['answers']), changes),
+            current_question_index=entry['current_question_index'] if current_question_index is None
+                                   else current_question_index,
+            updated_at=datetime.now(timezone.utc),
+            saves=entry['saves'] + 1
+        )
+        return version
+
+    def _saved(self):
+        self._ensure_thread()
+        if len(self._entries) >= self.max_entries:
+            self._wakeup.set()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _take(self, student_id=None, task_id=None):
+        with self._lock:
+            self._generation += 1  # ended by _completed()
+            keys = [key for key in self._entries
+                    if (student_id is None or key[0] == str(student_id)) and (task_id is None or key[1] == task_id)]
+            return {key: self._entries.pop(key) for key in keys}
+
+    def flush(self, student_id=None, task_id=None):
+        """Write buffered entries (all, or those matching the filters); returns rows written"""
+        with self._flush_lock:
+            entries = self._take(student_id, task_id)
+            try:
+                return self._write(entries) if entries else 0
+            except Exception as e:
+                db.session.rollback()
+                # Put back entries that no newer autosave has replaced meanwhile
+                with self._lock:
+                    for key, entry in entries.items():
+                        self._entries.setdefault(key, entry)
+                print(f"Warning: Failed to flush buffered progress: {str(e)}")
+                raise
+            finally:
+                self._completed()
+
+    def discard(self, student_id=None, task_id=None):
+        """Drop buffered entries, waiting for an in-flight flush so they cannot be written afterwards"""
+        with self._flush_lock:
+            self._take(student_id, task_id)
+            self._completed()
+
+    def _completed(self):
+        # Stored rows read by patch() since the matching _take() may be outdated
+        with self._lock:
+            self._generation += 1
+
+    def _write(self, entries):
+        student_ids = {key[0] for key in entries}
+        task_ids    = {key[1] for key in entries}
+        student_names = dict(db.session.query(Student.student_id, Student.real_name)
+                             .filter(Student.student_id.in_(student_ids)))
+        task_names    = dict(db.session.query(Task.id, Task.name).filter(Task.id.in_(task_ids)))
+
+        rows = []
+        for (student_id, task_id), entry in entries.items():
+            if student_id not in student_names or task_id not in task_names:
+                print(f"Warning: Dropping buffered progress for unknown student {student_id} / task {task_id}")
+                continue
+            rows.append({
+                'student_id': student_id,
+                'student_name': student_names[student_id],
+                'task_id': task_id,
+                'task_name': task_names[task_id],
+                'current_question_index': entry['current_question_index'],
+                **answers_columns(entry['answers']),
+                'saved_at': entry['saved_at'],
+                'updated_at': entry['updated_at'],
+                'version': entry['saves']
+            })
+        upsert_many(StudentTaskProcess, rows, index_elements=['student_id', 'task_id'],
+                    update=['current_question_index', *ANSWERS_COLUMNS, 'updated_at'], increments=['version'])
+        db.session.commit()
+        return len(rows)
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='progress-flush', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            with self.app.app_context():
+                try:
+                    self.flush()
+                except Exception:
+                    pass  # entries were put back; retried on the next tick
+                finally:
+                    db.session.remove()
+
+    def stop(self):
+        """Stop the background thread and write everything still buffered"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self.app.app_context():
+            try:
+                self.flush()
+            except Exception:
+                pass  # already reported by flush
+
+
+def get_progress_buffer(app=None, create=True):
+    """Return the app's progress buffer, creating it on first use"""
+    app = app or current_app._get_current_object()
+    buffer = app.extensions.get('progress_buffer')
+    if buffer is None and create:
+        buffer = app.extensions['progress_buffer'] = ProgressBuffer(
+            app,
+            interval=float(app.config.get('PROGRESS_FLUSH_INTERVAL', 2)),
+            max_entries=int(app.config.get('PROGRESS_BUFFER_MAX', 1000))
+        )
+        atexit.register(buffer.stop)
+    return buffer
+
+
+def flush_progress(student_id=None, task_id=None):
+    """Write buffered progress before it is read; no-op when nothing is buffered"""
+    buffer = get_progress_buffer(create=False)
+    if buffer is not None and len(buffer):
+        buffer.flush(student_id, task_id)
+
+
+def discard_progress(student_id=None, task_id=None):
+    """Drop buffered progress that a submission or delete makes obsolete"""
+    buffer = get_progress_buffer(create=False)
+    if buffer is not None:
+        buffer.discard(student_id, task_id)
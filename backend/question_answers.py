@@ -0,0 +1,118 @@
+"""
+Per-Question Answer Records for the Escape Room Application
+"""
+import json
+from sqlalchemy import insert
+from models import db, Question, StudentQuestionAnswer
+
+_correct_sum = db.func.sum(db.case((StudentQuestionAnswer.is_correct, 1), else_=0))
+
+
+def answer_rows(student_id, task_id, graded, answered_at):
+    """Build insert rows for the per-question results of a GradedSubmission"""
+    return [
+        {
+            'student_id': student_id,
+            'task_id': task_id,
+            'question_id': r['question_id'],
+            'is_correct': bool(r['is_correct']),
+            'score': r['score'],
+            'answer_json': json.dumps(r['user_answer']),
+            'answered_at': answered_at
+        }
+        for r in graded.results
+    ]
+
+
+def replace_answers(task_id, student_ids, rows):
+    """Replace the answer rows of the given students for a task (caller's transaction)"""
+    if student_ids:
+        StudentQuestionAnswer.query.filter(
+            StudentQuestionAnswer.task_id == task_id,
+            StudentQuestionAnswer.student_id.in_(list(student_ids))
+        ).delete(synchronize_session=False)
+    if rows:
+        db.session.execute(insert(StudentQuestionAnswer), rows)
+
+
+def record_answers(student_id, task_id, graded, answered_at):
+    """Store the per-question results of one submission, replacing the previous ones"""
+    replace_answers(task_id, [student_id], answer_rows(student_id, task_id, graded, answered_at))
+
+
+def delete_answers(task_id=None, question_id=None):
+    """Delete answer rows of a task or a question (caller's transaction)"""
+    query = StudentQuestionAnswer.query
+    if task_id is not None:
+        query = query.filter_by(task_id=task_id)
+    if question_id is not None:
+        query = query.filter_by(question_id=question_id)
+    query.delete(synchronize_session=False)
+
+
+def item_analysis(task_id, max_distractors=5):
+    """Difficulty and most common wrong answers of every question of a task"""
+    questions = Question.query.filter_by(task_id=task_id).order_by(Question.id).all()
+
+    # One grouped query for attempts, correct answers and average points per question
+    totals = {
+        question_id: (attempts, int(correct or 0), float(avg_score or 0))
+        for question_id, attempts, correct, avg_score in db.session.query(
+            StudentQuestionAnswer.question_id,
+            db.func.count(StudentQuestionAnswer.id),
+            _correct_sum,
+            db.func.avg(StudentQuestionAnswer.score)
+        ).filter(StudentQuestionAnswer.task_id == task_id).group_by(StudentQuestionAnswer.question_id)
+    }
+
+    # One grouped query for how often each wrong answer was given
+    distractors = {}
+    for question_id, answer_json, count in db.session.query(
+        StudentQuestionAnswer.question_id,
+        StudentQuestionAnswer.answer_json,
+        db.func.count(StudentQuestionAnswer.id).label('count')
+    ).filter(
+        StudentQuestionAnswer.task_id == task_id,
+        StudentQuestionAnswer.is_correct.is_(False)
+    ).group_by(StudentQuestionAnswer.question_id, StudentQuestionAnswer.answer_json) \
+     .order_by(StudentQuestionAnswer.question_id, db.desc('count')):
+        answers = distractors.setdefault(question_id, [])
+        if len(answers) < max_distractors:
+            answers.append({'answer': json.loads(answer_json) if answer_json else None, 'count': count})
+
+    items = []
+    for question in questions:
+        attempts, correct, avg_score = totals.get(question.id, (0, 0, 0.0))
+        items.append({
+            'question_id': question.id,
+            'question': question.question,
+            'question_type': question.question_type,
+            'difficulty': question.difficulty,
+            'attempts': attempts,
+            'correct_count': correct,
+            # Classical difficulty index: share of students answering correctly
+            'p_value': round(correct / attempts, 3) if attempts else None,
+            'average_score': round(avg_score, 2),
+            'wrong_answers': distractors.get(question.id, [])
+        })
+    return items
+
+
+def accuracy_by_task(student_id):
+    """Exact per-task answered/correct/score totals for a student in one grouped query"""
+    rows = db.session.query(
+        StudentQuestionAnswer.task_id,
+        db.func.count(StudentQuestionAnswer.id),
+        _correct_sum,
+        db.func.coalesce(db.func.sum(StudentQuestionAnswer.score), 0)
+    ).filter(StudentQuestionAnswer.student_id == student_id).group_by(StudentQuestionAnswer.task_id)
+    return [
+        {
+            'task_id': task_id,
+            'answered': answered,
+            'correct': int(correct or 0),
+            'score': int(score),
+            'accuracy_rate': round(int(correct or 0) / answered * 100, 1) if answered else 0.0
+        }
+        for task_id, answered, correct, score in rows
+    ]
@@ -0,0 +1,157 @@
+"""
+Task and Question Bank Export for the Escape Room Application
+"""
+import os
+import json
+import zipfile
+from flask import current_app
+from sqlalchemy import select
+from werkzeug.security import safe_join
+from models import db, Task, Question
+
+EXPORT_YIELD_PER = 500
+EXPORT_CHUNK_BYTES = 64 * 1024
+MEDIA_READ_BYTES = 1024 * 1024
+
+TASK_FIELDS = ('id', 'name', 'introduction', 'image_path', 'video_type', 'video_path', 'video_url',
+               'publish_at', 'content_version')
+QUESTION_FIELDS = ('task_id', 'id', 'question', 'question_type', 'question_data',
+                   'option_a', 'option_b', 'option_c', 'option_d', 'correct_answer',
+                   'difficulty', 'score', 'description', 'image_path', 'image_filename',
+                   'video_type', 'video_path', 'video_filename', 'video_url', 'created_by', 'created_at')
+
+
+def _record(kind, obj, fields):
+    record = {'record': kind}
+    for field in fields:
+        value = getattr(obj, field)
+        record[field] = value.isoformat() if hasattr(value, 'isoformat') else value
+    return record
+
+
+def _streamed(statement, yield_per):
+    return db.session.scalars(statement.execution_options(yield_per=yield_per))
+
+
+def iter_export_records(task_id=None, yield_per=EXPORT_YIELD_PER):
+    """Task records, then question records, for one task or all tasks"""
+    tasks = select(Task).order_by(Task.id)
+    questions = select(Question).order_by(Question.task_id, Question.id)
+    if task_id is not None:
+        tasks = tasks.where(Task.id == task_id)
+        questions = questions.where(Question.task_id == task_id)
+
+    for task in _streamed(tasks, yield_per):
+        yield _record('task', task, TASK_FIELDS)
+        db.session.expunge(task)
+    for question in _streamed(questions, yield_per):
+        record = _record('question', question, QUESTION_FIELDS)
+        # Drop the row from the session so the identity map does not grow with the export
+        db.session.expunge(question)
+        yield record
+
+
+def iter_export_ndjson(task_id=None, yield_per=EXPORT_YIELD_PER, chunk_bytes=EXPORT_CHUNK_BYTES):
+    """NDJSON bytes in chunks of about chunk_bytes"""
+    lines, size = [], 0
+    for record in iter_export_records(task_id, yield_per):
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+        lines.append(line)
+        size += len(line)
+        if size >= chunk_bytes:
+            yield b''.join(lines)
+            lines, size = [], 0
+    if lines:
+        yield b''.join(lines)
+
+
+def _media_folders():
+    questions = current_app.config['UPLOAD_FOLDER']
+    return {
+        'tasks': os.path.join(os.path.dirname(questions), 'tasks'),
+        'questions': questions,
+        'videos': current_app.config['VIDEO_UPLOAD_FOLDER']
+    }
+
+
+def iter_media_files(task_id=None, yield_per=EXPORT_YIELD_PER):
+    """(archive name, file path) of each existing upload the exported rows refer to, once each"""
+    folders = _media_folders()
+    tasks = select(Task.image_path, Task.video_type, Task.video_path)
+    questions = select(Question.image_path, Question.video_type, Question.video_path)
+    if task_id is not None:
+        tasks = tasks.where(Task.id == task_id)
+        questions = questions.where(Question.task_id == task_id)
+
+    seen = set()
+    for image_folder, statement in (('tasks', tasks), ('questions', questions)):
+        for image_path, video_type, video_path in db.session.execute(
+                statement.execution_options(yield_per=yield_per)):
+            refs = [(image_folder, image_path)]
+            if video_type == 'local':
+                refs.append(('videos', video_path))
+            for folder, name in refs:
+                if not name or (folder, name) in seen:
+                    continue
+                seen.add((folder, name))
+                path = safe_join(folders[folder], name)
+                if path and os.path.isfile(path):
+                    yield f'media/{folder}/{name}', path
+
+
+class _ZipSink:
+    """Write-only file object that collects zip output until drained"""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """The bytes written since the last drain, as a list of at most one chunk"""
+        data = b''.join(self._parts)
+        self._parts = []
+        return [data] if data else []
+
+
+def iter_export_zip(task_id=None, include_media=True, yield_per=EXPORT_YIELD_PER):
+    """Zip archive bytes: questions.ndjson plus, with include_media, the referenced uploads"""
+    sink = _ZipSink()
+    # No tell()/seek() on the sink, so zipfile streams with data descriptors
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        with archive.open('questions.ndjson', 'w', force_zip64=True) as entry:
+            for chunk in iter_export_ndjson(task_id, yield_per):
+                entry.write(chunk)
+                yield from sink.drain()
+        if include_media:
+            for name, path in iter_media_files(task_id, yield_per):
+                # Images and videos are compressed already
+                info = zipfile.ZipInfo.from_file(path, name)
+                info.compress_type = zipfile.ZIP_STORED
+                with open(path, 'rb') as source, archive.open(info, 'w', force_zip64=True) as entry:
+                    while chunk := source.read(MEDIA_READ_BYTES):
+                        entry.write(chunk)
+                        yield from sink.drain()
+    yield from sink.drain()
+
+
+if __name__ == '__main__':
+    import argparse
+    from app import create_app
+
+    parser = argparse.ArgumentParser(description='Export tasks and questions as NDJSON or a zip with media')
+    parser.add_argument('path')
+    parser.add_argument('--task-id', type=int, default=None)
+    parser.add_argument('--zip', action='store_true', help='write a zip archive including media files')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context(), open(args.path, 'wb') as out:
+        chunks = iter_export_zip(args.task_id) if args.zip else iter_export_ndjson(args.task_id)
+        for chunk in chunks:
+            out.write(chunk)
@@ -0,0 +1,204 @@
+"""
+Question Bank Import for the Escape Room Application
+"""
+import io
+import csv
+import json
+from datetime import datetime, timezone
+from flask import current_app
+from sqlalchemy import insert
+from models import db, Question
+from question_input import LIST_FIELDS, QuestionInputError, validate_question
+from grading import invalidate_grading_plan
+from task_content import bump_task_content
+from question_search import index_questions
+
+try:
+    import openpyxl
+except ImportError:  # optional dependency
+    openpyxl = None
+
+DEFAULT_IMPORT_CHUNK_SIZE = 500
+DEFAULT_QUESTION_TASK_MAX = 100
+MAX_REPORTED_ERRORS = 100
+LIST_SEPARATOR = '|'
+
+
+class ImportFormatError(ValueError):
+    """The file cannot be read as a question spreadsheet"""
+
+
+def insert_question_rows(task_id, rows, created_by=None):
+    """Insert validated question column dicts with one multi-row INSERT; returns ids in input order"""
+    if not rows:
+        return []
+    now = datetime.now(timezone.utc)
+    rows = [dict(columns, task_id=task_id, created_by=created_by, created_at=now) for columns in rows]
+    # Ids are assigned in VALUES order and only grow, so sorting restores input order
+    # (sort_by_parameter_order would make SQLite fall back to one INSERT per row)
+    return sorted(db.session.scalars(insert(Question).returning(Question.id), rows).all())
+
+
+def question_room(task_id):
+    """(limit, how many more questions the task may hold) under QUESTION_TASK_MAX"""
+    limit = int(current_app.config.get('QUESTION_TASK_MAX', DEFAULT_QUESTION_TASK_MAX))
+    return limit, max(limit - Question.query.filter_by(task_id=task_id).count(), 0)
+
+
+def _split(value):
+    return [item.strip() for item in str(value).split(LIST_SEPARATOR) if item.strip()]
+
+
+def _matches(value):
+    matches = []
+    for pair in _split(value):
+        left, sep, right = pair.replace(':', '-').partition('-')
+        if not sep:
+            raise QuestionInputError(f'Invalid correct match {pair!r}, expected left-right')
+        matches.append({'left': left.strip(), 'right': right.strip()})
+    return matches
+
+
+def row_values(row):
+    """validate_question() input from one spreadsheet row (header -> cell value)"""
+    values = {}
+    for column, value in row.items():
+        if column is None or value is None:
+            continue
+        column = str(column).strip().lower()
+        if isinstance(value, str):
+            value = value.strip()
+            if not value:
+                continue
+        if column in LIST_FIELDS:
+            values[column] = _split(value)
+        elif column == 'correct_matches':
+            values[column] = _matches(value)
+        elif column == 'question_data':
+            try:
+                values[column] = json.loads(value) if isinstance(value, str) else value
+            except json.JSONDecodeError:
+                raise QuestionInputError('question_data must be a JSON object')
+        else:
+            # XLSX cells may be numbers; only score is meant to be one
+            values[column] = value if column == 'score' else str(value)
+    return values
+
+
+def iter_csv_rows(stream):
+    """(row number, row dict) for each data row of a binary CSV stream"""
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    if reader.fieldnames is None:
+        raise ImportFormatError('The file is empty')
+    for row in reader:
+        yield reader.line_num, row
+
+
+def iter_xlsx_rows(stream):
+    """(row number, row dict) for each data row of the first sheet of a binary XLSX stream"""
+    if openpyxl is None:
+        raise ImportFormatError('XLSX import needs the openpyxl package; upload a CSV file instead')
+    try:
+        workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+    except Exception as e:
+        raise ImportFormatError(f'Not a readable XLSX file: {e}')
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            raise ImportFormatError('The file is empty')
+        for number, cells in enumerate(rows, start=2):
+            if any(cell is not None for cell in cells):
+                yield number, dict(zip(header, cells))
+    finally:
+        workbook.close()
+
+
+def iter_upload_rows(filename, stream):
+    """Rows of an uploaded CSV or XLSX file, chosen by extension"""
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension == 'csv':
+        return iter_csv_rows(stream)
+    if extension == 'xlsx':
+        return iter_xlsx_rows(stream)
+    raise ImportFormatError('Unsupported file type. Allowed: csv, xlsx')
+
+
+class ImportResult:
+    """Counts of an import plus the first MAX_REPORTED_ERRORS row errors"""
+
+    def __init__(self):
+        self.imported = 0
+        self.failed   = 0
+        self.chunks   = 0
+        self.errors   = []
+
+    def add_error(self, row_number, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row_number, 'error': message})
+
+    def to_dict(self):
+        return {
+            'imported': self.imported,
+            'failed': self.failed,
+            'chunks': self.chunks,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors)
+        }
+
+
+def import_questions(task_id, rows, chunk_size=DEFAULT_IMPORT_CHUNK_SIZE, created_by=None):
+    """Validate and insert (row number, row dict) pairs, committing every chunk_size valid rows.
+
+    Valid rows beyond the task's QUESTION_TASK_MAX limit are reported as errors.
+    """
+    result = ImportResult()
+    pending = []
+    limit, room = question_room(task_id)
+
+    def commit_chunk():
+        index_questions(insert_question_rows(task_id, pending, created_by))
+        bump_task_content(task_id)
+        db.session.commit()
+        invalidate_grading_plan(task_id)
+        result.imported += len(pending)
+        result.chunks += 1
+        pending.clear()
+
+    try:
+        for row_number, row in rows:
+            try:
+                columns = validate_question(row_values(row))
+            except QuestionInputError as e:
+                result.add_error(row_number, str(e))
+                continue
+            if result.imported + len(pending) >= room:
+                result.add_error(row_number, f'Maximum {limit} questions allowed per task')
+                continue
+            pending.append(columns)
+            if len(pending) >= chunk_size:
+                commit_chunk()
+        if pending:
+            commit_chunk()
+    except (UnicodeDecodeError, csv.Error) as e:
+        db.session.rollback()
+        raise ImportFormatError(f'Could not read the file after {result.imported} imported questions: {e}')
+    return result
+
+
+if __name__ == '__main__':
+    import argparse
+    from app import create_app
+
+    parser = argparse.ArgumentParser(description='Import a CSV/XLSX question bank into a task')
+    parser.add_argument('path')
+    parser.add_argument('--task-id', type=int, required=True)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_IMPORT_CHUNK_SIZE)
+    parser.add_argument('--created-by', default=None)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context(), open(args.path, 'rb') as f:
+        outcome = import_questions(args.task_id, iter_upload_rows(args.path, f), args.chunk_size, args.created_by)
+        print(json.dumps(outcome.to_dict(), indent=2))
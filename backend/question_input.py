@@ -0,0 +1,153 @@
+"""
+Question Input Validation for the Escape Room Application
+"""
+
+QUESTION_TYPES = ('single_choice', 'multiple_choice', 'fill_blank', 'puzzle_game', 'matching_task')
+
+LIST_FIELDS = ('options', 'correct_answers', 'blank_answers', 'puzzle_fragments', 'left_items', 'right_items')
+DATA_FIELDS = LIST_FIELDS + ('puzzle_solution', 'correct_matches')
+
+
+class QuestionInputError(ValueError):
+    """A question failed validation; the message is shown to the teacher"""
+
+
+def _indexed(form, name):
+    values = []
+    while form.get(f'{name}[{len(values)}]') is not None:
+        values.append(form.get(f'{name}[{len(values)}]'))
+    return values
+
+
+def form_question_values(form):
+    """Question values from the multipart form of the single-question endpoint"""
+    values = {field: form.get(field) for field in
+              ('question', 'question_type', 'difficulty', 'score', 'description', 'puzzle_solution',
+               'option_a', 'option_b', 'option_c', 'option_d', 'correct_answer')}
+    for field in LIST_FIELDS:
+        values[field] = _indexed(form, field)
+    matches = []
+    while form.get(f'correct_matches[{len(matches)}][left]') is not None:
+        i = len(matches)
+        matches.append({'left': form.get(f'correct_matches[{i}][left]'),
+                        'right': form.get(f'correct_matches[{i}][right]')})
+    values['correct_matches'] = matches
+    return values
+
+
+def _list(values, field):
+    """A list-valued field; missing is empty, anything but a list is rejected"""
+    value = values.get(field)
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        raise QuestionInputError(f"{field.replace('_', ' ').capitalize()} must be a list")
+    return value
+
+
+def _int_list(values, message):
+    try:
+        return [int(value) for value in values]
+    except (TypeError, ValueError):
+        raise QuestionInputError(message)
+
+
+def validate_question(values):
+    """Question column values for one question, or QuestionInputError.
+
+    Type-specific fields may also be nested in a question_data object, as the
+    task editor sends them.
+    """
+    nested = values.get('question_data')
+    if isinstance(nested, dict):
+        merged = {k: v for k, v in nested.items() if k in DATA_FIELDS}
+        for k, v in values.items():
+            # The editor also carries the v1 options map; the list in question_data wins over it
+            if v is None or (k in LIST_FIELDS and not isinstance(v, list)):
+                continue
+            merged[k] = v
+        values = merged
+
+    question_text = values.get('question')
+    question_type = values.get('question_type') or 'single_choice'
+    description = values.get('description') or ''
+
+    if not question_text:
+        raise QuestionInputError('Question text is required')
+    try:
+        score = int(values.get('score') if values.get('score') not in (None, '') else 3)
+    except (TypeError, ValueError):
+        raise QuestionInputError('Score must be a number')
+
+    columns = {
+        'question': question_text,
+        'question_type': question_type,
+        'question_data': None,
+        'option_a': None, 'option_b': None, 'option_c': None, 'option_d': None,
+        'correct_answer': None,
+        'difficulty': values.get('difficulty') or 'Easy',
+        'score': score,
+        'description': description if description.strip() else None
+    }
+
+    if question_type == 'single_choice':
+        options = [values.get(f'option_{letter}') for letter in 'abcd']
+        correct_answer = str(values.get('correct_answer') or 'A')
+        if not all(options):
+            raise QuestionInputError('All options are required for single choice questions')
+        if correct_answer.upper() not in ['A', 'B', 'C', 'D']:
+            raise QuestionInputError('Correct answer must be A, B, C, or D')
+        columns.update(option_a=options[0], option_b=options[1], option_c=options[2], option_d=options[3],
+                       correct_answer=correct_answer.upper())
+
+    elif question_type == 'multiple_choice':
+        options = _list(values, 'options')
+        correct_answers = _int_list(_list(values, 'correct_answers'),
+                                    'Correct answers must be option indices')
+        if len(options) < 2:
+            raise QuestionInputError('At least 2 options required for multiple choice questions')
+        if len(correct_answers) == 0:
+            raise QuestionInputError('At least one correct answer required for multiple choice questions')
+        if not all(0 <= index < len(options) for index in correct_answers):
+            raise QuestionInputError('Correct answers must be indices of the options')
+        columns['question_data'] = {'options': options, 'correct_answers': correct_answers}
+
+    elif question_type == 'fill_blank':
+        blank_answers = _list(values, 'blank_answers')
+        if len(blank_answers) == 0:
+            raise QuestionInputError('At least one blank answer required')
+        columns['question_data'] = {'blank_answers': blank_answers}
+
+    elif question_type == 'puzzle_game':
+        puzzle_solution = values.get('puzzle_solution')
+        puzzle_fragments = _list(values, 'puzzle_fragments')
+        if not puzzle_solution:
+            raise QuestionInputError('Puzzle solution is required')
+        if len(puzzle_fragments) == 0:
+            raise QuestionInputError('At least one puzzle fragment required')
+        columns['question_data'] = {'puzzle_solution': puzzle_solution, 'puzzle_fragments': puzzle_fragments}
+
+    elif question_type == 'matching_task':
+        left_items = _list(values, 'left_items')
+        right_items = _list(values, 'right_items')
+        correct_matches = []
+        for match in _list(values, 'correct_matches'):
+            if not isinstance(match, dict):
+                raise QuestionInputError('Correct matches must be {left, right} index pairs')
+            left, right = _int_list([match.get('left'), match.get('right')],
+                                    'Correct matches must be {left, right} index pairs')
+            correct_matches.append({'left': left, 'right': right})
+        if len(left_items) < 2 or len(right_items) < 2:
+            raise QuestionInputError('At least 2 items required on each side for matching tasks')
+        if len(correct_matches) == 0:
+            raise QuestionInputError('At least one correct match required')
+        if not all(0 <= m['left'] < len(left_items) and 0 <= m['right'] < len(right_items)
+                   for m in correct_matches):
+            raise QuestionInputError('Correct matches must be indices of the items')
+        columns['question_data'] = {'left_items': left_items, 'right_items': right_items,
+                                    'correct_matches': correct_matches}
+
+    else:
+        raise QuestionInputError('Invalid question type')
+
+    return columns
@@ -0,0 +1,69 @@
+"""
+Compact Question Schema (v2) for the Escape Room Application
+"""
+import json
+
+# question_data fields that reveal the answer
+ANSWER_KEY_FIELDS = ('correct_answers', 'blank_answers', 'puzzle_solution', 'correct_matches')
+
+LEGACY_OPTION_FIELDS = ('option_a', 'option_b', 'option_c', 'option_d')
+
+
+def question_data_dict(question):
+    """question_data as a dict, {} when the question has none"""
+    return question.question_data or {}
+
+
+def question_data_text(question):
+    """question_data as the JSON string the v1 endpoints have always returned"""
+    data = question.question_data
+    return None if data is None else json.dumps(data)
+
+
+def _legacy_options(question):
+    options = [getattr(question, field) for field in LEGACY_OPTION_FIELDS]
+    while options and options[-1] is None:
+        options.pop()
+    return options
+
+
+def compact_question(question, include_answers=False):
+    """A question in the v2 schema; answer keys only with include_answers"""
+    question_type = question.question_type or 'single_choice'
+    data = dict(question_data_dict(question))
+    item = {
+        'id': question.id,
+        'type': question_type,
+        'question': question.question,
+        'difficulty': question.difficulty,
+        'score': question.score
+    }
+
+    options = data.pop('options', None) if question_type != 'single_choice' else None
+    if options is None:
+        options = _legacy_options(question)
+    if options:
+        item['options'] = options
+
+    if question_type == 'fill_blank':
+        item['blank_count'] = len(data.get('blank_answers') or [])
+    if include_answers:
+        if question.correct_answer is not None:
+            item['correct_answer'] = question.correct_answer
+    else:
+        for field in ANSWER_KEY_FIELDS:
+            data.pop(field, None)
+    if data:
+        item['data'] = data
+
+    if question.description:
+        item['description'] = question.description
+    if question.image_path:
+        item['image_url'] = f"/uploads/questions/{question.image_path}"
+    if question.video_type == 'local' and question.video_path:
+        item['video_type'] = 'local'
+        item['video_url'] = f"/uploads/videos/{question.video_path}"
+    elif question.video_type == 'youtube' and question.video_url:
+        item['video_type'] = 'youtube'
+        item['video_url'] = question.video_url
+    return item
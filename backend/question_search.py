@@ -0,0 +1,166 @@
+"""
+Question Bank Search for the Escape Room Application
+"""
+import re
+from sqlalchemy import event, inspect, select, text
+from models import db, Question
+
+SEARCH_TABLE = 'question_search'
+SEARCH_DATA_FIELDS = ('options', 'left_items', 'right_items', 'puzzle_fragments')
+SEARCH_INDEX_CHUNK_SIZE = 500
+MAX_SEARCH_TERMS = 16
+
+# Column weights: question, description, options
+BM25_WEIGHTS = '10.0, 4.0, 1.0'
+
+
+def _create_index_table(conn):
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text(
+            f'CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ('
+            'question_id INTEGER PRIMARY KEY REFERENCES questions(id) ON DELETE CASCADE, '
+            'document TSVECTOR NOT NULL)'
+        ))
+        conn.execute(text(f'CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document ON {SEARCH_TABLE} USING GIN (document)'))
+    else:
+        conn.execute(text(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5('
+            "question, description, options, tokenize = 'unicode61 remove_diacritics 2')"
+        ))
+
+
+@event.listens_for(Question.__table__, 'after_create')
+def _create_with_questions(target, connection, **kw):
+    _create_index_table(connection)
+
+
+@event.listens_for(Question.__table__, 'before_drop')
+def _drop_with_questions(target, connection, **kw):
+    connection.execute(text(f'DROP TABLE IF EXISTS {SEARCH_TABLE}'))
+
+
+def create_search_index(chunk_size=SEARCH_INDEX_CHUNK_SIZE):
+    """Create the index of an existing questions table and fill it, one transaction per chunk"""
+    if inspect(db.engine).has_table(SEARCH_TABLE):
+        return
+    with db.engine.begin() as conn:
+        _create_index_table(conn)
+
+    indexed, last_id = 0, 0
+    while True:
+        ids = db.session.scalars(select(Question.id).where(Question.id > last_id)
+                                 .order_by(Question.id).limit(chunk_size)).all()
+        if not ids:
+            break
+        index_questions(ids)
+        db.session.commit()
+        indexed, last_id = indexed + len(ids), ids[-1]
+    print(f"Created question search index ({indexed} questions)")
+
+
+def _options_text(row):
+    parts = [getattr(row, f'option_{letter}') for letter in 'abcd']
+    data = row.question_data or {}
+    for field in SEARCH_DATA_FIELDS:
+        if isinstance(data.get(field), list):
+            parts.extend(str(item) for item in data[field])
+    return ' '.join(part for part in parts if part)
+
+
+def _chunks(ids, size=SEARCH_INDEX_CHUNK_SIZE):
+    ids = list(ids)
+    for offset in range(0, len(ids), size):
+        yield ids[offset:offset + size]
+
+
+def index_questions(question_ids):
+    """Add or refresh the index entries of these questions, in the caller's transaction"""
+    postgres = db.engine.dialect.name == 'postgresql'
+    for chunk in _chunks(question_ids):
+        rows = db.session.execute(select(
+            Question.id, Question.question, Question.description, Question.question_data,
+            Question.option_a, Question.option_b, Question.option_c, Question.option_d
+        ).where(Question.id.in_(chunk))).all()
+        if not rows:
+            continue
+        entries = [{'id': row.id, 'question': row.question or '', 'description': row.description or '',
+                    'options': _options_text(row)} for row in rows]
+        if postgres:
+            db.session.execute(text(
+                f'INSERT INTO {SEARCH_TABLE} (question_id, document) VALUES (:id, '
+                "setweight(to_tsvector('simple', :question), 'A') || "
+                "setweight(to_tsvector('simple', :description), 'B') || "
+                "setweight(to_tsvector('simple', :options), 'C')) "
+                'ON CONFLICT (question_id) DO UPDATE SET document = EXCLUDED.document'
+            ), entries)
+        else:
+            # FTS5 has no upsert: replace the rows
+            _delete_entries(chunk)
+            db.session.execute(text(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, question, description, options) '
+                'VALUES (:id, :question, :description, :options)'
+            ), entries)
+
+
+def _delete_entries(question_ids):
+    key = 'question_id' if db.engine.dialect.name == 'postgresql' else 'rowid'
+    params = {f'id_{i}': question_id for i, question_id in enumerate(question_ids)}
+    placeholders = ', '.join(f':{name}' for name in params)
+    db.session.execute(text(f'DELETE FROM {SEARCH_TABLE} WHERE {key} IN ({placeholders})'), params)
+
+
+def unindex_questions(question_ids):
+    """Remove the index entries of these questions, in the caller's transaction"""
+    for chunk in _chunks(question_ids):
+        _delete_entries(chunk)
+
+
+def unindex_task(task_id):
+    """Remove the index entries of every question of a task; call before deleting the questions"""
+    key = 'question_id' if db.engine.dialect.name == 'postgresql' else 'rowid'
+    db.session.execute(text(
+        f'DELETE FROM {SEARCH_TABLE} WHERE {key} IN (SELECT id FROM questions WHERE task_id = :task_id)'
+    ), {'task_id': task_id})
+
+
+def search_terms(query):
+    """The words of a search query, lower-cased; punctuation and operators are dropped"""
+    return re.findall(r'\w+', (query or '').lower())[:MAX_SEARCH_TERMS]
+
+
+def search_questions(query, task_id=None, question_type=None, limit=20, offset=0):
+    """(total, [(question id, rank)]) of the questions matching every term, best first"""
+    terms = search_terms(query)
+    if not terms:
+        return 0, []
+
+    params = {'limit': limit, 'offset': offset}
+    filters = ''
+    if task_id is not None:
+        filters += ' AND q.task_id = :task_id'
+        params['task_id'] = task_id
+    if question_type:
+        filters += ' AND q.question_type = :question_type'
+        params['question_type'] = question_type
+
+    if db.engine.dialect.name == 'postgresql':
+        params['match'] = ' & '.join(f'{term}:*' for term in terms)
+        source = (f"{SEARCH_TABLE} s JOIN questions q ON q.id = s.question_id, "
+                  "to_tsquery('simple', :match) query WHERE s.document @@ query")
+        key, rank = 'q.id', 'ts_rank(s.document, query)'
+    else:
+        params['match'] = ' '.join(f'"{term}"*' for term in terms)
+        # The rowid is the question id, so questions is only joined for the filters
+        join = f' JOIN questions q ON q.id = {SEARCH_TABLE}.rowid' if filters else ''
+        source = f'{SEARCH_TABLE}{join} WHERE {SEARCH_TABLE} MATCH :match'
+        key = f'{SEARCH_TABLE}.rowid'
+        # bm25 is lower for better matches
+        rank = f'-bm25({SEARCH_TABLE}, {BM25_WEIGHTS})'
+
+    total = db.session.execute(text(f'SELECT COUNT(*) FROM {source}{filters}'), params).scalar()
+    if not total or offset >= total:
+        return total, []
+    hits = db.session.execute(text(
+        f'SELECT {key}, {rank} AS score FROM {source}{filters} ORDER BY score DESC, {key} LIMIT :limit OFFSET :offset'
+    ), params).all()
+    return total, [(question_id, float(score)) for question_id, score in hits]
@@ -7,57 +7,120 @@ import uuid
 from datetime import datetime, timezone
 from flask import Blueprint, request, jsonify, send_from_directory, current_app, abort
 from werkzeug.exceptions import HTTPException
-from models import db, Task, Question
+from models import db, Task, Question, RegradeJob
+from grading import compile_question, get_grading_plan, invalidate_grading_plan
+from regrade import GRADING_FIELDS, start_regrade, job_status
+from question_answers import delete_answers, item_analysis
+from task_content import bump_task_content, content_state, task_etag
+from http_cache import is_not_modified, not_modified, with_etag
+from payload_cache import get_payload_cache
+from singleflight import get_single_flight
+from question_schema import compact_question, question_data_text
+from question_input import QuestionInputError, form_question_values, validate_question
+from question_search import index_questions, search_questions, unindex_questions
+from question_import import (DEFAULT_IMPORT_CHUNK_SIZE, ImportFormatError, import_questions,
+                             insert_question_rows, iter_upload_rows, question_room)
 
 questions_bp = Blueprint('questions', __name__)
 
+DEFAULT_QUESTION_BATCH_MAX = 5000
+DEFAULT_QUESTION_BATCH_CHUNK_SIZE = 500
+DEFAULT_SEARCH_PER_PAGE = 20
+SEARCH_MAX_PER_PAGE = 100
+
 @questions_bp.route('/api/tasks/<int:task_id>/questions', methods=['GET'])
 def get_questions(task_id):
-    task = db.session.get(Task, task_id)
-    if not task:
+    return _question_payload_response(task_id, 'questions', _question_list)
+
+@questions_bp.route('/api/v2/tasks/<int:task_id>/questions', methods=['GET'])
+def get_questions_v2(task_id):
+    """Compact question schema; students (the default role) get no answer keys"""
+    if request.args.get('role', 'stu') == 'tea':
+        return _question_payload_response(task_id, 'questions-v2-tea', _compact_question_list, True)
+    return _question_payload_response(task_id, 'questions-v2-stu', _compact_question_list, False)
+
+def _question_payload_response(task_id, view, build, *args):
+    """Serve a task's serialized question list `view`, built by build(task_id, *args) on a cache miss"""
+    state = content_state(task_id)
+    if state is None:
         abort(404)
-    result = []
-    for q in task.questions:
-        question_data = {
-            'id': q.id,
-            'question': q.question,
-            'question_type': q.question_type or 'single_choice',
-            'question_data': q.question_data,
-            'correct_answer': q.correct_answer,
-            'options': {},  # Will be intelligently filled
-            'option_a': q.option_a,
-            'option_b': q.option_b,
-            'option_c': q.option_c,
-            'option_d': q.option_d,
-            'difficulty': q.difficulty,
-            'score': q.score,
-            'description': q.description
-        }
-        
-        # Intelligently construct options objects - handle according to question type
-        try:
-            if q.question_type == 'multiple_choice' and q.question_data:
-                # Multiple Choice: Parse options from question_data JSON
-                parsed_data = json.loads(q.question_data)
-                options_list = parsed_data.get('options', [])
-                
-                # Convert options array to A/B/C/D format
-                for i, option_text in enumerate(options_list):
-                    if i < 26:  # Support up to 26 options (A-Z)
-                        letter = chr(65 + i)  # A, B, C, D, ...
-                        question_data['options'][letter] = option_text
-                        
-                # Set correct answer for Multiple Choice (if needed)
-                if 'correct_answers' in parsed_data:
-                    correct_indices = parsed_data['correct_answers']
-                    if correct_indices:
-                        # Set the first correct answer as primary correct_answer (compatibility)
-                        first_correct = correct_indices[0]
-                        if first_correct < len(options_list):
-                            question_data['correct_answer'] = chr(65 + first_correct)
-                            
-            elif q.question_type == 'single_choice':
-                # Single Choice: Use traditional fields
+    etag = task_etag(task_id, view, state.content_version)
+    if is_not_modified(etag, state.content_updated_at):
+        return not_modified(etag, state.content_updated_at)
+    
+    # Every student of a session asks for the same list: serve the serialized bytes
+    payload = get_payload_cache().get(task_id, view, state.content_version)
+    if payload is None:
+        # Concurrent misses for the same version wait for one build instead of each querying
+        payload = get_single_flight().do((view, task_id, state.content_version),
+                                         _build_question_payload, task_id, view, state.content_version, build, args)
+    response = current_app.response_class(payload, mimetype=current_app.json.mimetype)
+    return with_etag(response, etag, state.content_updated_at), 200
+
+def _build_question_payload(task_id, view, version, build, args):
+    payload = jsonify(build(task_id, *args)).get_data()
+    get_payload_cache().put(task_id, view, version, payload)
+    return payload
+
+def _compact_question_list(task_id, include_answers):
+    return [compact_question(q, include_answers)
+            for q in Question.query.filter_by(task_id=task_id).order_by(Question.id)]
+
+def _question_list(task_id):
+    """Questions of a task as returned by GET /api/tasks/<id>/questions"""
+    return [_legacy_question(q) for q in Question.query.filter_by(task_id=task_id).order_by(Question.id)]
+
+def _legacy_question(q):
+    """A question in the original (v1) schema"""
+    question_data = {
+        'id': q.id,
+        'question': q.question,
+        'question_type': q.question_type or 'single_choice',
+        'question_data': question_data_text(q),
+        'correct_answer': q.correct_answer,
+        'options': {},  # Will be intelligently filled
+        'option_a': q.option_a,
+        'option_b': q.option_b,
+        'option_c': q.option_c,
+        'option_d': q.option_d,
+        'difficulty': q.difficulty,
+        'score': q.score,
+        'description': q.description
+    }
+
+    # Intelligently construct options objects - handle according to question type
+    try:
+        if q.question_type == 'multiple_choice' and q.question_data:
+            # Multiple Choice: options from question_data
+            parsed_data = q.question_data
+            options_list = parsed_data.get('options', [])
+
+            # Convert options array to A/B/C/D format
+            for i, option_text in enumerate(options_list):
+                if i < 26:  # Support up to 26 options (A-Z)
+                    letter = chr(65 + i)  # A, B, C, D, ...
+                    question_data['options'][letter] = option_text
+
+            # Set correct answer for Multiple Choice (if needed)
+            if 'correct_answers' in parsed_data:
+                correct_indices = parsed_data['correct_answers']
+                if correct_indices:
+                    # Set the first correct answer as primary correct_answer (compatibility)
+                    first_correct = correct_indices[0]
+                    if first_correct < len(options_list):
+                        question_data['correct_answer'] = chr(65 + first_correct)
+
+        elif q.question_type == 'single_choice':
+            # Single Choice: Use traditional fields
+            question_data['options'] = {
+                'A': q.option_a,
+                'B': q.option_b,
+                'C': q.option_c,
+                'D': q.option_d
+            }
+        else:
+            # Other question types: Use traditional fields (if available)
+            if q.option_a or q.option_b or q.option_c or q.option_d:
                 question_data['options'] = {
                     'A': q.option_a,
                     'B': q.option_b,
@@ -65,40 +128,30 @@ def get_questions(task_id):
                     'D': q.option_d
                 }
             else:
-                # Other question types: Use traditional fields (if available)
-                if q.option_a or q.option_b or q.option_c or q.option_d:
-                    question_data['options'] = {
-                        'A': q.option_a,
-                        'B': q.option_b,
-                        'C': q.option_c,
-                        'D': q.option_d
-                    }
-                else:
-                    question_data['options'] = {}
-                    
-        except (json.JSONDecodeError, TypeError, KeyError) as e:
-            # JSON parsing failed, handle gracefully
-            print(f"Warning: Failed to parse question_data for question {q.id}: {e}")
-            question_data['options'] = {
-                'A': q.option_a,
-                'B': q.option_b,
-                'C': q.option_c,
-                'D': q.option_d
-            }
-        
-        # Add image path (if exists)
-        if q.image_path:
-            question_data['image_url'] = f"/uploads/questions/{q.image_path}"
-        
-        # Add video information (if exists)
-        if q.video_type == 'local' and q.video_path:
-            question_data['video_url'] = f"/uploads/videos/{q.video_path}"
-            question_data['video_type'] = 'local'
-        elif q.video_type == 'youtube' and q.video_url:
-            question_data['video_url'] = q.video_url
-            question_data['video_type'] = 'youtube'
-        result.append(question_data)
-    return jsonify(result), 200
+                question_data['options'] = {}
+
+    except (json.JSONDecodeError, TypeError, KeyError) as e:
+        # JSON parsing failed, handle gracefully
+        print(f"Warning: Failed to parse question_data for question {q.id}: {e}")
+        question_data['options'] = {
+            'A': q.option_a,
+            'B': q.option_b,
+            'C': q.option_c,
+            'D': q.option_d
+        }
+
+    # Add image path (if exists)
+    if q.image_path:
+        question_data['image_url'] = f"/uploads/questions/{q.image_path}"
+
+    # Add video information (if exists)
+    if q.video_type == 'local' and q.video_path:
+        question_data['video_url'] = f"/uploads/videos/{q.video_path}"
+        question_data['video_type'] = 'local'
+    elif q.video_type == 'youtube' and q.video_url:
+        question_data['video_url'] = q.video_url
+        question_data['video_type'] = 'youtube'
+    return question_data
 
 @questions_bp.route('/api/questions/<int:question_id>/check', methods=['POST'])
 def check_answer(question_id):
@@ -113,7 +166,12 @@ def check_answer(question_id):
     if not question:
         abort(404)
     
-    is_correct = selected_answer.upper() == question.correct_answer
+    # Grade with the same compiled answer key submit_task uses
+    compiled = get_grading_plan(question.task_id).get(question.id)
+    if compiled is None:
+        # Added after the plan was compiled (e.g. directly in the database, without a version bump)
+        compiled = compile_question(question)
+    is_correct = compiled.grade(selected_answer)
     
     result = {
         'correct': is_correct,
@@ -133,149 +191,28 @@ def create_single_question(task_id):
         abort(404)
     
     # Check current task's question count
-    current_question_count = Question.query.filter_by(task_id=task_id).count()
-    if current_question_count >= 100:
-        return jsonify({'error': 'Maximum 100 questions allowed per task'}), 400
+    max_task_questions, room = question_room(task_id)
+    if room < 1:
+        return jsonify({'error': f'Maximum {max_task_questions} questions allowed per task'}), 400
     
     try:
-        # Get basic fields from form data
-        question_text = request.form.get('question')
-        question_type = request.form.get('question_type', 'single_choice')
-        difficulty = request.form.get('difficulty', 'Easy')
-        score = request.form.get('score', '3')
-        description = request.form.get('description', '')  # Text description
-        created_by = request.form.get('created_by')
-        
-        # Verify required fields
-        if not question_text:
-            return jsonify({'error': 'Question text is required'}), 400
-        
-        # Verify score
+        # Verify fields, shared with the batch endpoint
         try:
-            score = int(score)
-        except ValueError:
-            return jsonify({'error': 'Score must be a number'}), 400
-        
-        # Verify and process data according to question type
-        question_data = {}
-        option_a = option_b = option_c = option_d = correct_answer = None
-        
-        if question_type == 'single_choice':
-            option_a = request.form.get('option_a')
-            option_b = request.form.get('option_b')
-            option_c = request.form.get('option_c')
-            option_d = request.form.get('option_d')
-            correct_answer = request.form.get('correct_answer', 'A')
-            
-            if not option_a or not option_b or not option_c or not option_d:
-                return jsonify({'error': 'All options are required for single choice questions'}), 400
-            if correct_answer.upper() not in ['A', 'B', 'C', 'D']:
-                return jsonify({'error': 'Correct answer must be A, B, C, or D'}), 400
-                
-        elif question_type == 'multiple_choice':
-            options = []
-            correct_answers = []
-            i = 0
-            while request.form.get(f'options[{i}]') is not None:
-                options.append(request.form.get(f'options[{i}]'))
-                i += 1
-            
-            # Parse correct_answers array
-            i = 0
-            while request.form.get(f'correct_answers[{i}]') is not None:
-                correct_answers.append(int(request.form.get(f'correct_answers[{i}]')))
-                i += 1
-            
-            if len(options) < 2:
-                return jsonify({'error': 'At least 2 options required for multiple choice questions'}), 400
-            if len(correct_answers) == 0:
-                return jsonify({'error': 'At least one correct answer required for multiple choice questions'}), 400
-                
-            question_data = {'options': options, 'correct_answers': correct_answers}
-            
-        elif question_type == 'fill_blank':
-            blank_answers = []
-            i = 0
-            while request.form.get(f'blank_answers[{i}]') is not None:
-                blank_answers.append(request.form.get(f'blank_answers[{i}]'))
-                i += 1
-            
-            if len(blank_answers) == 0:
-                return jsonify({'error': 'At least one blank answer required'}), 400
-                
-            question_data = {'blank_answers': blank_answers}
-            
-        elif question_type == 'puzzle_game':
-            puzzle_solution = request.form.get('puzzle_solution')
-            puzzle_fragments = []
-            i = 0
-            while request.form.get(f'puzzle_fragments[{i}]') is not None:
-                puzzle_fragments.append(request.form.get(f'puzzle_fragments[{i}]'))
-                i += 1
-            
-            if not puzzle_solution:
-                return jsonify({'error': 'Puzzle solution is required'}), 400
-            if len(puzzle_fragments) == 0:
-                return jsonify({'error': 'At least one puzzle fragment required'}), 400
-                
-            question_data = {'puzzle_solution': puzzle_solution, 'puzzle_fragments': puzzle_fragments}
-            
-        elif question_type == 'matching_task':
-            left_items = []
-            right_items = []
-            correct_matches = []
-            
-            i = 0
-            while request.form.get(f'left_items[{i}]') is not None:
-                left_items.append(request.form.get(f'left_items[{i}]'))
-                i += 1
-                
-            i = 0
-            while request.form.get(f'right_items[{i}]') is not None:
-                right_items.append(request.form.get(f'right_items[{i}]'))
-                i += 1
-            
-            # Parse correct_matches array of objects
-            i = 0
-            while request.form.get(f'correct_matches[{i}][left]') is not None:
-                left_idx = int(request.form.get(f'correct_matches[{i}][left]'))
-                right_idx = int(request.form.get(f'correct_matches[{i}][right]'))
-                correct_matches.append({'left': left_idx, 'right': right_idx})
-                i += 1
-            
-            if len(left_items) < 2 or len(right_items) < 2:
-                return jsonify({'error': 'At least 2 items required on each side for matching tasks'}), 400
-            if len(correct_matches) == 0:
-                return jsonify({'error': 'At least one correct match required'}), 400
-                
-            question_data = {'left_items': left_items, 'right_items': right_items, 'correct_matches': correct_matches}
-            
-        else:
-            return jsonify({'error': 'Invalid question type'}), 400
+            columns = validate_question(form_question_values(request.form))
+        except QuestionInputError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Check if there is at least one description (image, video, or text description)
         has_image = 'image' in request.files and request.files['image'].filename != ''
         has_video = 'video' in request.files and request.files['video'].filename != ''
         has_youtube = request.form.get('youtube_url', '').strip() != ''
-        has_description = description.strip() != ''
-        
         
         # Create question object
         new_question = Question(
             task_id=task_id,
-            question=question_text,
-            question_type=question_type,
-            question_data=json.dumps(question_data) if question_data else None,
-            option_a=option_a,
-            option_b=option_b,
-            option_c=option_c,
-            option_d=option_d,
-            correct_answer=correct_answer.upper() if correct_answer else None,
-            difficulty=difficulty,
-            score=score,
-            description=description if has_description else None,
-            created_by=created_by,
-            created_at=datetime.now(timezone.utc)
+            created_by=request.form.get('created_by'),
+            created_at=datetime.now(timezone.utc),
+            **columns
         )
         
         # Process image upload
@@ -346,7 +283,11 @@ def create_single_question(task_id):
         
         # Save to database
         db.session.add(new_question)
+        db.session.flush()
+        index_questions([new_question.id])
+        bump_task_content(task_id)
         db.session.commit()
+        invalidate_grading_plan(task_id)
         
         # Build return data
         result = {
@@ -388,7 +329,13 @@ def create_single_question(task_id):
 
 @questions_bp.route('/api/tasks/<int:task_id>/questions/batch', methods=['POST'])
 def create_questions_batch(task_id):
-    """Batch create questions"""
+    """Batch create questions of any type.
+
+    Every question is validated like a single created question; if any fails,
+    nothing is created and all errors are returned. Valid batches are inserted
+    in chunks of QUESTION_BATCH_CHUNK_SIZE rows, one multi-row INSERT ... RETURNING
+    per chunk, in a single transaction. Returns the new ids in input order.
+    """
     # Verify task exists
     task = db.session.get(Task, task_id)
     if not task:
@@ -396,92 +343,80 @@ def create_questions_batch(task_id):
     
     data = request.get_json()
     questions_data = data.get('questions', [])
+    max_questions = current_app.config.get('QUESTION_BATCH_MAX', DEFAULT_QUESTION_BATCH_MAX)
+    chunk_size = current_app.config.get('QUESTION_BATCH_CHUNK_SIZE', DEFAULT_QUESTION_BATCH_CHUNK_SIZE)
     
     if not questions_data:
         return jsonify({'error': 'No questions provided'}), 400
     
-    if len(questions_data) > 100:
-        return jsonify({'error': 'Maximum 100 questions allowed per batch'}), 400
+    if len(questions_data) > max_questions:
+        return jsonify({'error': f'Maximum {max_questions} questions allowed per batch'}), 400
     
-    created_questions = []
+    max_task_questions, room = question_room(task_id)
+    if len(questions_data) > room:
+        return jsonify({'error': f'Maximum {max_task_questions} questions allowed per task, '
+                                 f'room for {room} more'}), 400
+    
+    # Validate everything first, keeping only the error messages
     errors = []
+    for i, q_data in enumerate(questions_data):
+        try:
+            validate_question(q_data if isinstance(q_data, dict) else {})
+        except QuestionInputError as e:
+            errors.append(f"Question {i+1}: {e}")
+    if errors:
+        return jsonify({'errors': errors}), 400
     
     try:
-        for i, q_data in enumerate(questions_data):
-            # Verify required fields for each question
-            required_fields = ['question', 'option_a', 'option_b', 'option_c', 'option_d', 
-                             'correct_answer', 'difficulty', 'score']
-            
-            missing_fields = [field for field in required_fields if not q_data.get(field)]
-            if missing_fields:
-                errors.append(f"Question {i+1}: Missing fields: {', '.join(missing_fields)}")
-                continue
-            
-            # Verify score
-            try:
-                score = int(q_data['score'])
-            except ValueError:
-                errors.append(f"Question {i+1}: Score must be a number")
-                continue
-            
-            # Verify correct answer
-            if q_data['correct_answer'].upper() not in ['A', 'B', 'C', 'D']:
-                errors.append(f"Question {i+1}: Correct answer must be A, B, C, or D")
-                continue
-            
-            # Create question
-            question = Question(
-                task_id=task_id,
-                question=q_data['question'],
-                option_a=q_data['option_a'],
-                option_b=q_data['option_b'],
-                option_c=q_data['option_c'],
-                option_d=q_data['option_d'],
-                correct_answer=q_data['correct_answer'].upper(),
-                difficulty=q_data['difficulty'],
-                score=score,
-                created_by=data.get('created_by'),
-                created_at=datetime.now(timezone.utc)
-            )
-            
-            db.session.add(question)
-            created_questions.append(question)
-        
-        if errors:
-            db.session.rollback()
-            return jsonify({'errors': errors}), 400
-        
+        # Rows are rebuilt per chunk, so memory stays bounded by the chunk size
+        created_by = data.get('created_by')
+        ids = []
+        for offset in range(0, len(questions_data), chunk_size):
+            rows = [validate_question(q_data) for q_data in questions_data[offset:offset + chunk_size]]
+            ids.extend(insert_question_rows(task_id, rows, created_by))
+        
+        index_questions(ids)
+        bump_task_content(task_id)
         db.session.commit()
-        
-        # Build return data
-        result = []
-        for question in created_questions:
-            q_data = {
-                'id': question.id,
-                'question': question.question,
-                'options': {
-                    'A': question.option_a,
-                    'B': question.option_b,
-                    'C': question.option_c,
-                    'D': question.option_d
-                },
-                'correct_answer': question.correct_answer,
-                'difficulty': question.difficulty,
-                'score': question.score,
-                'created_by': question.created_by,
-                'created_at': question.created_at.isoformat()
-            }
-            result.append(q_data)
+        invalidate_grading_plan(task_id)
         
         return jsonify({
-            'message': f'{len(created_questions)} questions created successfully',
-            'questions': result
+            'message': f'{len(ids)} questions created successfully',
+            'ids': ids
         }), 201
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Database error: {str(e)}'}), 500
 
+@questions_bp.route('/api/tasks/<int:task_id>/questions/import', methods=['POST'])
+def import_question_bank(task_id):
+    """Import questions from an uploaded CSV or XLSX spreadsheet.
+
+    The file is read row by row; valid rows are committed in chunks of
+    QUESTION_IMPORT_CHUNK_SIZE, invalid rows are skipped and reported with
+    their row number (see question_import.py for the columns).
+    """
+    task = db.session.get(Task, task_id)
+    if not task:
+        abort(404)
+    
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({'error': 'No file provided'}), 400
+    chunk_size = current_app.config.get('QUESTION_IMPORT_CHUNK_SIZE', DEFAULT_IMPORT_CHUNK_SIZE)
+    
+    try:
+        rows = iter_upload_rows(upload.filename, upload.stream)
+        result = import_questions(task_id, rows, chunk_size, request.form.get('created_by'))
+    except ImportFormatError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+    
+    return jsonify(result.to_dict()), 201 if result.imported else 200
+
 @questions_bp.route('/api/questions/<int:question_id>', methods=['DELETE'])
 def delete_question(question_id):
     """Delete a single question"""
@@ -508,8 +443,13 @@ def delete_question(question_id):
                 print(f"Warning: Failed to delete video file: {str(e)}")
         
         # Delete question from database
+        task_id = question.task_id
+        delete_answers(question_id=question_id)
+        unindex_questions([question_id])
         db.session.delete(question)
+        bump_task_content(task_id)
         db.session.commit()
+        invalidate_grading_plan(task_id)
         
         return jsonify({'message': 'Question deleted successfully'}), 200
         
@@ -531,7 +471,7 @@ def get_question(question_id):
             'id': question.id,
             'question': question.question,
             'question_type': question.question_type or 'single_choice',
-            'question_data': question.question_data,
+            'question_data': question_data_text(question),
             'correct_answer': question.correct_answer,
             'option_a': question.option_a,
             'option_b': question.option_b,
@@ -568,6 +508,8 @@ def update_question(question_id):
         if not question:
             abort(404)
         data = request.get_json()
+        # Edit pages send the answer key with every save: compare to decide on a regrade
+        grading_before = {field: getattr(question, field) for field in GRADING_FIELDS}
         
         # Update basic fields
         if 'question' in data:
@@ -595,17 +537,110 @@ def update_question(question_id):
             
         # Update question_data field (for complex data types)
         if 'question_data' in data:
-            if isinstance(data['question_data'], dict):
-                question.question_data = json.dumps(data['question_data'])
-            else:
-                question.question_data = data['question_data']
-        
+            question_data = data['question_data']
+            if isinstance(question_data, str):
+                # Older clients send the JSON-encoded string the v1 endpoints return
+                try:
+                    question_data = json.loads(question_data) if question_data.strip() else None
+                except json.JSONDecodeError:
+                    return jsonify({'error': 'question_data must be a JSON object'}), 400
+            if question_data is not None and not isinstance(question_data, dict):
+                return jsonify({'error': 'question_data must be a JSON object'}), 400
+            question.question_data = question_data
+        
+        key_changed = any(getattr(question, field) != value for field, value in grading_before.items())
+        
+        index_questions([question.id])
+        bump_task_content(question.task_id)
         db.session.commit()
+        invalidate_grading_plan(question.task_id)
+        
+        response = {'message': 'Question updated successfully'}
         
-        return jsonify({'message': 'Question updated successfully'}), 200
+        # Answer key changed: regrade stored results in the background
+        if key_changed:
+            job = start_regrade(question.task_id, question.id)
+            response['regrade_job_id'] = job.id
+        
+        return jsonify(response), 200
         
     except HTTPException:
         raise  # Re-raise HTTP exceptions (like abort(404))
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': f'Failed to update question: {str(e)}'}), 500
\ No newline at end of file
+        return jsonify({'error': f'Failed to update question: {str(e)}'}), 500
+
+@questions_bp.route('/api/tasks/<int:task_id>/regrade', methods=['POST'])
+def regrade_task(task_id):
+    """Start a background regrade of every stored result of a task"""
+    task = db.session.get(Task, task_id)
+    if not task:
+        abort(404)
+    job = start_regrade(task_id)
+    return jsonify({'message': 'Regrade started', 'job': job_status(job)}), 202
+
+@questions_bp.route('/api/regrade-jobs/<int:job_id>', methods=['GET'])
+def get_regrade_job(job_id):
+    """Report the progress of a regrade job"""
+    job = db.session.get(RegradeJob, job_id)
+    if not job:
+        abort(404)
+    return jsonify(job_status(job)), 200
+
+@questions_bp.route('/api/tasks/<int:task_id>/item-analysis', methods=['GET'])
+def get_item_analysis(task_id):
+    """Per-question difficulty and common wrong answers from recorded answers"""
+    task = db.session.get(Task, task_id)
+    if not task:
+        abort(404)
+    max_distractors = request.args.get('distractors', 5, type=int)
+    return jsonify({
+        'task_id': task_id,
+        'task_name': task.name,
+        'questions': item_analysis(task_id, max_distractors)
+    }), 200
+
+
+@questions_bp.route('/api/question-cache/stats', methods=['GET'])
+def get_question_cache_stats():
+    """Size and hit/miss counters of the serialized question list cache, and request coalescing counters"""
+    return jsonify(dict(get_payload_cache().stats(), single_flight=get_single_flight().stats())), 200
+
+
+@questions_bp.route('/api/questions/search', methods=['GET'])
+def search_question_bank():
+    """Ranked, paginated full-text search over every task's questions (teachers only).
+
+    Query parameters: q (required), task_id, type, page (from 1), per_page
+    (at most SEARCH_MAX_PER_PAGE). Results are in the v2 teacher schema plus
+    task_id, task_name and rank.
+    """
+    if request.args.get('role', 'stu') != 'tea':
+        return jsonify({'error': 'Only teachers can search the question bank'}), 403
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Search query is required'}), 400
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', DEFAULT_SEARCH_PER_PAGE, type=int), 1), SEARCH_MAX_PER_PAGE)
+    
+    total, hits = search_questions(query, request.args.get('task_id', type=int), request.args.get('type'),
+                                   limit=per_page, offset=(page - 1) * per_page)
+    
+    # One query for the page of questions and their task names, then back into rank order
+    rows = {q.id: (q, name) for q, name in db.session.query(Question, Task.name).join(Task)
+            .filter(Question.id.in_([question_id for question_id, _ in hits]))} if hits else {}
+    results = []
+    for question_id, rank in hits:
+        if question_id not in rows:
+            continue
+        question, task_name = rows[question_id]
+        results.append(dict(compact_question(question, include_answers=True),
+                            task_id=question.task_id, task_name=task_name, rank=round(rank, 6)))
+    
+    return jsonify({
+        'query': query,
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'results': results
+    }), 200
@@ -0,0 +1,231 @@
+"""
+Background Regrading for the Escape Room Application
+"""
+import os
+import json
+from datetime import datetime, timezone, timedelta
+from flask import current_app
+from sqlalchemy import update
+from models import db, Task, StudentTaskResult, StudentStats, RegradeJob
+from background import get_executor, submit_in_app_context, start_periodic
+from grading import compile_grading_plan, grade_submission
+from student_stats import apply_submission, lock_student_stats
+from achievements import Metrics, evaluate_achievements_bulk
+from question_answers import answer_rows, replace_answers
+
+DEFAULT_REGRADE_WORKERS = 1
+DEFAULT_REGRADE_CHUNK_SIZE = 200
+DEFAULT_REGRADE_STALE_AFTER = 300
+DEFAULT_REGRADE_SWEEP_INTERVAL = 60
+
+# Fields of a question that affect grading; changing any of them triggers a regrade
+GRADING_FIELDS = ('question_type', 'question_data', 'correct_answer', 'score')
+
+
+def start_regrade(task_id, question_id=None):
+    """Create a regrade job for a task and hand it to the background workers"""
+    now = datetime.now(timezone.utc)
+    job = RegradeJob(task_id=task_id, question_id=question_id, status='queued', created_at=now)
+    db.session.add(job)
+
+    # Nothing stored yet for this task: the job is complete as soon as it exists
+    if not db.session.query(StudentTaskResult.query.filter_by(task_id=task_id).exists()).scalar():
+        job.status = 'done'
+        job.finished_at = now
+        db.session.commit()
+        return job
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    executor = get_executor(app, 'regrade', _worker_count(app))
+    if executor is not None:
+        submit_in_app_context(executor, app, run_regrade_job, job.id)
+    return job
+
+
+def _worker_count(app):
+    return int(app.config.get('REGRADE_WORKERS', os.getenv('REGRADE_WORKERS', DEFAULT_REGRADE_WORKERS)))
+
+
+def _claim_job(job_id):
+    now = datetime.now(timezone.utc)
+    claimed = RegradeJob.query.filter_by(id=job_id, status='queued').update(
+        {'status': 'running', 'started_at': now, 'heartbeat_at': now},
+        synchronize_session=False
+    )
+    db.session.commit()
+    return claimed == 1
+
+
+def _regrade_chunk(plan, results, now):
+    """Regrade one chunk of results in the current transaction; returns (changed, skipped)"""
+    changed = skipped = 0
+    candidates = []
+    answers = []
+    for result in results:
+        if not result.answers_json:
+            skipped += 1
+            continue
+        graded = grade_submission(plan, json.loads(result.answers_json))
+        # Per-question correctness can change even when the totals don't
+        answers.extend(answer_rows(result.student_id, plan.task_id, graded, result.completed_at))
+        if (graded.total_score, graded.correct_count, graded.questions_count, plan.max_score) == \
+                (result.total_score, result.correct_count, result.question_count, result.max_score):
+            continue
+
+        # Only if the result is still the submission that was loaded: a resubmission that got in
+        # anyway (no row locks on SQLite) keeps its own grades and its stats delta is not applied twice
+        written = db.session.execute(
+            update(StudentTaskResult)
+            .where(StudentTaskResult.id == result.id, StudentTaskResult.completed_at == result.completed_at)
+            .values(total_score=graded.total_score, correct_count=graded.correct_count,
+                    question_count=graded.questions_count, max_score=plan.max_score)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not written:
+            answers = [row for row in answers if row['student_id'] != result.student_id]
+            continue
+        apply_submission(lock_student_stats(result.student_id), result, graded.questions_count,
+                         graded.correct_count, graded.total_score, plan.max_score)
+        changed += 1
+        candidates.append((result.student_id, result.student_name, graded))
+
+    replace_answers(plan.task_id, {row['student_id'] for row in answers}, answers)
+
+    if candidates:
+        db.session.flush()
+        stats = {
+            s.student_id: s for s in
+            StudentStats.query.filter(StudentStats.student_id.in_([c[0] for c in candidates]))
+        }
+        total_tasks = []
+
+        def count_tasks():
+            if not total_tasks:
+                total_tasks.append(Task.query.count())
+            return total_tasks[0]
+
+        def metrics_for(student_stats, graded):
+            return Metrics(
+                questions_count=graded.questions_count,
+                correct_count=graded.correct_count,
+                total_score=graded.total_score,
+                max_score=plan.max_score,
+                minutes_taken=None,  # time taken is not re-evaluated
+                questions_answered=student_stats.questions_answered,
+                accuracy_rate=(student_stats.correct_count / student_stats.questions_answered * 100)
+                              if student_stats.questions_answered > 0 else None,
+                tasks_completed=student_stats.tasks_completed,
+                total_tasks=count_tasks
+            )
+
+        evaluate_achievements_bulk(
+            [(student_id, name, metrics_for(stats[student_id], graded)) for student_id, name, graded in candidates],
+            now
+        )
+    return changed, skipped
+
+
+def run_regrade_job(job_id, chunk_size=None):
+    """Run a queued regrade job to completion (must run inside an app context)"""
+    if not _claim_job(job_id):
+        return
+    chunk_size = chunk_size or current_app.config.get('REGRADE_CHUNK_SIZE', DEFAULT_REGRADE_CHUNK_SIZE)
+    job = db.session.get(RegradeJob, job_id)
+    task_id = job.task_id
+
+    try:
+        # Compile from the database rather than the per-process cache, which may be stale in this worker
+        plan = compile_grading_plan(task_id)
+        job.total = StudentTaskResult.query.filter_by(task_id=task_id).count()
+        db.session.commit()
+
+        last_id = 0
+        while True:
+            # Row locks keep resubmissions out until the chunk commits
+            results = StudentTaskResult.query.filter(
+                StudentTaskResult.task_id == task_id, StudentTaskResult.id > last_id
+            ).order_by(StudentTaskResult.id).limit(chunk_size).with_for_update().all()
+            if not results:
+                break
+            last_id = results[-1].id
+
+            changed, skipped = _regrade_chunk(plan, results, datetime.now(timezone.utc))
+            job = db.session.get(RegradeJob, job_id)
+            job.processed += len(results)
+            job.changed   += changed
+            job.skipped   += skipped
+            job.heartbeat_at = datetime.now(timezone.utc)
+            db.session.commit()
+
+        job = db.session.get(RegradeJob, job_id)
+        job.status = 'done'
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(RegradeJob, job_id)
+        job.status = 'failed'
+        job.error  = str(e)
+    job.finished_at = datetime.now(timezone.utc)
+    db.session.commit()
+
+
+def run_pending_regrades():
+    """Run every queued regrade job, oldest first; returns how many were started"""
+    job_ids = [row.id for row in db.session.query(RegradeJob.id).filter_by(status='queued').order_by(RegradeJob.id)]
+    for job_id in job_ids:
+        run_regrade_job(job_id)
+    return len(job_ids)
+
+
+def requeue_stale_regrades(app=None):
+    """Put running jobs whose worker stopped sending heartbeats back in the queue; they restart from the top"""
+    app = app or current_app._get_current_object()
+    stale_after = float(app.config.get('REGRADE_STALE_AFTER', DEFAULT_REGRADE_STALE_AFTER))
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=stale_after)
+    count = RegradeJob.query.filter(
+        RegradeJob.status == 'running',
+        db.func.coalesce(RegradeJob.heartbeat_at, RegradeJob.started_at) < cutoff
+    ).update({'status': 'queued', 'started_at': None, 'heartbeat_at': None, 'processed': 0, 'skipped': 0},
+             synchronize_session=False)
+    db.session.commit()
+    return count
+
+
+def sweep_regrade_jobs(app):
+    """Requeue stale jobs and hand every queued job to the in-process workers; returns how many"""
+    executor = get_executor(app, 'regrade', _worker_count(app))
+    if executor is None:
+        return 0
+    requeue_stale_regrades(app)
+    job_ids = [row.id for row in db.session.query(RegradeJob.id).filter_by(status='queued').order_by(RegradeJob.id)]
+    for job_id in job_ids:
+        # A job handed over twice runs once: only one claim succeeds
+        submit_in_app_context(executor, app, run_regrade_job, job_id)
+    return len(job_ids)
+
+
+def start_regrade_sweeper(app):
+    """Sweep regrade jobs now and every REGRADE_SWEEP_INTERVAL seconds (in-process mode only)"""
+    interval = float(app.config.get('REGRADE_SWEEP_INTERVAL',
+                                    os.getenv('REGRADE_SWEEP_INTERVAL', DEFAULT_REGRADE_SWEEP_INTERVAL)))
+    if not interval or not _worker_count(app):
+        return None
+    return start_periodic(app, 'regrade-sweeper', interval, sweep_regrade_jobs, app)
+
+
+def job_status(job):
+    """Client-facing view of a regrade job"""
+    return {
+        'id': job.id,
+        'task_id': job.task_id,
+        'question_id': job.question_id,
+        'status': job.status,
+        'total': job.total,
+        'processed': job.processed,
+        'changed': job.changed,
+        'skipped': job.skipped,
+        'progress': round(job.processed / job.total * 100, 1) if job.total else (100.0 if job.status == 'done' else 0.0),
+        'error': job.error,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }
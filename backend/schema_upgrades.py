@@ -0,0 +1,196 @@
+"""
+In-place Schema Upgrades for the Escape Room Application
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.dialects.postgresql import JSONB
+from models import db
+from question_search import create_search_index
+
+QUESTION_DATA_CHUNK_SIZE = 1000
+
+# (table, column, DDL type) - all added columns must be nullable or have a default;
+# a dict gives the type per dialect name, with 'default' for the others
+ADDED_COLUMNS = [
+    ('student_task_results', 'question_count', 'INTEGER'),
+    ('student_task_results', 'correct_count', 'INTEGER'),
+    ('student_task_results', 'max_score', 'INTEGER'),
+    ('student_task_results', 'answers_json', 'TEXT'),
+    ('student_task_processes', 'version', 'INTEGER NOT NULL DEFAULT 0'),
+    ('student_task_processes', 'answers_blob', {'postgresql': 'BYTEA', 'default': 'BLOB'}),
+    ('tasks', 'content_version', 'INTEGER NOT NULL DEFAULT 0'),
+    ('tasks', 'content_updated_at', {'postgresql': 'TIMESTAMP', 'default': 'DATETIME'}),
+    ('regrade_jobs', 'heartbeat_at', {'postgresql': 'TIMESTAMP', 'default': 'DATETIME'}),
+]
+
+# (table, index name, columns) - duplicates are removed before the index is created,
+# keeping the newest row (highest id) of each group
+ADDED_UNIQUE_INDEXES = [
+    ('student_task_results', 'uq_student_task_results_student_task', ('student_id', 'task_id')),
+    ('student_task_processes', 'uq_student_task_processes_student_task', ('student_id', 'task_id')),
+    ('student_achievements', 'uq_student_achievements_student_achievement', ('student_id', 'achievement_id')),
+]
+
+
+def _has_unique(inspector, table, columns):
+    existing = [c['column_names'] for c in inspector.get_unique_constraints(table)]
+    existing += [i['column_names'] for i in inspector.get_indexes(table) if i.get('unique')]
+    return any(list(names) == list(columns) for names in existing)
+
+
+def upgrade_schema():
+    """Add columns missing from tables created by an older version of the models"""
+    inspector = inspect(db.engine)
+    tables = set(inspector.get_table_names())
+    columns = {}
+
+    with db.engine.begin() as conn:
+        for table, column, ddl_type in ADDED_COLUMNS:
+            if table not in tables:
+                continue
+            if table not in columns:
+                columns[table] = {c['name'] for c in inspector.get_columns(table)}
+            if column in columns[table]:
+                continue
+            if isinstance(ddl_type, dict):
+                ddl_type = ddl_type.get(conn.dialect.name, ddl_type['default'])
+            conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl_type}'))
+            columns[table].add(column)
+            print(f"Added column {table}.{column}")
+
+        for table, index_name, index_columns in ADDED_UNIQUE_INDEXES:
+            if table not in tables or _has_unique(inspector, table, index_columns):
+                continue
+            group = ', '.join(index_columns)
+            if table == 'student_task_results':
+                # Aggregates built from the dropped duplicates are rebuilt on next read
+                conn.execute(text(
+                    f'DELETE FROM student_stats WHERE student_id IN ('
+                    f'SELECT student_id FROM {table} GROUP BY {group} HAVING COUNT(*) > 1)'
+                ))
+            removed = conn.execute(text(
+                f'DELETE FROM {table} WHERE id NOT IN (SELECT MAX(id) FROM {table} GROUP BY {group})'
+            )).rowcount
+            conn.execute(text(f'CREATE UNIQUE INDEX {index_name} ON {table} ({group})'))
+            print(f"Added unique index {index_name} (removed {removed} duplicate rows)")
+
+    if 'questions' in tables:
+        migrate_question_data(inspector)
+        create_search_index()
+
+
+def _id_chunks(conn, table, chunk_size):
+    max_id = conn.execute(text(f'SELECT MAX(id) FROM {table}')).scalar() or 0
+    for low in range(0, max_id, chunk_size):
+        yield low, low + chunk_size
+
+
+# SQLite: what the JSON type would load from a stored value, NULL for anything that is not an
+# object; a JSON string holding an object (written as double-encoded text) is unwrapped once.
+# Nested CASEs because SQLite's JSON functions raise on malformed input.
+_SQLITE_TYPE   = "CASE WHEN json_valid(question_data) THEN json_type(question_data) END"
+_SQLITE_INNER  = "json_extract(question_data, '$')"
+_SQLITE_OBJECT = (f"CASE WHEN {_SQLITE_TYPE} = 'text' THEN CASE WHEN json_valid({_SQLITE_INNER}) THEN "
+                  f"CASE WHEN json_type({_SQLITE_INNER}) = 'object' THEN {_SQLITE_INNER} END END END")
+
+# PostgreSQL: the same rule as a function of the text value, used by the copy trigger and the cleanup
+_POSTGRES_OBJECT_FUNCTION = '''
+    CREATE OR REPLACE FUNCTION questions_question_data_object(value text) RETURNS jsonb AS $$
+    DECLARE
+        parsed jsonb;
+    BEGIN
+        parsed := value::jsonb;
+        IF jsonb_typeof(parsed) = 'string' THEN
+            parsed := (parsed #>> '{}')::jsonb;
+        END IF;
+        RETURN CASE WHEN jsonb_typeof(parsed) = 'object' THEN parsed END;
+    EXCEPTION WHEN others THEN
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql IMMUTABLE
+'''
+
+
+def _run_in_chunks(sql, chunk_size):
+    """Run an UPDATE taking :low/:high id bounds over the questions table, one transaction per chunk"""
+    with db.engine.connect() as conn:
+        chunks = list(_id_chunks(conn, 'questions', chunk_size))
+    changed = 0
+    for low, high in chunks:
+        with db.engine.begin() as conn:
+            changed += conn.execute(text(sql), {'low': low, 'high': high}).rowcount
+    return changed
+
+
+def migrate_question_data(inspector=None, chunk_size=QUESTION_DATA_CHUNK_SIZE):
+    """Bring questions.question_data to the JSON column type holding only objects or NULL.
+
+    One short transaction per chunk. Values that are not JSON objects are set to NULL
+    (on PostgreSQL the original text stays in question_data_text).
+    """
+    inspector = inspector or inspect(db.engine)
+    dialect = db.engine.dialect.name
+    columns = {c['name']: c for c in inspector.get_columns('questions')}
+    if 'question_data' not in columns:
+        return
+
+    if dialect == 'sqlite':
+        cleared = _run_in_chunks(
+            f'UPDATE questions SET question_data = {_SQLITE_OBJECT} '
+            f"WHERE id > :low AND id <= :high AND question_data IS NOT NULL AND COALESCE({_SQLITE_TYPE}, '') <> 'object'",
+            chunk_size)
+        if cleared:
+            print(f"Normalized {cleared} question_data values that were not JSON objects")
+        return
+
+    if dialect != 'postgresql':
+        return
+
+    if isinstance(columns['question_data']['type'], JSONB):
+        # Already migrated: unwrap strings written as double-encoded text since
+        with db.engine.connect() as conn:
+            if conn.execute(text(
+                "SELECT 1 FROM questions WHERE jsonb_typeof(question_data) <> 'object' LIMIT 1"
+            )).first() is None:
+                return
+            conn.execute(text(_POSTGRES_OBJECT_FUNCTION))
+            conn.commit()
+        cleared = _run_in_chunks(
+            "UPDATE questions SET question_data = questions_question_data_object(question_data #>> '{}') "
+            "WHERE id > :low AND id <= :high AND jsonb_typeof(question_data) <> 'object'",
+            chunk_size)
+        with db.engine.begin() as conn:
+            conn.execute(text('DROP FUNCTION questions_question_data_object(text)'))
+        if cleared:
+            print(f"Normalized {cleared} question_data values that were not JSON objects")
+        return
+
+    with db.engine.begin() as conn:
+        conn.execute(text(_POSTGRES_OBJECT_FUNCTION))
+        if 'question_data_jsonb' not in columns:
+            conn.execute(text('ALTER TABLE questions ADD COLUMN question_data_jsonb JSONB'))
+        # Writes made while the copy runs are converted by the trigger
+        conn.execute(text('''
+            CREATE OR REPLACE FUNCTION questions_question_data_sync() RETURNS trigger AS $$
+            BEGIN
+                NEW.question_data_jsonb := questions_question_data_object(NEW.question_data);
+                RETURN NEW;
+            END $$ LANGUAGE plpgsql
+        '''))
+        conn.execute(text('DROP TRIGGER IF EXISTS questions_question_data_sync ON questions'))
+        conn.execute(text(
+            'CREATE TRIGGER questions_question_data_sync BEFORE INSERT OR UPDATE OF question_data ON questions '
+            'FOR EACH ROW EXECUTE FUNCTION questions_question_data_sync()'
+        ))
+
+    # Rewriting the column fires the trigger, which fills question_data_jsonb
+    _run_in_chunks(
+        'UPDATE questions SET question_data = question_data '
+        'WHERE id > :low AND id <= :high AND question_data IS NOT NULL AND question_data_jsonb IS NULL',
+        chunk_size)
+
+    with db.engine.begin() as conn:
+        conn.execute(text('DROP TRIGGER questions_question_data_sync ON questions'))
+        conn.execute(text('DROP FUNCTION questions_question_data_sync()'))
+        conn.execute(text('DROP FUNCTION questions_question_data_object(text)'))
+        conn.execute(text('ALTER TABLE questions RENAME COLUMN question_data TO question_data_text'))
+        conn.execute(text('ALTER TABLE questions RENAME COLUMN question_data_jsonb TO question_data'))
+    print("Migrated questions.question_data to JSONB (old values kept in question_data_text)")
@@ -0,0 +1,79 @@
+"""
+Single-Flight Request Coalescing for the Escape Room Application
+"""
+import threading
+from flask import current_app
+
+DEFAULT_SINGLE_FLIGHT_TIMEOUT = 30.0
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done   = threading.Event()
+        self.result = None
+        self.error  = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution"""
+
+    def __init__(self, timeout=DEFAULT_SINGLE_FLIGHT_TIMEOUT):
+        self.timeout  = timeout
+        self._calls   = {}
+        self._lock    = threading.Lock()
+        self._metrics = {}  # name -> {'executions', 'coalesced', 'timeouts'}
+
+    def _count(self, key, metric):
+        counters = self._metrics.setdefault(key[0], {'executions': 0, 'coalesced': 0, 'timeouts': 0})
+        counters[metric] += 1
+
+    def do(self, key, fn, *args, **kwargs):
+        """Return fn(*args, **kwargs), sharing one execution among concurrent callers with this key"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._count(key, 'executions')
+            else:
+                self._count(key, 'coalesced')
+
+        if not leader:
+            if not call.done.wait(self.timeout):
+                # The running call is stuck; do not let it hold this request hostage
+                with self._lock:
+                    self._count(key, 'timeouts')
+                return fn(*args, **kwargs)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'endpoints': {name: dict(counters) for name, counters in self._metrics.items()}
+            }
+
+
+def get_single_flight(app=None):
+    app = app or current_app._get_current_object()
+    flight = app.extensions.get('single_flight')
+    if flight is None:
+        flight = app.extensions.setdefault('single_flight', SingleFlight(
+            float(app.config.get('SINGLE_FLIGHT_TIMEOUT', DEFAULT_SINGLE_FLIGHT_TIMEOUT))
+        ))
+    return flight
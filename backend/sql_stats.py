@@ -0,0 +1,46 @@
+"""
+SQL Statement Counting Helpers for the Escape Room Application
+"""
+import threading
+from contextlib import contextmanager
+from sqlalchemy import event
+
+_local = threading.local()
+
+
+class StatementCounter:
+    """Number of SQL statements executed on the current thread while active"""
+
+    def __init__(self):
+        self.count = 0
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    for counter in getattr(_local, 'counters', ()):
+        counter.count += 1
+
+
+def _ensure_listener(engine):
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+
+
+@contextmanager
+def count_statements(engine):
+    """Count SQL statements issued on this thread against `engine`.
+
+    Usage:
+        with count_statements(db.engine) as counter:
+            ...
+        print(counter.count)
+    """
+    _ensure_listener(engine)
+    counter = StatementCounter()
+    counters = getattr(_local, 'counters', None)
+    if counters is None:
+        counters = _local.counters = []
+    counters.append(counter)
+    try:
+        yield counter
+    finally:
+        counters.remove(counter)
@@ -0,0 +1,119 @@
+"""
+Per-Student Aggregate Statistics for the Escape Room Application
+"""
+from datetime import datetime, timezone
+from models import db, Question, StudentTaskResult, StudentStats
+from upserts import insert_ignore
+
+
+def _task_totals(task_ids):
+    """Return {task_id: (question count, possible score)} in one grouped query"""
+    if not task_ids:
+        return {}
+    rows = db.session.query(
+        Question.task_id,
+        db.func.count(Question.id),
+        db.func.coalesce(db.func.sum(Question.score), 0)
+    ).filter(Question.task_id.in_(task_ids)).group_by(Question.task_id).all()
+    return {task_id: (count, int(score)) for task_id, count, score in rows}
+
+
+def result_contribution(result, task_totals=None):
+    """Return (questions answered, correct, score, possible score) a task result adds"""
+    if result.correct_count is not None:
+        return result.question_count or 0, result.correct_count, result.total_score, result.max_score or 0
+
+    # Result stored before per-result counts existed: estimate correct answers
+    # from the score ratio over the task's current questions
+    if task_totals is None:
+        task_totals = _task_totals([result.task_id])
+    question_count, possible_score = task_totals.get(result.task_id, (0, 0))
+    if possible_score <= 0:
+        return 0, 0, result.total_score, 0
+    correct = int(result.total_score / possible_score * question_count)
+    return question_count, correct, result.total_score, possible_score
+
+
+def _lock_stats_row(student_id):
+    """Create the student's aggregates row if missing and lock it until commit; returns (row, created)"""
+    # Concurrent creators wait on the insert instead of failing on the unique student_id
+    created = insert_ignore(StudentStats, [{'student_id': student_id}], ['student_id']) == 1
+    stats = StudentStats.query.filter_by(student_id=student_id).with_for_update().populate_existing().one()
+    return stats, created
+
+
+def _rebuild(stats):
+    """Recompute a student's aggregates from all of their task results (not committed)"""
+    results = StudentTaskResult.query.filter_by(student_id=stats.student_id).all()
+    task_totals = _task_totals({r.task_id for r in results if r.correct_count is None})
+
+    stats.questions_answered = 0
+    stats.correct_count      = 0
+    stats.total_score        = 0
+    stats.possible_score     = 0
+    for result in results:
+        answered, correct, score, possible = result_contribution(result, task_totals)
+        stats.questions_answered += answered
+        stats.correct_count      += correct
+        stats.total_score        += score
+        stats.possible_score     += possible
+    stats.tasks_completed = len(results)
+    stats.updated_at      = datetime.now(timezone.utc)
+    return stats
+
+
+def lock_student_stats(student_id):
+    """Lock the student's aggregates row for the rest of the transaction, building it if missing.
+
+    Call before reading the student's previous result for a submission: concurrent
+    submissions of the same student then apply their deltas one after the other.
+    """
+    stats, created = _lock_stats_row(student_id)
+    if created:
+        _rebuild(stats)
+        db.session.flush()
+    return stats
+
+
+def get_student_stats(student_id):
+    """Return the aggregates row for a student, rebuilding it if it does not exist yet.
+
+    A rebuilt row is not committed here; the next submission's transaction stores it.
+    """
+    stats = StudentStats.query.filter_by(student_id=student_id).first()
+    if stats is None:
+        stats = lock_student_stats(student_id)
+    return stats
+
+
+def apply_submission(stats, previous_result, questions_answered, correct_count, score, possible_score):
+    """Fold a graded submission into the student's aggregates in the caller's transaction.
+
+    `stats` is the row returned by lock_student_stats(). Must be called before
+    `previous_result` (the student's existing result for the task, or None) is
+    overwritten, so its old contribution can be subtracted, and `previous_result`
+    must have been read after the stats row was locked.
+    Counters are incremented in SQL, so concurrent submissions don't lose updates.
+    """
+    delta_tasks = 1
+    if previous_result is not None:
+        old_answered, old_correct, old_score, old_possible = result_contribution(previous_result)
+        questions_answered -= old_answered
+        correct_count      -= old_correct
+        score              -= old_score
+        possible_score     -= old_possible
+        delta_tasks = 0
+
+    stats.questions_answered = StudentStats.questions_answered + questions_answered
+    stats.correct_count      = StudentStats.correct_count + correct_count
+    stats.total_score        = StudentStats.total_score + score
+    stats.possible_score     = StudentStats.possible_score + possible_score
+    stats.tasks_completed    = StudentStats.tasks_completed + delta_tasks
+    stats.updated_at         = datetime.now(timezone.utc)
+    return stats
+
+
+def drop_stats_for_task(task_id):
+    """Delete aggregates of every student with a result for the task (rebuilt on next read)"""
+    affected = db.session.query(StudentTaskResult.student_id).filter_by(task_id=task_id)
+    StudentStats.query.filter(StudentStats.student_id.in_(affected)).delete(synchronize_session=False)
@@ -3,12 +3,21 @@ Student Profile and Achievement Routes for the Escape Room Application
 """
 from flask import Blueprint, jsonify
 from models import db, Student, Task, Question, StudentTaskResult, Achievement, StudentAchievement, StudentTaskProcess
+from student_stats import get_student_stats
+from question_answers import accuracy_by_task
+from progress_buffer import flush_progress
 
 students_bp = Blueprint('students', __name__, url_prefix='/api/students')
 
 @students_bp.route('/<student_id>/task-progress', methods=['GET'])
 def get_student_task_progress(student_id):
     """Get the progress status of all tasks for a student"""
+    try:
+        flush_progress(student_id=student_id)
+    except Exception as e:
+        # The buffer keeps the autosaves for its next flush; serve what is stored
+        print(f"Warning: Serving stored progress of student {student_id}, "
+              f"buffered autosaves not written: {str(e)}")
     try:
         processes = StudentTaskProcess.query.filter_by(student_id=student_id).all()
         
@@ -33,31 +42,13 @@ def get_student_profile(student_id):
     if not student:
         return jsonify({'error': 'student not found'}), 404
     
-    # Get all task results for the student
-    task_results = StudentTaskResult.query.filter_by(student_id=student_id).all()
-    
-    # Calculate statistics
-    total_tasks_completed = len(task_results)
-    total_questions = 0
-    total_correct = 0
-    total_score = 0
-    total_possible_score = 0
-    
-    for result in task_results:
-        total_score += result.total_score
-        
-        # Get all questions for the task to calculate accuracy
-        task_questions = Question.query.filter_by(task_id=result.task_id).all()
-        task_total_score = sum(q.score for q in task_questions)
-        total_possible_score += task_total_score
-        
-        if task_total_score > 0:
-            # Calculate the number of correct questions for this task
-            task_correct_ratio = result.total_score / task_total_score
-            task_question_count = len(task_questions)
-            
-            total_questions += task_question_count
-            total_correct += int(task_correct_ratio * task_question_count)
+    # Read the maintained per-student aggregates (rebuilt from results if missing)
+    stats = get_student_stats(student_id)
+    total_tasks_completed = stats.tasks_completed
+    total_questions = stats.questions_answered
+    total_correct = stats.correct_count
+    total_score = stats.total_score
+    total_possible_score = stats.possible_score
     
     # Calculate accuracy and average score
     accuracy_rate = round((total_correct / total_questions * 100), 1) if total_questions > 0 else 0.0
@@ -77,6 +68,24 @@ def get_student_profile(student_id):
         }
     }), 200
 
+@students_bp.route('/<student_id>/accuracy', methods=['GET'])
+def get_student_accuracy(student_id):
+    """Exact per-task accuracy from the student's recorded answers"""
+    student = Student.query.filter_by(student_id=student_id).first()
+    if not student:
+        return jsonify({'error': 'student not found'}), 404
+
+    tasks = accuracy_by_task(student_id)
+    answered = sum(t['answered'] for t in tasks)
+    correct = sum(t['correct'] for t in tasks)
+    return jsonify({
+        'student_id': student_id,
+        'accuracy_rate': round(correct / answered * 100, 1) if answered > 0 else 0.0,
+        'questions_answered': answered,
+        'correct_count': correct,
+        'tasks': tasks
+    }), 200
+
 @students_bp.route('/<student_id>/achievements', methods=['GET'])
 def get_student_achievements(student_id):
     # Verify student exists
@@ -0,0 +1,154 @@
+"""
+Asynchronous Submission Pipeline for the Escape Room Application
+"""
+import os
+import json
+import uuid
+from datetime import datetime, timezone, timedelta
+from flask import current_app, request
+from models import db, SubmissionTicket
+from background import get_executor, submit_in_app_context, start_periodic
+
+DEFAULT_SUBMISSION_WORKERS = 4
+DEFAULT_SUBMISSION_SWEEP_INTERVAL = 60
+
+
+def submission_mode_is_async():
+    """True if the current submit request should be processed asynchronously"""
+    mode = current_app.config.get('SUBMISSION_MODE') or os.getenv('SUBMISSION_MODE', 'sync')
+    if mode == 'async':
+        return True
+    return 'respond-async' in request.headers.get('Prefer', '')
+
+
+def _worker_count(app):
+    return int(app.config.get('SUBMISSION_WORKERS', os.getenv('SUBMISSION_WORKERS', DEFAULT_SUBMISSION_WORKERS)))
+
+
+def enqueue_submission(task_id, data):
+    """Persist a submission ticket and hand it to the in-process workers"""
+    ticket = SubmissionTicket(
+        id=uuid.uuid4().hex,
+        task_id=task_id,
+        student_id=str(data.get('student_id')),
+        payload_json=json.dumps(data),
+        status='queued',
+        created_at=datetime.now(timezone.utc)
+    )
+    db.session.add(ticket)
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    executor = get_executor(app, 'submissions', _worker_count(app))
+    if executor is not None:
+        submit_in_app_context(executor, app, process_ticket, ticket.id)
+    return ticket
+
+
+def _claim_ticket(ticket_id):
+    """Atomically move a ticket from queued to processing; False if someone else got it"""
+    claimed = SubmissionTicket.query.filter_by(id=ticket_id, status='queued').update(
+        {'status': 'processing', 'started_at': datetime.now(timezone.utc)},
+        synchronize_session=False
+    )
+    db.session.commit()
+    return claimed == 1
+
+
+def process_ticket(ticket_id):
+    """Grade a queued ticket and store its result (must run inside an app context)"""
+    from submissions import process_submission
+
+    if not _claim_ticket(ticket_id):
+        return
+    ticket = db.session.get(SubmissionTicket, ticket_id)
+    try:
+        body, status = process_submission(ticket.task_id, json.loads(ticket.payload_json))
+        ticket = db.session.get(SubmissionTicket, ticket_id)
+        ticket.status      = 'done'
+        ticket.status_code = status
+        ticket.result_json = json.dumps(body)
+    except Exception as e:
+        db.session.rollback()
+        ticket = db.session.get(SubmissionTicket, ticket_id)
+        ticket.status      = 'failed'
+        ticket.status_code = 500
+        ticket.result_json = json.dumps({'error': f'Failed to process submission: {str(e)}'})
+    ticket.finished_at = datetime.now(timezone.utc)
+    db.session.commit()
+
+
+def requeue_stale_tickets(max_processing_age=timedelta(minutes=5)):
+    """Put tickets whose worker died mid-processing back in the queue"""
+    cutoff = datetime.now(timezone.utc) - max_processing_age
+    count = SubmissionTicket.query.filter(
+        SubmissionTicket.status == 'processing', SubmissionTicket.started_at < cutoff
+    ).update({'status': 'queued', 'started_at': None}, synchronize_session=False)
+    db.session.commit()
+    return count
+
+
+def process_pending_tickets(limit=100):
+    """Process up to `limit` queued tickets, oldest first; returns how many were seen"""
+    ticket_ids = [
+        row.id for row in db.session.query(SubmissionTicket.id)
+        .filter_by(status='queued').order_by(SubmissionTicket.created_at).limit(limit)
+    ]
+    for ticket_id in ticket_ids:
+        process_ticket(ticket_id)
+    return len(ticket_ids)
+
+
+def sweep_submission_queue(app, min_age=timedelta(0)):
+    """Requeue tickets of dead workers and hand queued tickets older than min_age to the in-process workers.
+
+    Tickets already handed over are harmless to hand over again: only one claim succeeds.
+    Returns how many tickets were handed over.
+    """
+    executor = get_executor(app, 'submissions', _worker_count(app))
+    if executor is None:
+        return 0
+    requeue_stale_tickets()
+    cutoff = datetime.now(timezone.utc) - min_age
+    ticket_ids = [
+        row.id for row in db.session.query(SubmissionTicket.id)
+        .filter(SubmissionTicket.status == 'queued', SubmissionTicket.created_at <= cutoff)
+        .order_by(SubmissionTicket.created_at)
+    ]
+    for ticket_id in ticket_ids:
+        submit_in_app_context(executor, app, process_ticket, ticket_id)
+    return len(ticket_ids)
+
+
+def start_submission_sweeper(app):
+    """Sweep the queue now (tickets left by a previous process) and every SUBMISSION_SWEEP_INTERVAL seconds.
+
+    Only in in-process mode; returns the thread's stop event, or None if no sweeper was started.
+    """
+    interval = float(app.config.get('SUBMISSION_SWEEP_INTERVAL',
+                                    os.getenv('SUBMISSION_SWEEP_INTERVAL', DEFAULT_SUBMISSION_SWEEP_INTERVAL)))
+    if not interval or not _worker_count(app):
+        return None
+    first = []
+
+    def sweep():
+        # The first sweep takes everything; later ones leave fresh tickets to the enqueue path
+        sweep_submission_queue(app, timedelta(seconds=interval) if first else timedelta(0))
+        first.append(True)
+
+    return start_periodic(app, 'submission-sweeper', interval, sweep)
+
+
+def ticket_status(ticket):
+    """Client-facing view of a ticket"""
+    result = {
+        'ticket_id': ticket.id,
+        'task_id': ticket.task_id,
+        'status': ticket.status,
+        'created_at': ticket.created_at.isoformat(),
+        'finished_at': ticket.finished_at.isoformat() if ticket.finished_at else None
+    }
+    if ticket.status in ('done', 'failed'):
+        result['status_code'] = ticket.status_code
+        result['result'] = json.loads(ticket.result_json) if ticket.result_json else None
+    return result
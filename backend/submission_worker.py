@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Standalone runner for asynchronously queued task submissions and regrade jobs
+"""
+import time
+import argparse
+from app import create_app
+from submission_queue import requeue_stale_tickets, process_pending_tickets
+from regrade import requeue_stale_regrades, run_pending_regrades
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Process queued task submissions')
+    parser.add_argument('--interval', type=float, default=1.0, help='seconds to sleep when the queue is empty')
+    parser.add_argument('--batch', type=int, default=100, help='tickets to fetch per poll')
+    parser.add_argument('--once', action='store_true', help='drain the queue once and exit')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        while True:
+            requeue_stale_tickets()
+            processed = process_pending_tickets(limit=args.batch)
+            if processed:
+                print(f"Processed {processed} queued submissions")
+            requeue_stale_regrades(app)
+            regrades = run_pending_regrades()
+            if regrades:
+                print(f"Ran {regrades} regrade jobs")
+            processed += regrades
+            if args.once and not processed:
+                break
+            if not processed:
+                time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    main()
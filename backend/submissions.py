@@ -1,238 +1,176 @@
 """
 Task Submission and Progress Routes for the Escape Room Application
 """
+import os
 import json
 from datetime import datetime, timezone
-from flask import Blueprint, request, jsonify
-from models import db, Student, Task, Question, StudentTaskResult, StudentTaskProcess, Achievement, StudentAchievement
+from flask import Blueprint, request, jsonify, current_app
+from models import db, Student, Task, StudentTaskResult, StudentTaskProcess, SubmissionTicket
+from sql_stats import count_statements
+from grading import get_grading_plan, grade_submission
+from student_stats import apply_submission, lock_student_stats
+from achievements import Metrics, evaluate_achievements
+from question_answers import record_answers
+from submission_queue import submission_mode_is_async, enqueue_submission, ticket_status
+from idempotency import idempotent
+from batch_grading import grade_class, np
+from upserts import upsert
+from progress_buffer import discard_progress
 
 submissions_bp = Blueprint('submissions', __name__)
 
+DEFAULT_BATCH_GRADE_MAX_BYTES = 10 * 1024 * 1024
+
 @submissions_bp.route('/api/tasks/<int:task_id>/submit', methods=['POST'])
+@idempotent
 def submit_task(task_id):
-    data       = request.get_json()
+    data = request.get_json()
+    error = validate_submission(data)
+    if error:
+        return jsonify({'error': error}), 400
+
+    # Async mode: durably enqueue and let the worker pool grade (client polls the ticket)
+    if submission_mode_is_async():
+        ticket = enqueue_submission(task_id, data)
+        response = jsonify({
+            'ticket_id': ticket.id,
+            'status': ticket.status,
+            'status_url': f"/api/submissions/{ticket.id}"
+        })
+        response.headers['Location'] = f"/api/submissions/{ticket.id}"
+        return response, 202
+
+    # Count SQL statements so submit cost can be checked against question count
+    with count_statements(db.engine) as sql_counter:
+        body, status = process_submission(task_id, data)
+    response = jsonify(body)
+    response.headers['X-SQL-Statement-Count'] = str(sql_counter.count)
+    return response, status
+
+@submissions_bp.route('/api/submissions/<ticket_id>', methods=['GET'])
+def get_submission_ticket(ticket_id):
+    """Poll the status of an asynchronously processed submission"""
+    ticket = db.session.get(SubmissionTicket, ticket_id)
+    if not ticket:
+        return jsonify({'error': 'ticket not found'}), 404
+    return jsonify(ticket_status(ticket)), 200
+
+@submissions_bp.route('/api/tasks/<int:task_id>/batch-grade', methods=['POST'])
+def batch_grade_task(task_id):
+    """Grade a whole class at once from an uploaded answer file (nothing is stored).
+
+    The file (multipart field "file") or JSON body holds a list of
+    {"student_id", "answers"} objects, as a JSON array or one object per line.
+    """
+    if request.args.get('role', 'stu') != 'tea':
+        return jsonify({'error': 'Only teachers can batch grade a task'}), 403
+    task = db.session.get(Task, task_id)
+    if not task:
+        return jsonify({'error': 'task not found'}), 404
+
+    max_bytes = int(current_app.config.get('BATCH_GRADE_MAX_BYTES',
+                                           os.getenv('BATCH_GRADE_MAX_BYTES', DEFAULT_BATCH_GRADE_MAX_BYTES)))
+    too_large = jsonify({'error': f'Answer file too large. Maximum size: {max_bytes} bytes'}), 413
+    if request.content_length and request.content_length > max_bytes:
+        return too_large
+    if 'file' in request.files:
+        # Chunked uploads carry no Content-Length: read at most one byte past the limit
+        raw = request.files['file'].read(max_bytes + 1)
+        if len(raw) > max_bytes:
+            return too_large
+        entries, error = parse_answer_file(raw.decode('utf-8-sig'))
+    else:
+        data = request.get_json(silent=True)
+        entries, error = (data.get('submissions'), None) if isinstance(data, dict) else (data, None)
+    if error:
+        return jsonify({'error': error}), 400
+    if not isinstance(entries, list):
+        return jsonify({'error': 'a list of submissions is required'}), 400
+    for line, entry in enumerate(entries, start=1):
+        error = validate_submission(entry) or validate_answer_ids(entry['answers'])
+        if error:
+            return jsonify({'error': f'submission {line}: {error}'}), 400
+
+    plan   = get_grading_plan(task_id)
+    grades = grade_class(plan, [entry['answers'] for entry in entries])
+    results = []
+    for row, entry in enumerate(entries):
+        results.append({
+            'student_id':      entry['student_id'],
+            'total_score':     int(grades.total_score[row]),
+            'correct_count':   int(grades.correct_count[row]),
+            'questions_count': int(grades.questions_count[row]),
+            'correct': {
+                q_id: grades.is_correct(row, int(q_id))
+                for q_id in entry['answers'] if plan.get(int(q_id))
+            }
+        })
+
+    return jsonify({
+        'task_id':   task_id,
+        'max_score': plan.max_score,
+        'engine':    'numpy' if np is not None else 'python',
+        'count':     len(results),
+        'results':   results
+    }), 200
+
+def parse_answer_file(text):
+    """Parse a JSON array or JSON-lines answer file; returns (entries, error)"""
+    try:
+        return json.loads(text), None
+    except json.JSONDecodeError:
+        pass
+    entries = []
+    for line_no, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            entries.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            return None, f'line {line_no}: invalid JSON ({e.msg})'
+    return entries, None
+
+def validate_answer_ids(answers):
+    """Return an error message if an answers key is not a question id, else None"""
+    for q_id in answers:
+        try:
+            int(q_id)
+        except ValueError:
+            return f'invalid question id {q_id!r}'
+    return None
+
+def validate_submission(data):
+    """Return an error message if a submit payload is malformed, else None"""
+    if not isinstance(data, dict) or not isinstance(data.get('answers'), dict) or not data.get('student_id'):
+        return 'student_id and answers required'
+    return None
+
+def process_submission(task_id, data):
+    """Grade a submission and record its result and achievements.
+
+    Returns (response body, HTTP status); used by the synchronous endpoint and
+    by the asynchronous submission workers.
+    """
     answers    = data.get('answers')
     student_id = data.get('student_id')  # now expects actual student_id (7-digit string)
     started_at = data.get('started_at')  # Task start time
-    
-    if not isinstance(answers, dict) or not student_id:
-        return jsonify({'error': 'student_id and answers required'}), 400
 
     # Get student info for redundant fields
     student = Student.query.filter_by(student_id=student_id).first()
     if not student:
-        return jsonify({'error': 'student not found'}), 404
+        return {'error': 'student not found'}, 404
 
     # Get task info for redundant fields
     task = db.session.get(Task, task_id)
     if not task:
-        return jsonify({'error': 'task not found'}), 404
-
-    total_score     = 0
-    correct_count   = 0
-    questions_count = 0
+        return {'error': 'task not found'}, 404
 
-    # to collect correct answers for frontend
-    correct_answers = {}
-    
-    # to collect per-question results for frontend
-    question_results = []
-
-    # grade each question
-    for q_id_str, selected in answers.items():
-        q_id      = int(q_id_str)
-        question  = db.session.get(Question, q_id)
-        if not question:
-            continue
-        questions_count += 1
-        correct_answers[q_id_str] = question.correct_answer
-        
-        # Handle different question types
-        is_correct = False
-        if question.question_type == 'fill_blank':
-            # Debug logging for fill blank questions
-            question_data = json.loads(question.question_data) if isinstance(question.question_data, str) else question.question_data
-            correct_blank_answers = question_data.get('blank_answers', [])
-            
-            print(f"=== FILL BLANK SCORING DEBUG ===")
-            print(f"Question ID: {question.id}")
-            print(f"User answer type: {type(selected)}")
-            print(f"User answer: {selected}")
-            print(f"Correct answers: {correct_blank_answers}")
-            
-            # Handle fill blank questions - selected should be an array of answers
-            if isinstance(selected, list):
-                print(f"Processing as list with {len(selected)} items vs {len(correct_blank_answers)} expected")
-                # Check if all blanks are correct (case-insensitive comparison)
-                if len(selected) == len(correct_blank_answers):
-                    comparisons = []
-                    for i, (user_answer, correct_answer) in enumerate(zip(selected, correct_blank_answers)):
-                        user_clean = (user_answer or '').strip().lower()
-                        correct_clean = (correct_answer or '').strip().lower()
-                        matches = user_clean == correct_clean
-                        comparisons.append(f"Blank {i+1}: '{user_clean}' == '{correct_clean}' ? {matches}")
-                    
-                    print(f"Comparisons: {comparisons}")
-                    is_correct = all(
-                        (user_answer or '').strip().lower() == (correct_answer or '').strip().lower()
-                        for user_answer, correct_answer in zip(selected, correct_blank_answers)
-                    )
-                else:
-                    print(f"Length mismatch: got {len(selected)} answers, expected {len(correct_blank_answers)}")
-            else:
-                print(f"ERROR: Expected list but got {type(selected)}: {selected}")
-            
-            print(f"Final result: is_correct = {is_correct}")
-            print("=== END FILL BLANK DEBUG ===")
-        elif question.question_type == 'multiple_choice':
-            # Handle Multiple Choice questions - selected should be an array of indices
-            try:
-                question_data = json.loads(question.question_data) if isinstance(question.question_data, str) else question.question_data
-                correct_indices = question_data.get('correct_answers', [])
-                
-                print(f"=== MULTIPLE CHOICE SCORING DEBUG ===")
-                print(f"Question ID: {question.id}")
-                print(f"User answer type: {type(selected)}")
-                print(f"User answer: {selected}")
-                print(f"Correct indices: {correct_indices}")
-                
-                # Check if user answer is a list and matches correct answers
-                if isinstance(selected, list):
-                    # Sort both arrays for comparison (order doesn't matter)
-                    user_sorted = sorted(selected) if selected else []
-                    correct_sorted = sorted(correct_indices) if correct_indices else []
-                    is_correct = user_sorted == correct_sorted
-                    print(f"Sorted user: {user_sorted}, Sorted correct: {correct_sorted}")
-                    print(f"Is correct: {is_correct}")
-                else:
-                    print(f"ERROR: Expected list but got {type(selected)}")
-                
-                print("=== END MULTIPLE CHOICE DEBUG ===")
-            except (json.JSONDecodeError, TypeError, KeyError) as e:
-                print(f"Error parsing multiple choice question data: {e}")
-                is_correct = False
-        elif question.question_type == 'puzzle_game':
-            # Handle Puzzle Game questions - selected should be an array of fragments
-            try:
-                question_data = json.loads(question.question_data) if isinstance(question.question_data, str) else question.question_data
-                correct_solution = question_data.get('puzzle_solution', '') or question.puzzle_solution or ''
-                
-                print(f"=== PUZZLE GAME SCORING DEBUG ===")
-                print(f"Question ID: {question.id}")
-                print(f"User answer type: {type(selected)}")
-                print(f"User answer: {selected}")
-                print(f"Correct solution: {correct_solution}")
-                
-                if isinstance(selected, list):
-                    # Join the fragments to form the solution
-                    user_solution = ' '.join(selected).strip()
-                    print(f"User solution (joined): '{user_solution}'")
-                    
-                    # Multiple validation approaches for puzzle games
-                    # 1. Exact match
-                    is_correct = user_solution == correct_solution.strip()
-                    print(f"Exact match: {is_correct}")
-                    
-                    # 2. If exact match fails, try without spaces (for math/chemistry)
-                    if not is_correct:
-                        user_no_spaces = user_solution.replace(' ', '')
-                        correct_no_spaces = correct_solution.replace(' ', '')
-                        is_correct = user_no_spaces == correct_no_spaces
-                        print(f"No spaces match: '{user_no_spaces}' == '{correct_no_spaces}' ? {is_correct}")
-                    
-                    # 3. For chemistry reactions, normalize arrow formats
-                    if not is_correct and ('→' in correct_solution or '->' in correct_solution or '=>' in correct_solution):
-                        user_normalized = user_solution.replace('->', '→').replace('=>', '→').replace('=', '→').strip()
-                        correct_normalized = correct_solution.replace('->', '→').replace('=>', '→').replace('=', '→').strip()
-                        is_correct = user_normalized == correct_normalized
-                        print(f"Chemistry normalized: '{user_normalized}' == '{correct_normalized}' ? {is_correct}")
-                    
-                    # 4. Case-insensitive comparison as fallback
-                    if not is_correct:
-                        is_correct = user_solution.lower() == correct_solution.lower()
-                        print(f"Case insensitive: {is_correct}")
-                        
-                else:
-                    print(f"ERROR: Expected list but got {type(selected)}")
-                
-                print(f"Final result: is_correct = {is_correct}")
-                print("=== END PUZZLE GAME DEBUG ===")
-                
-            except (json.JSONDecodeError, TypeError, KeyError) as e:
-                print(f"Error parsing puzzle game question data: {e}")
-                is_correct = False
-                
-        elif question.question_type == 'matching_task':
-            # Handle Matching Task questions - selected should be an object with matches
-            try:
-                question_data = json.loads(question.question_data) if isinstance(question.question_data, str) else question.question_data
-                correct_matches = question_data.get('correct_matches', [])
-                
-                print(f"=== MATCHING TASK SCORING DEBUG ===")
-                print(f"Question ID: {question.id}")
-                print(f"User answer type: {type(selected)}")
-                print(f"User answer: {selected}")
-                print(f"Correct matches: {correct_matches}")
-                
-                if isinstance(selected, dict) and isinstance(correct_matches, list):
-                    # Check if all correct matches are present in user's answer
-                    all_correct = True
-                    for correct_match in correct_matches:
-                        left_idx = correct_match.get('left')
-                        right_idx = correct_match.get('right')
-                        
-                        # Convert indices to strings for comparison (frontend sends string keys)
-                        user_match = selected.get(str(left_idx))
-                        if user_match != right_idx:
-                            print(f"Mismatch: left {left_idx} should match right {right_idx}, but user matched {user_match}")
-                            all_correct = False
-                            break
-                    
-                    # Also check that user didn't make extra incorrect matches
-                    if all_correct and len(selected) == len(correct_matches):
-                        is_correct = True
-                    elif all_correct:
-                        # User made all correct matches but may have extra ones - check if extras are wrong
-                        for user_left, user_right in selected.items():
-                            expected_match = next((cm for cm in correct_matches if cm['left'] == int(user_left)), None)
-                            if expected_match and expected_match['right'] != user_right:
-                                all_correct = False
-                                break
-                        is_correct = all_correct
-                    
-                    print(f"All matches correct: {is_correct}")
-                    
-                else:
-                    print(f"ERROR: Expected dict for user answer and list for correct matches")
-                    print(f"Got user type: {type(selected)}, correct type: {type(correct_matches)}")
-                
-                print(f"Final result: is_correct = {is_correct}")
-                print("=== END MATCHING TASK DEBUG ===")
-                
-            except (json.JSONDecodeError, TypeError, KeyError) as e:
-                print(f"Error parsing matching task question data: {e}")
-                is_correct = False
-                
-        elif question.question_type == 'single_choice':
-            # Handle Single Choice questions - selected is a string
-            if isinstance(selected, str) and selected.upper() == question.correct_answer:
-                is_correct = True
-        else:
-            # Handle other question types with generic string comparison
-            if isinstance(selected, str) and selected.upper() == question.correct_answer:
-                is_correct = True
-        
-        if is_correct:
-            total_score   += question.score
-            correct_count += 1
-        
-        # Add per-question result
-        question_results.append({
-            'question_id': question.id,
-            'is_correct': is_correct,
-            'score': question.score if is_correct else 0,
-            'user_answer': selected
-        })
+    # grade against the compiled answer keys of the task (cached per task)
+    plan   = get_grading_plan(task_id)
+    graded = grade_submission(plan, answers)
+    total_score     = graded.total_score
+    correct_count   = graded.correct_count
+    questions_count = graded.questions_count
 
     # Parse start time
     task_started_at = None
@@ -242,150 +180,65 @@ def submit_task(task_id):
         except:
             task_started_at = None
 
-    # insert or update the student's task result
+    # the previous result (locked until commit where supported) is needed to replace
+    # its contribution to the student's running aggregates; the aggregates row is
+    # locked first so a concurrent first submission can't be counted twice
+    stats = lock_student_stats(student_id)
     existing = StudentTaskResult.query.filter_by(
         student_id=student_id, task_id=task_id
-    ).first()
+    ).with_for_update().first()
+    apply_submission(stats, existing, questions_count, correct_count, total_score, plan.max_score)
 
+    # insert or update the student's task result in one statement (unique per student and task)
     current_time = datetime.now(timezone.utc)
-    if existing:
-        existing.total_score   = total_score
-        existing.completed_at  = current_time
-        existing.student_name  = student.real_name  # update redundant field
-        existing.task_name     = task.name          # update redundant field
-        if task_started_at:
-            existing.started_at = task_started_at
-    else:
-        new_result = StudentTaskResult(
-            student_id   = student_id,
-            student_name = student.real_name,  # redundant field
-            task_id      = task_id,
-            task_name    = task.name,          # redundant field
-            total_score  = total_score,
-            started_at   = task_started_at,
-            completed_at = current_time
-        )
-        db.session.add(new_result)
-
-    # Check all achievements
-    new_achievements = []
-    
-    # 1. Perfect Score - All questions in a single task are answered correctly
-    if correct_count == questions_count and questions_count > 0:
-        perfect_score_achievement = Achievement.query.filter_by(name='Perfect Score').first()
-        if perfect_score_achievement:
-            existing_achievement = StudentAchievement.query.filter_by(
-                student_id=student_id, achievement_id=perfect_score_achievement.id
-            ).first()
-            if not existing_achievement:
-                sa = StudentAchievement(
-                    student_id=student_id,
-                    student_name=student.real_name,
-                    achievement_id=perfect_score_achievement.id,
-                    achievement_name=perfect_score_achievement.name,
-                    unlocked_at=current_time
-                )
-                db.session.add(sa)
-                new_achievements.append({'id': perfect_score_achievement.id, 'name': perfect_score_achievement.name})
-
-    # 2. Fast Solver - Complete tasks quickly (set to complete within 10 minutes)
-    if task_started_at and current_time:
-        time_taken = (current_time - task_started_at).total_seconds() / 60  # Convert to minutes
-        if time_taken <= 10:  # Complete within 10 minutes
-            fast_solver_achievement = Achievement.query.filter_by(name='Fast Solver').first()
-            if fast_solver_achievement:
-                existing_achievement = StudentAchievement.query.filter_by(
-                    student_id=student_id, achievement_id=fast_solver_achievement.id
-                ).first()
-                if not existing_achievement:
-                    sa = StudentAchievement(
-                        student_id=student_id,
-                        student_name=student.real_name,
-                        achievement_id=fast_solver_achievement.id,
-                        achievement_name=fast_solver_achievement.name,
-                        unlocked_at=current_time
-                    )
-                    db.session.add(sa)
-                    new_achievements.append({'id': fast_solver_achievement.id, 'name': fast_solver_achievement.name})
-
-    db.session.commit()
-
-    # 3. Accuracy Master - Overall accuracy rate reaches 90% or more (needs to be calculated after commit)
-    all_results = StudentTaskResult.query.filter_by(student_id=student_id).all()
-    total_questions = 0
-    total_correct = 0
-    
-    for result in all_results:
-        task_questions = Question.query.filter_by(task_id=result.task_id).all()
-        task_total_score = sum(q.score for q in task_questions)
-        
-        if task_total_score > 0:
-            # Calculate the number of correct questions for this task
-            task_correct_ratio = result.total_score / task_total_score
-            task_question_count = len(task_questions)
-            
-            total_questions += task_question_count
-            total_correct += int(task_correct_ratio * task_question_count)
-    
-    if total_questions > 0:
-        accuracy_rate = (total_correct / total_questions) * 100
-        if accuracy_rate >= 90:
-            accuracy_master_achievement = Achievement.query.filter_by(name='Accuracy Master').first()
-            if accuracy_master_achievement:
-                existing_achievement = StudentAchievement.query.filter_by(
-                    student_id=student_id, achievement_id=accuracy_master_achievement.id
-                ).first()
-                if not existing_achievement:
-                    sa = StudentAchievement(
-                        student_id=student_id,
-                        student_name=student.real_name,
-                        achievement_id=accuracy_master_achievement.id,
-                        achievement_name=accuracy_master_achievement.name,
-                        unlocked_at=current_time
-                    )
-                    db.session.add(sa)
-                    new_achievements.append({'id': accuracy_master_achievement.id, 'name': accuracy_master_achievement.name})
-
-    # 4. Quiz Warrior - Complete all four tasks
-    completed_task_count = len(all_results)
-    total_task_count = Task.query.count()
-    
-    if completed_task_count >= total_task_count and total_task_count >= 4:
-        quiz_warrior_achievement = Achievement.query.filter_by(name='Quiz Warrior').first()
-        if quiz_warrior_achievement:
-            existing_achievement = StudentAchievement.query.filter_by(
-                student_id=student_id, achievement_id=quiz_warrior_achievement.id
-            ).first()
-            if not existing_achievement:
-                sa = StudentAchievement(
-                    student_id=student_id,
-                    student_name=student.real_name,
-                    achievement_id=quiz_warrior_achievement.id,
-                    achievement_name=quiz_warrior_achievement.name,
-                    unlocked_at=current_time
-                )
-                db.session.add(sa)
-                new_achievements.append({'id': quiz_warrior_achievement.id, 'name': quiz_warrior_achievement.name})
-
-    db.session.commit()
-
-    # Delete progress record after task completion
+    upsert(StudentTaskResult, {
+        'student_id':     student_id,
+        'student_name':   student.real_name,  # redundant field
+        'task_id':        task_id,
+        'task_name':      task.name,          # redundant field
+        'total_score':    total_score,
+        'question_count': questions_count,
+        'correct_count':  correct_count,
+        'max_score':      plan.max_score,
+        'answers_json':   json.dumps(answers),
+        'started_at':     task_started_at,
+        'completed_at':   current_time
+    }, index_elements=['student_id', 'task_id'], keep_existing=['started_at'])
+
+    # per-question rows for exact analytics, replacing those of a previous submission
+    record_answers(student_id, task_id, graded, current_time)
+
+    # Evaluate every achievement rule in one pass, in the same transaction as the result
+    db.session.flush()
+    metrics = Metrics(
+        questions_count=questions_count,
+        correct_count=correct_count,
+        total_score=total_score,
+        max_score=plan.max_score,
+        minutes_taken=(current_time - task_started_at).total_seconds() / 60 if task_started_at else None,
+        questions_answered=lambda: stats.questions_answered,
+        accuracy_rate=lambda: (stats.correct_count / stats.questions_answered * 100) if stats.questions_answered > 0 else None,
+        tasks_completed=lambda: stats.tasks_completed,
+        total_tasks=lambda: Task.query.count()
+    )
+    new_achievements = evaluate_achievements(student_id, student.real_name, metrics, current_time)
+
+    # The task is complete, so its saved progress goes in the same transaction; a
+    # savepoint keeps a failed delete from losing the result
+    discard_progress(student_id, task_id)
     try:
-        progress_record = StudentTaskProcess.query.filter_by(
-            student_id=student_id, task_id=task_id
-        ).first()
-        if progress_record:
-            db.session.delete(progress_record)
-            db.session.commit()
+        with db.session.begin_nested():
+            StudentTaskProcess.query.filter_by(student_id=student_id, task_id=task_id).delete(synchronize_session=False)
     except Exception as e:
-        # Progress deletion failure does not affect main process
         print(f"Warning: Failed to delete progress record: {str(e)}")
 
+    db.session.commit()
+
     # return score, new achievements, correct answers, and per-question results
-    return jsonify({
+    return {
         'total_score':     total_score,
         'new_achievements': new_achievements,
-        'correct_answers':  correct_answers,
-        'results':         question_results
-    }), 200
+        'correct_answers':  graded.correct_answers,
+        'results':         graded.results
+    }, 200
 
@@ -0,0 +1,55 @@
+"""
+Task Content Versions for the Escape Room Application
+"""
+import hashlib
+from datetime import datetime, timezone
+from flask import request
+from models import db, Task
+from http_cache import is_not_modified, not_modified, with_etag
+from payload_cache import invalidate_task_payloads
+
+
+def bump_task_content(task_id):
+    """Record that a task's content (task fields or questions) changed; runs in the caller's transaction"""
+    Task.query.filter_by(id=task_id).update({
+        'content_version': Task.content_version + 1,
+        'content_updated_at': datetime.now(timezone.utc)
+    }, synchronize_session=False)
+    invalidate_task_payloads(task_id)  # entries are version-tagged; this only frees the memory
+
+
+def content_state(task_id):
+    """(content_version, content_updated_at) of a task, or None if it does not exist"""
+    return db.session.query(Task.content_version, Task.content_updated_at).filter_by(id=task_id).first()
+
+
+def task_etag(task_id, view, version):
+    """Entity tag of one representation (`view`) of a task's content"""
+    return f'task-{task_id}-{view}-v{version}'
+
+
+def task_list_etag(view, versions):
+    """Entity tag of a task list from its (task id, content_version) pairs"""
+    digest = hashlib.sha1(','.join(f'{i}:{v}' for i, v in versions).encode('ascii')).hexdigest()[:20]
+    return f'tasks-{view}-{digest}'
+
+
+def task_not_modified(task_id, view):
+    """304 response if the request's validators match the task's current content, else None.
+
+    Reads only the version columns, so a current client costs one small query.
+    """
+    if not (request.if_none_match or request.if_modified_since):
+        return None
+    state = content_state(task_id)
+    if state is None:
+        return None
+    etag = task_etag(task_id, view, state.content_version)
+    if is_not_modified(etag, state.content_updated_at):
+        return not_modified(etag, state.content_updated_at)
+    return None
+
+
+def with_task_validators(response, task, view):
+    """Attach the ETag and Last-Modified of a task's content to a response"""
+    return with_etag(response, task_etag(task.id, view, task.content_version), task.content_updated_at)
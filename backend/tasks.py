@@ -2,10 +2,24 @@
 Task Management Routes for the Escape Room Application
 """
 import os
-import json
 from datetime import datetime, timezone
-from flask import Blueprint, request, jsonify, current_app, send_from_directory, abort
+from flask import Blueprint, request, jsonify, current_app, send_from_directory, abort, stream_with_context
 from models import db, Task, Question, StudentTaskProcess, StudentTaskResult, Achievement, StudentAchievement, Student
+from grading import invalidate_grading_plan
+from student_stats import drop_stats_for_task
+from question_answers import delete_answers
+from idempotency import idempotent
+from upserts import upsert
+from progress_buffer import (progress_write_behind_enabled, get_progress_buffer, flush_progress, discard_progress,
+                             apply_answer_changes, VersionConflict)
+from http_cache import (ANY_VERSION, version_etag, is_not_modified, not_modified, expected_version,
+                        precondition_failed, with_etag)
+from answers_codec import ANSWERS_COLUMNS, answers_columns, load_answers
+from payload_cache import invalidate_task_payloads
+from singleflight import get_single_flight
+from task_content import bump_task_content, task_list_etag, task_not_modified, with_task_validators
+from question_export import iter_export_ndjson, iter_export_zip
+from question_search import unindex_task
 
 tasks_bp = Blueprint('tasks', __name__, url_prefix='/api')
 
@@ -14,20 +28,45 @@ def get_tasks():
     role = request.args.get('role', 'stu')  # Default to student
     now = datetime.now(timezone.utc)
 
-    if role == 'tea':
-        tasks = Task.query.all()  # Teachers see all tasks
-    else:
-        tasks = Task.query.filter(
-            (Task.publish_at == None) | (Task.publish_at <= now)
-        ).all()
+    view = 'tea' if role == 'tea' else 'stu'
+
+    # A client revalidating its copy is answered from task ids and versions alone
+    if request.if_none_match:
+        etag = task_list_etag(view, db.session.query(Task.id, Task.content_version)
+                              .filter(*_visible_tasks(view, now)).order_by(Task.id).all())
+        if is_not_modified(etag):
+            return not_modified(etag)
+
+    # Concurrent identical requests (a class opening the page together) share one build
+    payload, etag = get_single_flight().do(('tasks', view), _task_list, view, now)
+    response = current_app.response_class(payload, mimetype=current_app.json.mimetype)
+    return with_etag(response, etag), 200
+
+def _visible_tasks(view, now):
+    """Filter for the tasks a role may list: teachers see all, students published ones"""
+    if view == 'tea':
+        return []
+    return [(Task.publish_at == None) | (Task.publish_at <= now)]
+
+def _task_list(view, now):
+    """Serialized task list and its ETag"""
+    # Question counts come from one grouped subquery instead of loading each task's questions
+    question_counts = db.session.query(
+        Question.task_id, db.func.count(Question.id).label('question_count')
+    ).group_by(Question.task_id).subquery()
+    query = db.session.query(Task, db.func.coalesce(question_counts.c.question_count, 0)).outerjoin(
+        question_counts, question_counts.c.task_id == Task.id
+    ).filter(*_visible_tasks(view, now)).order_by(Task.id)
 
     result = []
-    for t in tasks:
+    versions = []
+    for t, question_count in query.all():
+        versions.append((t.id, t.content_version))
         task_data = {
             'id': t.id, 
             'name': t.name,
             'introduction': t.introduction,
-            'question_count': len(t.questions),
+            'question_count': question_count,
             'publish_at': t.publish_at.isoformat() if t.publish_at else None
         }
         if t.image_path:
@@ -42,7 +81,7 @@ def get_tasks():
                 task_data['video_url'] = t.video_url
         
         result.append(task_data)
-    return jsonify(result), 200
+    return jsonify(result).get_data(), task_list_etag(view, versions)
 
 @tasks_bp.route('/tasks', methods=['POST'])
 def create_task():
@@ -97,6 +136,9 @@ def create_task():
 @tasks_bp.route('/tasks/<int:task_id>', methods=['GET'])
 def get_task_detail(task_id):
     """Get task details"""
+    unchanged = task_not_modified(task_id, 'detail')
+    if unchanged is not None:
+        return unchanged
     task = db.session.get(Task, task_id)
     if not task:
         abort(404)
@@ -104,7 +146,7 @@ def get_task_detail(task_id):
         'id': task.id,
         'name': task.name,
         'introduction': task.introduction,
-        'question_count': len(task.questions),
+        'question_count': db.session.query(db.func.count(Question.id)).filter_by(task_id=task_id).scalar(),
         'publish_at': task.publish_at.isoformat() if task.publish_at else None
     }
     if task.image_path:
@@ -119,7 +161,35 @@ def get_task_detail(task_id):
         elif task.video_type == 'youtube' and task.video_url:
             result['video_url'] = task.video_url
     
-    return jsonify(result), 200
+    return with_task_validators(jsonify(result), task, 'detail'), 200
+
+@tasks_bp.route('/tasks/export', methods=['GET'])
+def export_all_tasks():
+    """Stream every task and its questions as NDJSON (?format=zip adds the media files)"""
+    return _export_response(None, 'tasks_export')
+
+@tasks_bp.route('/tasks/<int:task_id>/export', methods=['GET'])
+def export_task(task_id):
+    """Stream one task and its questions as NDJSON (?format=zip adds the media files)"""
+    if not db.session.get(Task, task_id):
+        abort(404)
+    return _export_response(task_id, f'task_{task_id}_export')
+
+def _export_response(task_id, basename):
+    # The export carries the answer keys
+    if request.args.get('role', 'stu') != 'tea':
+        return jsonify({'error': 'Only teachers can export questions'}), 403
+    
+    if request.args.get('format') == 'zip':
+        include_media = request.args.get('media', 'true').lower() != 'false'
+        chunks, mimetype, filename = iter_export_zip(task_id, include_media), 'application/zip', f'{basename}.zip'
+    else:
+        chunks, mimetype, filename = iter_export_ndjson(task_id), 'application/x-ndjson', f'{basename}.ndjson'
+    
+    # No Content-Length: the body is sent chunked as the rows are read
+    response = current_app.response_class(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response, 200
 
 @tasks_bp.route('/tasks/<int:task_id>', methods=['PUT'])
 def update_task(task_id):
@@ -160,6 +230,7 @@ def update_task(task_id):
             task.video_url = None
     
     try:
+        bump_task_content(task_id)
         db.session.commit()
         # Build return task information, including video information
         task_response = {
@@ -196,10 +267,13 @@ def delete_task(task_id):
     try:
         # Start transaction - cascade delete related data
         
-        # 1. Delete student task progress
+        # 1. Delete student task progress (including autosaves not yet written)
+        discard_progress(task_id=task_id)
         StudentTaskProcess.query.filter_by(task_id=task_id).delete()
         
-        # 2. Delete student task results
+        # 2. Delete student task results (and the aggregates built from them)
+        drop_stats_for_task(task_id)
+        delete_answers(task_id=task_id)
         StudentTaskResult.query.filter_by(task_id=task_id).delete()
         
         # 3. Delete related achievement records (if achievement is task-specific)
@@ -211,6 +285,7 @@ def delete_task(task_id):
             db.session.delete(achievement)
         
                 # 4. Delete all questions for the task
+        unindex_task(task_id)
         Question.query.filter_by(task_id=task_id).delete()
         
         # 5. Finally delete the task itself
@@ -218,6 +293,8 @@ def delete_task(task_id):
         
         # Commit transaction
         db.session.commit()
+        invalidate_grading_plan(task_id)
+        invalidate_task_payloads(task_id)
         
         return jsonify({
             'message': 'Task deleted successfully',
@@ -229,16 +306,38 @@ def delete_task(task_id):
         return jsonify({'error': f'Failed to delete task: {str(e)}'}), 500
 
 # Task Progress Routes
+def _progress_version(student_id, task_id):
+    return db.session.query(StudentTaskProcess.version).filter_by(student_id=student_id, task_id=task_id).scalar()
+
+def _stale_progress(student_id, task_id, version=None):
+    """412 for a save whose If-Match names an outdated progress version"""
+    if version is None:
+        version = _progress_version(student_id, task_id)
+    return precondition_failed(version_etag('progress', version) if version is not None else None)
+
 @tasks_bp.route('/tasks/<int:task_id>/save-progress', methods=['POST'])
+@idempotent
 def save_task_progress(task_id):
     data = request.get_json()
     student_id = data.get('student_id')
     current_question_index = data.get('current_question_index', 0)
     answers = data.get('answers', {})
+    expected = expected_version('progress')  # If-Match: only overwrite the version the client has seen
     
     if not student_id:
         return jsonify({'error': 'student_id required'}), 400
     
+    # Write-behind mode: keep only the latest autosave in memory, written in batches
+    if progress_write_behind_enabled():
+        try:
+            version = get_progress_buffer().put(student_id, task_id, current_question_index, answers, expected)
+        except VersionConflict as e:
+            return _stale_progress(student_id, task_id, e.version)
+        response = jsonify({'message': 'Progress saved successfully', 'buffered': True})
+        if version is not None:
+            with_etag(response, version_etag('progress', version))
+        return response, 200
+    
     # Get student and task information
     student = Student.query.filter_by(student_id=student_id).first()
     if not student:
@@ -248,33 +347,130 @@ def save_task_progress(task_id):
     if not task:
         return jsonify({'error': 'task not found'}), 404
     
-    # Find existing progress record
-    existing_process = StudentTaskProcess.query.filter_by(
-        student_id=student_id, task_id=task_id
-    ).first()
+    try:
+        now = datetime.now(timezone.utc)
+        if expected not in (None, 0):
+            # Conditional overwrite of the version named by If-Match, checked in the UPDATE itself
+            query = StudentTaskProcess.query.filter_by(student_id=student_id, task_id=task_id)
+            if expected != ANY_VERSION:
+                query = query.filter_by(version=expected)
+            updated = query.update({
+                'current_question_index': current_question_index,
+                **answers_columns(answers),
+                'updated_at': now,
+                'version': StudentTaskProcess.version + 1
+            }, synchronize_session=False)
+            if not updated:
+                db.session.rollback()
+                return _stale_progress(student_id, task_id)
+            version = _progress_version(student_id, task_id)
+            db.session.commit()
+            return with_etag(jsonify({'message': 'Progress saved successfully'}), version_etag('progress', version)), 200
+        
+        if expected == 0 and _progress_version(student_id, task_id) is not None:
+            # If-Match "progress-v0": only create progress that does not exist yet
+            return _stale_progress(student_id, task_id)
+        
+        # Insert or update the progress record in one statement (unique per student and task)
+        version = upsert(StudentTaskProcess, {
+            'student_id': student_id,
+            'student_name': student.real_name,
+            'task_id': task_id,
+            'task_name': task.name,
+            'current_question_index': current_question_index,
+            **answers_columns(answers),
+            'saved_at': now,
+            'updated_at': now,
+            'version': 1
+        }, index_elements=['student_id', 'task_id'],
+           update=['current_question_index', *ANSWERS_COLUMNS, 'updated_at'], increments=['version'],
+           returning='version')
+        
+        db.session.commit()
+        return with_etag(jsonify({'message': 'Progress saved successfully'}), version_etag('progress', version)), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Failed to save progress: {str(e)}'}), 500
+
+@tasks_bp.route('/tasks/<int:task_id>/progress', methods=['PATCH'])
+@idempotent
+def patch_task_progress(task_id):
+    """Save only the answers that changed since the last save.
+
+    Body: student_id, answers ({question id: answer}, null removes an answer),
+    optional current_question_index and base_version. Returns the new version;
+    a base_version other than the current one is rejected with 409, an If-Match
+    header naming another version with 412.
+    """
+    data = request.get_json(silent=True) or {}
+    student_id = data.get('student_id')
+    changes = data.get('answers', {})
+    current_question_index = data.get('current_question_index')
+    base_version = data.get('base_version')
+    expected = expected_version('progress')
+    
+    if not student_id:
+        return jsonify({'error': 'student_id required'}), 400
+    if not isinstance(changes, dict):
+        return jsonify({'error': 'answers must be an object'}), 400
+    
+    if progress_write_behind_enabled():
+        try:
+            version = get_progress_buffer().patch(student_id, task_id, changes, current_question_index,
+                                                  expected if expected is not None else base_version)
+        except VersionConflict as e:
+            if expected is not None:
+                return _stale_progress(student_id, task_id, e.version)
+            return jsonify({'error': 'progress has changed', 'version': e.version}), 409
+        response = jsonify({'message': 'Progress saved successfully', 'version': version, 'buffered': True})
+        return with_etag(response, version_etag('progress', version)), 200
     
     try:
-        if existing_process:
-            # Update existing record
-            existing_process.current_question_index = current_question_index
-            existing_process.answers_json = json.dumps(answers)
-            existing_process.updated_at = datetime.now(timezone.utc)
-        else:
-            # Create new record
-            new_process = StudentTaskProcess(
+        process = StudentTaskProcess.query.filter_by(
+            student_id=student_id, task_id=task_id
+        ).with_for_update().first()
+        
+        current = process.version if process else 0
+        if expected is not None and (current == 0 if expected == ANY_VERSION else current != expected):
+            db.session.rollback()
+            return _stale_progress(student_id, task_id, current)
+        
+        if process is None:
+            student = Student.query.filter_by(student_id=student_id).first()
+            if not student:
+                return jsonify({'error': 'student not found'}), 404
+            task = db.session.get(Task, task_id)
+            if not task:
+                return jsonify({'error': 'task not found'}), 404
+            if base_version not in (None, 0):
+                return jsonify({'error': 'progress has changed', 'version': 0}), 409
+            now = datetime.now(timezone.utc)
+            process = StudentTaskProcess(
                 student_id=student_id,
                 student_name=student.real_name,
                 task_id=task_id,
                 task_name=task.name,
-                current_question_index=current_question_index,
-                answers_json=json.dumps(answers),
-                saved_at=datetime.now(timezone.utc),
-                updated_at=datetime.now(timezone.utc)
+                current_question_index=current_question_index or 0,
+                **answers_columns(apply_answer_changes({}, changes)),
+                version=1,
+                saved_at=now,
+                updated_at=now
             )
-            db.session.add(new_process)
+            db.session.add(process)
+        else:
+            if base_version is not None and base_version != process.version:
+                return jsonify({'error': 'progress has changed', 'version': process.version}), 409
+            for column, value in answers_columns(apply_answer_changes(load_answers(process), changes)).items():
+                setattr(process, column, value)
+            if current_question_index is not None:
+                process.current_question_index = current_question_index
+            process.version = process.version + 1
+            process.updated_at = datetime.now(timezone.utc)
         
         db.session.commit()
-        return jsonify({'message': 'Progress saved successfully'}), 200
+        response = jsonify({'message': 'Progress saved successfully', 'version': process.version})
+        return with_etag(response, version_etag('progress', process.version)), 200
         
     except Exception as e:
         db.session.rollback()
@@ -287,6 +483,20 @@ def get_task_progress(task_id):
     if not student_id:
         return jsonify({'error': 'student_id required'}), 400
     
+    # Write out a buffered autosave first so the latest state is read
+    try:
+        flush_progress(student_id, task_id)
+    except Exception as e:
+        # The buffer keeps the autosave for its next flush; serve what is stored
+        print(f"Warning: Serving stored progress of student {student_id} for task {task_id}, "
+              f"buffered autosave not written: {str(e)}")
+    
+    # Client already has the current version: answer 304 after reading only the version
+    if request.if_none_match:
+        version = _progress_version(student_id, task_id)
+        if version is not None and is_not_modified(version_etag('progress', version)):
+            return not_modified(version_etag('progress', version))
+    
     # Find progress record
     process = StudentTaskProcess.query.filter_by(
         student_id=student_id, task_id=task_id
@@ -296,14 +506,16 @@ def get_task_progress(task_id):
         return jsonify({'has_progress': False}), 200
     
     try:
-        answers = json.loads(process.answers_json) if process.answers_json else {}
-        return jsonify({
+        answers = load_answers(process)
+        response = jsonify({
             'has_progress': True,
             'current_question_index': process.current_question_index,
             'answers': answers,
+            'version': process.version,
             'saved_at': process.saved_at.isoformat(),
             'updated_at': process.updated_at.isoformat()
-        }), 200
+        })
+        return with_etag(response, version_etag('progress', process.version)), 200
     except Exception as e:
         return jsonify({'error': f'Failed to load progress: {str(e)}'}), 500
 
@@ -315,6 +527,8 @@ def delete_task_progress(task_id):
         return jsonify({'error': 'student_id required'}), 400
     
     try:
+        discard_progress(student_id, task_id)
+        
         # Find and delete progress record
         process = StudentTaskProcess.query.filter_by(
             student_id=student_id, task_id=task_id
@@ -372,6 +586,7 @@ def upload_task_video(task_id):
         task.video_path = filename
         task.video_type = 'local'
         task.video_url = f'/uploads/videos/{filename}'  # Set local video access path
+        bump_task_content(task_id)
         db.session.commit()
         
         return jsonify({
@@ -405,6 +620,7 @@ def save_youtube_url(task_id):
         task.video_url = youtube_url
         task.video_type = 'youtube'
         task.video_path = None  # Clear local video path
+        bump_task_content(task_id)
         db.session.commit()
         
         return jsonify({
@@ -435,6 +651,7 @@ def delete_task_video(task_id):
         task.video_path = None
         task.video_url = None
         task.video_type = None
+        bump_task_content(task_id)
         
         db.session.commit()
         
@@ -0,0 +1,105 @@
+"""
+Dialect-Native Upserts for the Escape Room Application
+"""
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db
+
+_DIALECT_INSERTS = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+
+def _dialect_insert():
+    return _DIALECT_INSERTS.get(db.session.get_bind().dialect.name)
+
+
+def upsert(model, values, index_elements, update=None, keep_existing=(), increments=(), returning=None):
+    """Insert a row or update the existing row with the same index_elements.
+
+    `update` lists the columns overwritten on conflict (default: every value not
+    in index_elements); columns in `keep_existing` keep their stored value when
+    the new value is NULL, and columns in `increments` are added to the stored
+    value. With `returning`, the written value of that column is returned. Runs
+    in the caller's transaction.
+    """
+    if returning is None:
+        return upsert_many(model, [values], index_elements, update, keep_existing, increments)
+
+    insert = _dialect_insert()
+    if insert is None:
+        upsert_many(model, [values], index_elements, update, keep_existing, increments)
+        db.session.flush()
+        return db.session.query(getattr(model, returning)).filter_by(
+            **{c: values[c] for c in index_elements}).scalar()
+    stmt = insert(model).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_=_conflict_updates(model, stmt, _update_columns(values, index_elements, update, increments),
+                               keep_existing, increments)
+    ).returning(getattr(model, returning))
+    return db.session.execute(stmt).scalar()
+
+
+def _update_columns(values, index_elements, update, increments):
+    columns = [c for c in (update or values) if c not in index_elements]
+    return columns + [c for c in increments if c not in columns]
+
+
+def _conflict_updates(model, stmt, update, keep_existing, increments):
+    set_ = {}
+    for column in update:
+        if column in increments:
+            set_[column] = getattr(model, column) + stmt.excluded[column]
+        elif column in keep_existing:
+            set_[column] = db.func.coalesce(stmt.excluded[column], getattr(model, column))
+        else:
+            set_[column] = stmt.excluded[column]
+    return set_
+
+
+def upsert_many(model, rows, index_elements, update=None, keep_existing=(), increments=()):
+    """upsert() for many rows with the same columns, as one executemany statement"""
+    if not rows:
+        return
+    update = _update_columns(rows[0], index_elements, update, increments)
+    insert = _dialect_insert()
+    if insert is None:
+        for values in rows:
+            _upsert_fallback(model, values, index_elements, update, keep_existing, increments)
+        return
+
+    stmt = insert(model)
+    set_ = _conflict_updates(model, stmt, update, keep_existing, increments)
+    db.session.execute(stmt.on_conflict_do_update(index_elements=index_elements, set_=set_), rows)
+
+
+def insert_ignore(model, rows, index_elements):
+    """Insert rows, skipping any that conflict with an existing row on index_elements; returns how many were inserted"""
+    if not rows:
+        return 0
+    insert = _dialect_insert()
+    if insert is None:
+        inserted = 0
+        for values in rows:
+            if not model.query.filter_by(**{c: values[c] for c in index_elements}).first():
+                db.session.add(model(**values))
+                inserted += 1
+        return inserted
+    # Core execution on the session's connection: the ORM bulk path reports no rowcount
+    stmt = insert(model.__table__).on_conflict_do_nothing(index_elements=index_elements)
+    return db.session.connection().execute(stmt, rows).rowcount
+
+
+def _upsert_fallback(model, values, index_elements, update, keep_existing, increments):
+    existing = model.query.filter_by(**{c: values[c] for c in index_elements}).first()
+    if existing is None:
+        db.session.add(model(**values))
+        return
+    for column in update:
+        if column in increments:
+            setattr(existing, column, getattr(existing, column) + values[column])
+        elif column in keep_existing and values.get(column) is None:
+            continue
+        else:
+            setattr(existing, column, values.get(column))
@@ -61,6 +61,10 @@ def app():
             db.create_all()
             
         yield app
+
+        # Let background jobs started by the test finish before the database goes away
+        from background import shutdown_executors
+        shutdown_executors(app)
             
     finally:
         # Clean up - restore original environment
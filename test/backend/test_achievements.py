@@ -0,0 +1,82 @@
+"""
+Tests for backend/achievements.py
+Coverage focus:
+- Rule compilation (literal and metric-reference conditions, missing metrics)
+- Lazy metrics
+- Unlocking through submit_task, no duplicate unlocks, configurable thresholds
+"""
+
+import json
+from datetime import datetime, timezone, timedelta
+
+from models import db, Task, Question, Achievement, StudentAchievement
+from achievements import Metrics, compile_rule
+
+
+def _setup_task(app, name="Rule Task"):
+    task = Task(name=name)
+    db.session.add(task)
+    db.session.commit()
+    q = Question(task_id=task.id, question="Q?", question_type="single_choice",
+                 option_a="A", option_b="B", correct_answer="A", difficulty="easy", score=3)
+    db.session.add(q)
+    for name in ("Perfect Score", "Fast Solver", "Accuracy Master", "Quiz Warrior"):
+        db.session.add(Achievement(task_id=task.id, name=name, condition=name))
+    db.session.commit()
+    return task.id, q.id
+
+
+def _unlocked_names(student_id):
+    return sorted(sa.achievement_name for sa in StudentAchievement.query.filter_by(student_id=student_id))
+
+
+def test_compile_rule_conditions():
+    _, perfect = compile_rule({"name": "P", "when": [["questions_count", ">", 0],
+                                                     ["correct_count", "==", {"metric": "questions_count"}]]})
+    assert perfect(Metrics(questions_count=3, correct_count=3))
+    assert not perfect(Metrics(questions_count=3, correct_count=2))
+    assert not perfect(Metrics(questions_count=0, correct_count=0))
+
+    _, fast = compile_rule({"name": "F", "when": [["minutes_taken", "<=", 10]]})
+    assert fast(Metrics(minutes_taken=4.5))
+    assert not fast(Metrics(minutes_taken=None))  # missing metric never matches
+
+
+def test_metrics_are_lazy():
+    calls = []
+    metrics = Metrics(total_tasks=lambda: calls.append(1) or 4)
+    assert calls == []
+    assert metrics["total_tasks"] == 4
+    assert metrics["total_tasks"] == 4
+    assert calls == [1]
+
+
+def test_submit_unlocks_once(client, app, test_student):
+    sid = test_student.student_id
+    t_id, q_id = _setup_task(app)
+    payload = {
+        "student_id": sid,
+        "answers": {str(q_id): "A"},
+        "started_at": (datetime.now(timezone.utc) - timedelta(minutes=3)).isoformat(),
+    }
+
+    body = json.loads(client.post(f"/api/tasks/{t_id}/submit", json=payload).data)
+    assert sorted(a["name"] for a in body["new_achievements"]) == ["Accuracy Master", "Fast Solver", "Perfect Score"]
+
+    body = json.loads(client.post(f"/api/tasks/{t_id}/submit", json=payload).data)
+    assert body["new_achievements"] == []
+    assert _unlocked_names(sid) == ["Accuracy Master", "Fast Solver", "Perfect Score"]
+
+
+def test_rules_are_configurable(client, app, test_student):
+    app.config["ACHIEVEMENT_RULES"] = [{"name": "Fast Solver", "when": [["minutes_taken", "<=", 60]]}]
+    sid = test_student.student_id
+    t_id, q_id = _setup_task(app)
+    payload = {
+        "student_id": sid,
+        "answers": {str(q_id): "B"},
+        "started_at": (datetime.now(timezone.utc) - timedelta(minutes=30)).isoformat(),
+    }
+
+    body = json.loads(client.post(f"/api/tasks/{t_id}/submit", json=payload).data)
+    assert [a["name"] for a in body["new_achievements"]] == ["Fast Solver"]
@@ -0,0 +1,113 @@
+"""
+Tests for backend/answers_codec.py
+Coverage focus:
+- Every codec round-trips answers and tags binary payloads
+- Progress routes write the configured codec and read legacy text transparently
+- The chunked migration converts stored rows in both directions, at startup only when enabled
+"""
+
+import json
+
+import pytest
+
+from models import db, Task, StudentTaskProcess
+from answers_codec import encode_answers, decode_answers, migrate_answers_storage, start_answers_migration, msgpack
+
+ANSWERS = {"1": "A", "2": [0, 3], "3": True, "4": ["mole"], "5": "élan vital"}
+
+
+@pytest.mark.parametrize("codec", ["json", "zlib", "msgpack"])
+def test_codecs_round_trip(codec):
+    if codec == "msgpack" and msgpack is None:
+        pytest.skip("msgpack not installed")
+    columns = encode_answers(ANSWERS, codec)
+    assert decode_answers(columns["answers_json"], columns["answers_blob"]) == ANSWERS
+    if codec == "json":
+        assert columns["answers_blob"] is None
+    else:
+        assert columns["answers_json"] is None and columns["answers_blob"][:1] in (b"Z", b"M")
+
+
+def test_decode_legacy_and_empty():
+    assert decode_answers(json.dumps(ANSWERS), None) == ANSWERS
+    assert decode_answers(None, None) == {}
+    with pytest.raises(ValueError):
+        decode_answers(None, b"?garbage")
+
+
+def _task(name="Codec Task"):
+    task = Task(name=name)
+    db.session.add(task)
+    db.session.commit()
+    return task.id
+
+
+def test_progress_routes_use_configured_codec(client, app, test_student):
+    app.config["ANSWERS_CODEC"] = "zlib"
+    sid = test_student.student_id
+    t_id = _task()
+
+    assert client.post(f"/api/tasks/{t_id}/save-progress",
+                       json={"student_id": sid, "current_question_index": 1, "answers": {"1": "A"}}).status_code == 200
+    assert client.patch(f"/api/tasks/{t_id}/progress",
+                        json={"student_id": sid, "answers": {"2": [1, 2]}}).status_code == 200
+
+    process = StudentTaskProcess.query.filter_by(student_id=sid, task_id=t_id).first()
+    assert process.answers_json is None and process.answers_blob.startswith(b"Z")
+    body = json.loads(client.get(f"/api/tasks/{t_id}/progress?student_id={sid}").data)
+    assert body["answers"] == {"1": "A", "2": [1, 2]}
+
+
+def test_legacy_text_is_read_and_replaced(client, app, test_student):
+    app.config["ANSWERS_CODEC"] = "zlib"
+    sid = test_student.student_id
+    t_id = _task()
+    db.session.add(StudentTaskProcess(student_id=sid, student_name=test_student.real_name, task_id=t_id,
+                                      task_name="Codec Task", answers_json=json.dumps({"1": "B"})))
+    db.session.commit()
+
+    body = json.loads(client.get(f"/api/tasks/{t_id}/progress?student_id={sid}").data)
+    assert body["answers"] == {"1": "B"}
+
+    client.patch(f"/api/tasks/{t_id}/progress", json={"student_id": sid, "answers": {"2": "C"}})
+    db.session.expire_all()
+    process = StudentTaskProcess.query.filter_by(student_id=sid, task_id=t_id).first()
+    assert process.answers_json is None
+    assert decode_answers(None, process.answers_blob) == {"1": "B", "2": "C"}
+
+
+def test_migration_converts_rows_in_chunks(app, test_student):
+    sid = test_student.student_id
+    task_ids = [_task(f"Codec Task {i}") for i in range(5)]
+    for index, t_id in enumerate(task_ids):
+        db.session.add(StudentTaskProcess(student_id=sid, student_name=test_student.real_name, task_id=t_id,
+                                          task_name="Codec Task", answers_json=json.dumps({"1": index})))
+    db.session.commit()
+
+    assert migrate_answers_storage("zlib", chunk_size=2) == 5
+    assert migrate_answers_storage("zlib", chunk_size=2) == 0
+    db.session.expire_all()
+    rows = StudentTaskProcess.query.order_by(StudentTaskProcess.id).all()
+    assert all(row.answers_json is None for row in rows)
+    assert [decode_answers(None, row.answers_blob) for row in rows] == [{"1": i} for i in range(5)]
+
+    assert migrate_answers_storage("json", chunk_size=3) == 5
+    db.session.expire_all()
+    rows = StudentTaskProcess.query.order_by(StudentTaskProcess.id).all()
+    assert [json.loads(row.answers_json) for row in rows] == [{"1": i} for i in range(5)]
+    assert all(row.answers_blob is None for row in rows)
+
+
+def test_startup_migration_is_opt_in(app, test_student):
+    app.config["ANSWERS_CODEC"] = "zlib"
+    t_id = _task()
+    db.session.add(StudentTaskProcess(student_id=test_student.student_id, student_name=test_student.real_name,
+                                      task_id=t_id, task_name="Codec Task", answers_json=json.dumps({"1": "A"})))
+    db.session.commit()
+    assert start_answers_migration(app) is None
+
+    app.config["ANSWERS_MIGRATE_ON_STARTUP"] = True
+    start_answers_migration(app).result()
+    db.session.expire_all()
+    process = StudentTaskProcess.query.one()
+    assert process.answers_json is None and decode_answers(None, process.answers_blob) == {"1": "A"}
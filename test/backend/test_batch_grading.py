@@ -0,0 +1,127 @@
+"""
+Tests for backend/batch_grading.py
+Coverage focus:
+- Packed/vectorized grading matches grade_submission exactly, including odd answers
+- Pure-Python path, duplicate question keys, rebuilt GradedSubmission
+- Teacher batch-grade endpoint with JSON array / JSON-lines files and validation
+- Batch-grade is teachers only (403) and rejects answer files over BATCH_GRADE_MAX_BYTES (413)
+"""
+
+import io
+import json
+import random
+
+from models import db, Task, Question
+from grading import GradingPlan, compile_question, compile_grading_plan, grade_submission
+from batch_grading import grade_class
+
+
+def _plan():
+    questions = [
+        Question(id=1, question_type="single_choice", correct_answer="B", score=2),
+        Question(id=2, question_type="single_choice", correct_answer="b", score=1),  # lower-case key never matches
+        Question(id=3, question_type="multiple_choice", score=3,
+                 question_data={"options": ["w", "x", "y", "z"], "correct_answers": [0, 2]}),
+        Question(id=4, question_type="multiple_choice", score=1,
+                 question_data={"options": ["w", "x"], "correct_answers": ["0"]}),  # not packable
+        Question(id=5, question_type="fill_blank", score=4,
+                 question_data={"blank_answers": ["Paris"]}),
+        Question(id=6, question_type="single_choice", correct_answer="I", score=1),
+    ]
+    return GradingPlan(1, 0, {q.id: compile_question(q) for q in questions})
+
+
+ODD_ANSWERS = ["b", "B", "a", "BB", "I", "\u0131", "", None, 1, ["B"], [0, 2], [2, 0, 0], [0, 2.0],
+               [True, 2], [0], [0, 2, 70], ["0"], [[0]], {"0": 1}, [" paris "], ["Lyon"]]
+
+
+def test_matches_grade_submission():
+    plan = _plan()
+    rng = random.Random(7)
+    submissions = []
+    for _ in range(300):
+        answers = {str(q_id): rng.choice(ODD_ANSWERS) for q_id in range(1, 8) if rng.random() < 0.8}
+        submissions.append(answers)
+
+    grades = grade_class(plan, submissions)
+    for row, answers in enumerate(submissions):
+        expected = grade_submission(plan, answers)
+        assert (int(grades.total_score[row]), int(grades.correct_count[row]), int(grades.questions_count[row])) == \
+            (expected.total_score, expected.correct_count, expected.questions_count)
+        rebuilt = grades.submission(row)
+        assert rebuilt.results == expected.results
+        assert rebuilt.correct_answers == expected.correct_answers
+
+
+def test_python_path_and_duplicate_keys():
+    plan = _plan()
+    submissions = [{"1": "b", "01": "a"}, {"1": "B", "3": [2, 0]}, {"6": "\u0131"}]
+    for use_numpy in (True, False):
+        grades = grade_class(plan, submissions, use_numpy=use_numpy)
+        assert list(map(int, grades.total_score)) == [grade_submission(plan, a).total_score for a in submissions]
+        assert grades.is_correct(1, 3) is True
+        assert grades.is_correct(1, 5) is None
+        assert grades.is_correct(2, 6) is True  # "ı".upper() == "I", as in grade_submission
+
+
+def _task(app):
+    task = Task(name="Exam")
+    db.session.add(task)
+    db.session.commit()
+    db.session.add_all([
+        Question(task_id=task.id, question="Q1", question_type="single_choice", option_a="A", option_b="B",
+                 correct_answer="A", difficulty="easy", score=2),
+        Question(task_id=task.id, question="Q2", question_type="multiple_choice", difficulty="easy", score=3,
+                 question_data={"options": ["a", "b", "c"], "correct_answers": [1, 2]}),
+    ])
+    db.session.commit()
+    return task.id
+
+
+def test_batch_grade_endpoint(client, app):
+    t_id = _task(app)
+    q1, q2 = sorted(compile_grading_plan(t_id).questions)
+    entries = [
+        {"student_id": "s1", "answers": {str(q1): "a", str(q2): [2, 1]}},
+        {"student_id": "s2", "answers": {str(q1): "B"}},
+    ]
+
+    array_file = (io.BytesIO(json.dumps(entries).encode()), "answers.json")
+    body = json.loads(client.post(f"/api/tasks/{t_id}/batch-grade?role=tea", data={"file": array_file},
+                                  content_type="multipart/form-data").data)
+    assert body["max_score"] == 5 and body["count"] == 2
+    assert [r["total_score"] for r in body["results"]] == [5, 0]
+    assert body["results"][1]["correct"] == {str(q1): False}
+
+    lines = "\n".join(json.dumps(e) for e in entries).encode()
+    res = client.post(f"/api/tasks/{t_id}/batch-grade?role=tea", data={"file": (io.BytesIO(lines), "answers.ndjson")},
+                      content_type="multipart/form-data")
+    assert [r["student_id"] for r in json.loads(res.data)["results"]] == ["s1", "s2"]
+
+    res = client.post(f"/api/tasks/{t_id}/batch-grade?role=tea", json={"submissions": entries})
+    assert [r["total_score"] for r in json.loads(res.data)["results"]] == [5, 0]
+
+
+def test_batch_grade_validation(client, app):
+    t_id = _task(app)
+    res = client.post(f"/api/tasks/{t_id}/batch-grade?role=tea", json=[{"student_id": "s1", "answers": {"x": "A"}}])
+    assert res.status_code == 400 and "submission 1" in json.loads(res.data)["error"]
+    res = client.post(f"/api/tasks/{t_id}/batch-grade?role=tea", data={"file": (io.BytesIO(b'{"a": 1}\n{oops'), "a.ndjson")},
+                      content_type="multipart/form-data")
+    assert res.status_code == 400 and "line 2" in json.loads(res.data)["error"]
+    assert client.post("/api/tasks/99999/batch-grade?role=tea", json=[]).status_code == 404
+
+
+def test_batch_grade_is_for_teachers_with_bounded_uploads(client, app):
+    t_id = _task(app)
+    entries = [{"student_id": "s1", "answers": {}}]
+    assert client.post(f"/api/tasks/{t_id}/batch-grade", json=entries).status_code == 403
+    assert client.post(f"/api/tasks/{t_id}/batch-grade?role=stu", json=entries).status_code == 403
+
+    app.config["BATCH_GRADE_MAX_BYTES"] = 64
+    big = (io.BytesIO(json.dumps(entries * 10).encode()), "answers.json")
+    res = client.post(f"/api/tasks/{t_id}/batch-grade?role=tea", data={"file": big},
+                      content_type="multipart/form-data")
+    assert res.status_code == 413
+    assert client.post(f"/api/tasks/{t_id}/batch-grade?role=tea", json=entries * 10).status_code == 413
+    assert client.post(f"/api/tasks/{t_id}/batch-grade?role=tea", json=entries).status_code == 200
@@ -0,0 +1,154 @@
+"""
+Tests for backend/grading.py
+Coverage focus:
+- Grader registry and per-type grading rules
+- Compiled, pre-normalized answer keys per question type
+- Grading plan cache hits, invalidation by the question CRUD endpoints and by Task.content_version
+"""
+
+import json
+from types import SimpleNamespace
+
+from sqlalchemy import update
+
+from models import db, Task, Question
+from grading import GRADERS, DEFAULT_GRADER, get_grader, compile_question, get_grading_plan, compile_grading_plan
+
+
+def _compiled(qtype, data=None, correct_answer=None):
+    return compile_question(SimpleNamespace(
+        id=1, question_type=qtype, score=1, correct_answer=correct_answer,
+        question_data=data,
+    ))
+
+
+def _make_task(app, name="Grading Task"):
+    with app.app_context():
+        task = Task(name=name)
+        db.session.add(task)
+        db.session.commit()
+        return task.id
+
+
+def _add_question(app, task_id, qtype, **kwargs):
+    with app.app_context():
+        q = Question(task_id=task_id, question=f"{qtype}?", question_type=qtype,
+                     difficulty="easy", score=kwargs.pop("score", 2), **kwargs)
+        db.session.add(q)
+        db.session.commit()
+        return q.id
+
+
+def test_compile_plan_normalizes_answer_keys(app):
+    t_id = _make_task(app)
+    fb = _add_question(app, t_id, "fill_blank", question_data={"blank_answers": [" Paris ", "ROME"]})
+    pz = _add_question(app, t_id, "puzzle_game", question_data={"puzzle_solution": "H2 + O2 -> H2O"})
+    mt = _add_question(app, t_id, "matching_task", question_data={
+        "correct_matches": [{"left": 0, "right": 1}, {"left": 1, "right": 0}],
+    })
+    bad = _add_question(app, t_id, "multiple_choice", question_data={"correct_answers": 5})
+    sc = _add_question(app, t_id, "single_choice", correct_answer="C", score=5)
+
+    plan = compile_grading_plan(t_id)
+    assert plan.get(fb).key == ("paris", "rome")
+    assert plan.get(pz).key["chemistry"] == "H2 + O2 → H2O"
+    assert plan.get(mt).key == {"0": 1, "1": 0}
+    assert plan.get(bad).key is None
+    assert plan.get(sc).key == "C"
+    assert plan.max_score == 2 * 4 + 5
+
+
+def test_plan_is_cached_until_question_changes(client, app):
+    t_id = _make_task(app)
+    q_id = _add_question(app, t_id, "single_choice", correct_answer="A")
+
+    first = get_grading_plan(t_id)
+    assert get_grading_plan(t_id) is first
+
+    res = client.put(f"/api/questions/{q_id}", json={"correct_answer": "B"})
+    assert res.status_code == 200
+    second = get_grading_plan(t_id)
+    assert second is not first
+    assert second.get(q_id).correct_answer == "B"
+
+
+def test_plan_follows_edits_made_by_another_process(app):
+    t_id = _make_task(app)
+    q_id = _add_question(app, t_id, "single_choice", correct_answer="A")
+    assert get_grading_plan(t_id).get(q_id).correct_answer == "A"
+
+    # Another app instance edits the question: it bumps the version but cannot touch this cache
+    db.session.execute(update(Question).where(Question.id == q_id).values(correct_answer="B"))
+    db.session.execute(update(Task).where(Task.id == t_id).values(content_version=Task.content_version + 1))
+    db.session.commit()
+    assert get_grading_plan(t_id).get(q_id).correct_answer == "B"
+
+
+def test_submit_uses_updated_answer_key(client, app, test_student):
+    t_id = _make_task(app)
+    q_id = _add_question(app, t_id, "fill_blank", question_data={"blank_answers": ["cat"]})
+    payload = {"student_id": test_student.student_id, "answers": {str(q_id): ["Dog"]}}
+
+    r1 = client.post(f"/api/tasks/{t_id}/submit", json=payload)
+    assert json.loads(r1.data)["total_score"] == 0
+
+    client.put(f"/api/questions/{q_id}", json={"question_data": {"blank_answers": ["dog"]}})
+    r2 = client.post(f"/api/tasks/{t_id}/submit", json=payload)
+    assert json.loads(r2.data)["total_score"] == 2
+
+
+def test_delete_question_invalidates_plan(client, app):
+    t_id = _make_task(app)
+    q_id = _add_question(app, t_id, "single_choice", correct_answer="A")
+    assert get_grading_plan(t_id).get(q_id) is not None
+
+    assert client.delete(f"/api/questions/{q_id}").status_code == 200
+    assert get_grading_plan(t_id).get(q_id) is None
+
+
+def test_registry_covers_all_question_types():
+    for qtype in ("single_choice", "multiple_choice", "fill_blank", "puzzle_game", "matching_task"):
+        assert GRADERS[qtype].question_type == qtype
+    assert get_grader("unknown_type") is DEFAULT_GRADER
+
+
+def test_multiple_choice_grader_is_set_based():
+    q = _compiled("multiple_choice", {"correct_answers": [0, 2]})
+    assert q.grade([2, 0])
+    assert not q.grade([0])
+    assert not q.grade([0, 1, 2])
+    assert not q.grade("0")
+    assert not q.grade([[0], 2])  # unhashable entries are simply wrong
+
+
+def test_fill_blank_and_puzzle_graders():
+    fb = _compiled("fill_blank", {"blank_answers": ["Paris", "Rome"]})
+    assert fb.grade([" paris", "ROME "])
+    assert not fb.grade(["paris"])
+    assert not fb.grade(["paris", 3])
+
+    pz = _compiled("puzzle_game", {"puzzle_solution": "H2 + O2 -> H2O"})
+    assert pz.grade(["H2", "+", "O2", "->", "H2O"])
+    assert pz.grade(["H2", "+", "O2", "=>", "H2O"])
+    assert pz.grade(["h2 + o2 -> h2o"])
+    assert not pz.grade(["H2O"])
+    assert not pz.grade([1, 2])
+
+
+def test_matching_grader_ignores_extra_pairs():
+    q = _compiled("matching_task", {"correct_matches": [{"left": 0, "right": 1}, {"left": 1, "right": 0}]})
+    assert q.grade({"0": 1, "1": 0})
+    assert q.grade({"0": 1, "1": 0, "2": 2})
+    assert not q.grade({"0": 1})
+    assert not q.grade({"0": 1, "1": 1})
+    assert not q.grade([1, 0])
+
+
+def test_check_answer_uses_grader(client, app):
+    t_id = _make_task(app)
+    q_id = _add_question(app, t_id, "multiple_choice",
+                         question_data={"options": ["a", "b", "c"], "correct_answers": [0, 2]})
+    ok = client.post(f"/api/questions/{q_id}/check", json={"answer": [2, 0]})
+    assert json.loads(ok.data)["correct"] is True
+    bad = client.post(f"/api/questions/{q_id}/check", json={"answer": [1]})
+    assert json.loads(bad.data)["correct"] is False
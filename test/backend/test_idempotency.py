@@ -0,0 +1,103 @@
+"""
+Tests for backend/idempotency.py
+Coverage focus:
+- Retries with the same Idempotency-Key replay the stored response without SQL
+- Key reuse with a different body, oversized keys, requests without a key
+- Store eviction, expiry, and retries waiting for an in-flight request
+"""
+
+import json
+import threading
+
+from models import db, Task, Question, StudentTaskResult
+from sql_stats import count_statements
+from idempotency import IdempotencyStore
+
+
+def _task(app):
+    task = Task(name="Retry Task")
+    db.session.add(task)
+    db.session.commit()
+    q = Question(task_id=task.id, question="Q?", question_type="single_choice",
+                 option_a="A", option_b="B", correct_answer="A", difficulty="easy", score=1)
+    db.session.add(q)
+    db.session.commit()
+    return task.id, q.id
+
+
+def test_submit_retry_is_replayed(client, app, test_student):
+    t_id, q_id = _task(app)
+    payload = {"student_id": test_student.student_id, "answers": {str(q_id): "A"}}
+    headers = {"Idempotency-Key": "submit-1"}
+
+    first = client.post(f"/api/tasks/{t_id}/submit", json=payload, headers=headers)
+    with count_statements(db.engine) as counter:
+        retry = client.post(f"/api/tasks/{t_id}/submit", json=payload, headers=headers)
+
+    assert retry.status_code == 200
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert json.loads(retry.data) == json.loads(first.data)
+    assert counter.count == 0
+    assert StudentTaskResult.query.filter_by(task_id=t_id).count() == 1
+
+    # Same key with another body is rejected; without a key the request runs normally
+    changed = dict(payload, answers={str(q_id): "B"})
+    assert client.post(f"/api/tasks/{t_id}/submit", json=changed, headers=headers).status_code == 422
+    fresh = client.post(f"/api/tasks/{t_id}/submit", json=changed)
+    assert "Idempotent-Replayed" not in fresh.headers
+
+
+def test_save_progress_retry_and_key_scope(client, app, test_student):
+    t_id, _ = _task(app)
+    payload = {"student_id": test_student.student_id, "current_question_index": 1, "answers": {}}
+    headers = {"Idempotency-Key": "progress-1"}
+
+    assert client.post(f"/api/tasks/{t_id}/save-progress", json=payload, headers=headers).status_code == 200
+    retry = client.post(f"/api/tasks/{t_id}/save-progress", json=payload, headers=headers)
+    assert retry.headers["Idempotent-Replayed"] == "true"
+
+    too_long = {"Idempotency-Key": "k" * 300}
+    assert client.post(f"/api/tasks/{t_id}/save-progress", json=payload, headers=too_long).status_code == 400
+
+
+def test_client_errors_are_replayed(client, app):
+    t_id, _ = _task(app)
+    headers = {"Idempotency-Key": "missing-student"}
+    payload = {"student_id": "0000000", "answers": {}}
+    assert client.post(f"/api/tasks/{t_id}/save-progress", json=payload, headers=headers).status_code == 404
+    assert client.post(f"/api/tasks/{t_id}/save-progress", json=payload, headers=headers).headers["Idempotent-Replayed"] == "true"
+
+
+def test_store_eviction_expiry_and_abort():
+    store = IdempotencyStore(maxsize=2, ttl=3600)
+    for key in ("a", "b", "c"):
+        entry, owner = store.begin(key, "fp")
+        assert owner
+        store.complete(entry, (b"{}", 200, []))
+    assert len(store) == 2
+    assert store.begin("a", "fp")[1]  # evicted, runs again
+
+    entry, _ = store.begin("b", "fp")
+    store.abort("b", entry)
+    assert store.begin("b", "fp")[1]
+
+    store.ttl = -1
+    assert store.begin("c", "fp")[1]  # expired
+
+
+def test_retry_waits_for_in_flight_request():
+    store = IdempotencyStore()
+    entry, owner = store.begin("k", "fp")
+    assert owner
+
+    seen = []
+    def retry():
+        other, other_owner = store.begin("k", "fp")
+        other.done.wait(5)
+        seen.append((other_owner, other.response))
+
+    thread = threading.Thread(target=retry)
+    thread.start()
+    store.complete(entry, (b"ok", 200, []))
+    thread.join()
+    assert seen == [(False, (b"ok", 200, []))]
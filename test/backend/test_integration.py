@@ -469,6 +469,6 @@ class TestPerformanceWorkflow:
             saved_question = Question.query.filter_by(question="Large data question?").first()
             assert saved_question is not None
             
-            saved_data = json.loads(saved_question.question_data)
+            saved_data = saved_question.question_data
             assert len(saved_data['options']) == 100
             assert len(saved_data['correct_answers']) == 50 
\ No newline at end of file
@@ -229,7 +229,7 @@ class TestQuestionModel:
             saved_question = Question.query.filter_by(question="Multiple choice question").first()
             assert saved_question is not None
             assert saved_question.question_type == "multiple_choice"
-            assert saved_question.question_data == question_data
+            assert saved_question.question_data == {"options": ["A", "B", "C"], "correct_answers": [0, 1]}
     
     def test_question_task_relationship(self, app, test_task):
         """Test question-task relationship."""
@@ -0,0 +1,63 @@
+"""
+Tests for backend/payload_cache.py
+Coverage focus:
+- Byte-bounded LRU eviction and version-tagged lookups
+- GET /api/tasks/<id>/questions serves cached bytes until a question changes
+- Hit/miss counters through /api/question-cache/stats
+"""
+
+import json
+
+from models import db, Question
+from payload_cache import PayloadCache
+from sql_stats import count_statements
+
+
+def test_lru_is_bounded_by_bytes():
+    cache = PayloadCache(max_bytes=10)
+    cache.put(1, "questions", 1, b"aaaa")
+    cache.put(2, "questions", 1, b"bbbb")
+    assert cache.get(1, "questions", 1) == b"aaaa"  # 1 is now most recently used
+    cache.put(3, "questions", 1, b"cccc")
+    assert cache.get(2, "questions", 1) is None
+    assert cache.get(1, "questions", 1) == b"aaaa" and cache.size == 8
+
+    cache.put(4, "questions", 1, b"x" * 11)  # larger than the whole cache: not stored
+    assert cache.get(4, "questions", 1) is None
+
+    assert cache.get(1, "questions", 2) is None  # stale version
+    cache.invalidate(1)
+    stats = cache.stats()
+    assert stats["entries"] == 1 and stats["bytes"] == 4 and stats["evictions"] == 1
+    assert stats["hits"] == 2 and stats["misses"] == 3
+
+
+def _add_question(task_id, text):
+    db.session.add(Question(task_id=task_id, question=text, question_type="multiple_choice",
+                            question_data={"options": ["x", "y", "z"], "correct_answers": [1]},
+                            difficulty="easy", score=1))
+    db.session.commit()
+
+
+def test_question_list_served_from_cache(client, app, test_task):
+    t_id = test_task.id
+    _add_question(t_id, "Cached?")
+    first = client.get(f"/api/tasks/{t_id}/questions")
+    assert first.status_code == 200
+    assert json.loads(first.data)[0]["options"] == {"A": "x", "B": "y", "C": "z"}
+
+    with count_statements(db.engine) as counter:
+        second = client.get(f"/api/tasks/{t_id}/questions")
+    assert second.data == first.data and second.headers["ETag"] == first.headers["ETag"]
+    assert counter.count == 1  # the version lookup only
+
+    question_id = json.loads(first.data)[0]["id"]
+    client.put(f"/api/questions/{question_id}", json={"question": "Edited?"})
+    assert json.loads(client.get(f"/api/tasks/{t_id}/questions").data)[0]["question"] == "Edited?"
+
+    stats = json.loads(client.get("/api/question-cache/stats").data)
+    assert stats["hits"] == 1 and stats["misses"] == 2 and stats["entries"] == 1
+
+
+def test_missing_task_is_404(client):
+    assert client.get("/api/tasks/999999/questions").status_code == 404
@@ -0,0 +1,197 @@
+"""
+Tests for backend/progress_buffer.py
+Coverage focus:
+- Write-behind autosaves coalesce in memory and are written in one batched upsert
+- Reads flush the key first; submit and delete drop buffered state
+- Background thread flush and flush on stop
+- Delta saves racing a flush, reads served (and logged) when the flush fails
+"""
+
+import json
+import threading
+
+import pytest
+
+from models import db, Task, Question, StudentTaskProcess
+from progress_buffer import get_progress_buffer
+from sql_stats import count_statements
+
+
+@pytest.fixture
+def write_behind(app):
+    app.config["PROGRESS_WRITE_BEHIND"] = True
+    app.config["PROGRESS_FLUSH_INTERVAL"] = 3600  # flushed explicitly by the tests
+    yield
+    buffer = get_progress_buffer(app, create=False)
+    if buffer is not None:
+        buffer.stop()
+
+
+def _task(name="Buffered Task"):
+    task = Task(name=name)
+    db.session.add(task)
+    db.session.commit()
+    q = Question(task_id=task.id, question="Q?", question_type="single_choice",
+                 option_a="A", option_b="B", correct_answer="A", difficulty="easy", score=1)
+    db.session.add(q)
+    db.session.commit()
+    return task.id, q.id
+
+
+def _save(client, t_id, sid, index, answers=None):
+    return client.post(f"/api/tasks/{t_id}/save-progress",
+                       json={"student_id": sid, "current_question_index": index, "answers": answers or {}})
+
+
+def test_autosaves_coalesce_without_sql(client, app, test_student, write_behind):
+    sid = test_student.student_id
+    t_id, _ = _task()
+
+    with count_statements(db.engine) as counter:
+        for index in range(5):
+            assert json.loads(_save(client, t_id, sid, index, {"1": index}).data)["buffered"] is True
+    assert counter.count == 0
+    assert StudentTaskProcess.query.count() == 0
+    assert len(get_progress_buffer(app)) == 1
+
+    body = json.loads(client.get(f"/api/tasks/{t_id}/progress?student_id={sid}").data)
+    assert body["current_question_index"] == 4 and body["answers"] == {"1": 4}
+    assert len(get_progress_buffer(app)) == 0
+
+    progress = json.loads(client.get(f"/api/students/{sid}/task-progress").data)
+    assert progress[str(t_id)]["current_question_index"] == 4
+
+
+def test_batched_flush_skips_unknown_keys(client, app, test_student, write_behind):
+    sid = test_student.student_id
+    t1, _ = _task("One")
+    t2, _ = _task("Two")
+    _save(client, t1, sid, 1)
+    _save(client, t2, sid, 2)
+    _save(client, 99999, sid, 3)
+
+    assert get_progress_buffer(app).flush() == 2
+    rows = StudentTaskProcess.query.filter_by(student_id=sid).order_by(StudentTaskProcess.task_id).all()
+    assert [(r.task_id, r.task_name, r.current_question_index) for r in rows] == [(t1, "One", 1), (t2, "Two", 2)]
+
+
+def test_submit_and_delete_drop_buffered_progress(client, app, test_student, write_behind):
+    sid = test_student.student_id
+    t_id, q_id = _task()
+    _save(client, t_id, sid, 1)
+    client.post(f"/api/tasks/{t_id}/submit", json={"student_id": sid, "answers": {str(q_id): "A"}})
+    assert len(get_progress_buffer(app)) == 0
+
+    _save(client, t_id, sid, 2)
+    client.delete(f"/api/tasks/{t_id}/progress?student_id={sid}")
+    get_progress_buffer(app).stop()
+    assert StudentTaskProcess.query.count() == 0
+
+
+def test_background_thread_and_stop_flush(client, app, test_student, write_behind):
+    app.config["PROGRESS_BUFFER_MAX"] = 1  # wake the thread on the first autosave
+    sid = test_student.student_id
+    t_id, _ = _task()
+    buffer = get_progress_buffer(app)
+    _save(client, t_id, sid, 7)
+    buffer.stop()
+
+    db.session.expire_all()
+    assert StudentTaskProcess.query.filter_by(student_id=sid).one().current_question_index == 7
+
+
+def test_buffered_patch_merges_and_versions(client, app, test_student, write_behind):
+    sid = test_student.student_id
+    t_id, _ = _task()
+    _save(client, t_id, sid, 0, {"1": "A", "2": "B"})
+    get_progress_buffer(app).flush()  # stored at version 1
+
+    patch = lambda body: client.patch(f"/api/tasks/{t_id}/progress", json=dict(body, student_id=sid))
+    assert json.loads(patch({"answers": {"2": "C", "3": ["x"]}}).data)["version"] == 2
+    assert json.loads(patch({"answers": {"1": None}, "current_question_index": 3, "base_version": 2}).data)["version"] == 3
+    res = patch({"answers": {"1": "D"}, "base_version": 2})
+    assert res.status_code == 409 and json.loads(res.data)["version"] == 3
+
+    body = json.loads(client.get(f"/api/tasks/{t_id}/progress?student_id={sid}").data)
+    assert body["answers"] == {"2": "C", "3": ["x"]}
+    assert (body["current_question_index"], body["version"]) == (3, 3)
+
+
+def test_buffered_save_honors_if_match(client, app, test_student, write_behind):
+    sid = test_student.student_id
+    t_id, _ = _task()
+    url = f"/api/tasks/{t_id}/save-progress"
+    body = {"student_id": sid, "current_question_index": 1, "answers": {}}
+
+    assert client.post(url, json=body, headers={"If-Match": '"progress-v0"'}).headers["ETag"] == '"progress-v1"'
+    assert client.post(url, json=body, headers={"If-Match": '"progress-v0"'}).status_code == 412
+    assert client.post(url, json=body, headers={"If-Match": '"progress-v1"'}).headers["ETag"] == '"progress-v2"'
+
+    res = client.get(f"/api/tasks/{t_id}/progress?student_id={sid}", headers={"If-None-Match": '"progress-v2"'})
+    assert res.status_code == 304
+
+
+def test_patch_rereads_progress_flushed_during_its_read(client, app, test_student, write_behind, monkeypatch):
+    sid = test_student.student_id
+    t_id, _ = _task()
+    buffer = get_progress_buffer(app)
+    _save(client, t_id, sid, 0, {"1": "A"})
+    buffer.flush()  # stored at version 1
+
+    def full_save_and_flush():
+        with app.app_context():
+            buffer.put(sid, t_id, 0, {"1": "C"})
+            buffer.flush()  # stored at version 2
+            db.session.remove()
+
+    class RacingQuery:
+        """The first read of the stored row is overtaken by another request's save and flush"""
+        raced = False
+
+        def filter_by(self, **kwargs):
+            self.query = db.session.query(StudentTaskProcess).filter_by(**kwargs)
+            return self
+
+        def populate_existing(self):
+            self.query = self.query.populate_existing()
+            return self
+
+        def first(self):
+            row = self.query.first()
+            if not RacingQuery.raced:
+                RacingQuery.raced = True
+                thread = threading.Thread(target=full_save_and_flush)
+                thread.start()
+                thread.join(5)
+                assert not thread.is_alive()  # the read holds no lock a flush needs
+            return row
+
+    monkeypatch.setattr(StudentTaskProcess, "query", RacingQuery())
+    assert buffer.patch(sid, t_id, {"2": "B"}) == 3
+    monkeypatch.undo()
+    buffer.flush()
+
+    db.session.expire_all()
+    body = json.loads(client.get(f"/api/tasks/{t_id}/progress?student_id={sid}").data)
+    assert (body["answers"], body["version"]) == ({"1": "C", "2": "B"}, 3)
+
+
+def test_progress_read_served_when_flush_fails(client, app, test_student, write_behind, monkeypatch, capsys):
+    sid = test_student.student_id
+    t_id, _ = _task()
+    buffer = get_progress_buffer(app)
+    _save(client, t_id, sid, 1, {"1": "A"})
+    buffer.flush()
+    _save(client, t_id, sid, 2, {"1": "B"})
+
+    def fail(entries):
+        raise RuntimeError("database unavailable")
+    monkeypatch.setattr(buffer, "_write", fail)
+
+    body = json.loads(client.get(f"/api/tasks/{t_id}/progress?student_id={sid}").data)
+    assert (body["current_question_index"], body["answers"]) == (1, {"1": "A"})
+    assert client.get(f"/api/students/{sid}/task-progress").status_code == 200
+    assert len(buffer) == 1  # kept for the next flush
+    out = capsys.readouterr().out
+    assert f"Serving stored progress of student {sid} for task {t_id}" in out
+    assert f"Serving stored progress of student {sid}, buffered autosaves not written" in out
@@ -0,0 +1,85 @@
+"""
+Tests for backend/question_answers.py
+Coverage focus:
+- Per-question rows written at submit and replaced on resubmit
+- Item analysis (difficulty and wrong-answer counts) and exact student accuracy
+- Rows removed with their question or task, refreshed by regrades
+"""
+
+import json
+
+from models import db, Task, Question, Student, StudentQuestionAnswer
+from background import shutdown_executors
+
+
+def _task(app, count=2):
+    task = Task(name="Item Task")
+    db.session.add(task)
+    db.session.commit()
+    qs = [Question(task_id=task.id, question=f"Q{i}?", question_type="single_choice",
+                   option_a="A", option_b="B", option_c="C", correct_answer="A", difficulty="easy", score=1)
+          for i in range(count)]
+    db.session.add_all(qs)
+    db.session.commit()
+    return task.id, [q.id for q in qs]
+
+
+def _student(n):
+    s = Student(real_name=f"Item {n}", student_id=f"80000{n:02d}", username=f"80000{n:02d}@stu.com", password="x")
+    db.session.add(s)
+    db.session.commit()
+    return s.student_id
+
+
+def _submit(client, t_id, sid, answers):
+    return client.post(f"/api/tasks/{t_id}/submit", json={"student_id": sid, "answers": answers})
+
+
+def test_submit_records_and_replaces_rows(client, app, test_student):
+    sid = test_student.student_id
+    t_id, (q1, q2) = _task(app)
+
+    _submit(client, t_id, sid, {str(q1): "A", str(q2): "B"})
+    rows = StudentQuestionAnswer.query.filter_by(student_id=sid).order_by(StudentQuestionAnswer.question_id).all()
+    assert [(r.question_id, r.is_correct, r.score, json.loads(r.answer_json)) for r in rows] == \
+        [(q1, True, 1, "A"), (q2, False, 0, "B")]
+
+    _submit(client, t_id, sid, {str(q1): "A", str(q2): "A"})
+    db.session.expire_all()
+    rows = StudentQuestionAnswer.query.filter_by(student_id=sid).all()
+    assert len(rows) == 2 and all(r.is_correct for r in rows)
+
+    body = json.loads(client.get(f"/api/students/{sid}/accuracy").data)
+    assert body["accuracy_rate"] == 100.0 and body["tasks"][0]["correct"] == 2
+
+
+def test_item_analysis(client, app):
+    t_id, (q1, q2) = _task(app)
+    for n, (a1, a2) in enumerate([("A", "B"), ("A", "B"), ("C", "A"), ("A", "C")]):
+        _submit(client, t_id, _student(n), {str(q1): a1, str(q2): a2})
+
+    items = json.loads(client.get(f"/api/tasks/{t_id}/item-analysis").data)["questions"]
+    first, second = items
+    assert (first["attempts"], first["correct_count"], first["p_value"]) == (4, 3, 0.75)
+    assert first["wrong_answers"] == [{"answer": "C", "count": 1}]
+    assert second["p_value"] == 0.25
+    assert second["wrong_answers"] == [{"answer": "B", "count": 2}, {"answer": "C", "count": 1}]
+
+    assert client.get("/api/tasks/99999/item-analysis").status_code == 404
+
+
+def test_rows_follow_question_delete_and_regrade(client, app, test_student):
+    sid = test_student.student_id
+    t_id, (q1, q2) = _task(app)
+    _submit(client, t_id, sid, {str(q1): "A", str(q2): "B"})
+
+    client.put(f"/api/questions/{q2}", json={"correct_answer": "B"})
+    shutdown_executors(app)
+    db.session.expire_all()
+    assert StudentQuestionAnswer.query.filter_by(question_id=q2).one().is_correct
+
+    assert client.delete(f"/api/questions/{q1}").status_code == 200
+    assert StudentQuestionAnswer.query.filter_by(question_id=q1).count() == 0
+
+    assert client.delete(f"/api/tasks/{t_id}").status_code == 200
+    assert StudentQuestionAnswer.query.filter_by(task_id=t_id).count() == 0
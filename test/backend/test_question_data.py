@@ -0,0 +1,162 @@
+"""
+Tests for the JSON question_data column
+Coverage focus:
+- question_data is stored and loaded as a parsed structure
+- v1 endpoints still return it as a JSON string; updates accept dicts and strings
+- Only objects or NULL are stored: JSON text is decoded by the model and the upgrade
+- The PostgreSQL online migration under concurrent writes (set TEST_POSTGRES_URL to a
+  scratch database to run it; its tables are dropped)
+"""
+
+import os
+import json
+import random
+import threading
+
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.dialects.postgresql import JSONB
+
+from models import db, Question, Task
+from schema_upgrades import migrate_question_data
+
+# Stored legacy text and what the migration turns it into
+LEGACY_VALUES = [
+    ('{"options": ["x"], "correct_answers": [0]}', {"options": ["x"], "correct_answers": [0]}),
+    (json.dumps(json.dumps({"blank_answers": ["a"]})), {"blank_answers": ["a"]}),  # double-encoded
+    ("not json at all", None),
+    ("[1, 2]", None),
+    (None, None),
+]
+
+
+def _multiple_choice(task_id):
+    return Question(task_id=task_id, question="Pick", question_type="multiple_choice",
+                    question_data={"options": ["x", "y"], "correct_answers": [1]}, difficulty="easy", score=1)
+
+
+def test_question_data_round_trips_as_json(client, app, test_task):
+    question = _multiple_choice(test_task.id)
+    db.session.add(question)
+    db.session.commit()
+    db.session.expire_all()
+
+    loaded = db.session.get(Question, question.id)
+    assert loaded.question_data == {"options": ["x", "y"], "correct_answers": [1]}
+    stored = db.session.execute(text("SELECT question_data FROM questions WHERE id = :id"), {"id": question.id})
+    assert json.loads(stored.scalar()) == loaded.question_data
+
+    listed = json.loads(client.get(f"/api/tasks/{test_task.id}/questions").data)[0]
+    assert json.loads(listed["question_data"]) == loaded.question_data
+    assert listed["options"] == {"A": "x", "B": "y"}
+    single = json.loads(client.get(f"/api/questions/{question.id}").data)
+    assert json.loads(single["question_data"]) == loaded.question_data
+
+
+def test_update_accepts_dict_or_json_string(client, app, test_task):
+    question = _multiple_choice(test_task.id)
+    db.session.add(question)
+    db.session.commit()
+
+    data = {"options": ["a", "b", "c"], "correct_answers": [2]}
+    assert client.put(f"/api/questions/{question.id}", json={"question_data": data}).status_code == 200
+    db.session.expire_all()
+    assert db.session.get(Question, question.id).question_data == data
+
+    data["correct_answers"] = [0]
+    assert client.put(f"/api/questions/{question.id}", json={"question_data": json.dumps(data)}).status_code == 200
+    db.session.expire_all()
+    assert db.session.get(Question, question.id).question_data == data
+
+    assert client.put(f"/api/questions/{question.id}", json={"question_data": "{broken"}).status_code == 400
+    assert client.put(f"/api/questions/{question.id}", json={"question_data": [1, 2]}).status_code == 400
+
+
+def test_model_decodes_json_text(app, test_task):
+    question = Question(task_id=test_task.id, question="Text", question_type="fill_blank", difficulty="easy",
+                        score=1, question_data=json.dumps({"blank_answers": ["a"]}))
+    assert question.question_data == {"blank_answers": ["a"]}
+    question.question_data = "not json"
+    assert question.question_data is None
+    question.question_data = [1]
+    assert question.question_data is None
+
+
+def _insert_legacy(conn, task_id, values):
+    conn.execute(text(
+        "INSERT INTO questions (task_id, question, question_type, question_data, difficulty, score, created_at) "
+        "VALUES (:task_id, 'Legacy', 'multiple_choice', :data, 'easy', 1, CURRENT_TIMESTAMP)"
+    ), [{"task_id": task_id, "data": value} for value in values])
+
+
+def test_sqlite_upgrade_keeps_only_objects(app, test_task):
+    with db.engine.begin() as conn:
+        _insert_legacy(conn, test_task.id, [value for value, _ in LEGACY_VALUES])
+
+    migrate_question_data(chunk_size=1)
+    db.session.expire_all()
+    values = [q.question_data for q in Question.query.filter_by(question="Legacy").order_by(Question.id)]
+    assert values == [expected for _, expected in LEGACY_VALUES]
+
+
+@pytest.mark.skipif(not os.getenv("TEST_POSTGRES_URL"), reason="needs a PostgreSQL database in TEST_POSTGRES_URL")
+def test_postgres_online_migration_with_concurrent_writes(monkeypatch):
+    from app import create_app
+
+    monkeypatch.setenv("DATABASE_URL", os.environ["TEST_POSTGRES_URL"])
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        with db.engine.begin() as conn:
+            conn.execute(text("ALTER TABLE questions DROP COLUMN question_data"))
+            conn.execute(text("ALTER TABLE questions ADD COLUMN question_data TEXT"))  # the pre-JSON schema
+        task = Task(name="Postgres Task")
+        db.session.add(task)
+        db.session.commit()
+        rows = LEGACY_VALUES * 400
+        with db.engine.begin() as conn:
+            _insert_legacy(conn, task.id, [value for value, _ in rows])
+        expected = {question_id: value for question_id, (_, value) in enumerate(rows, start=1)}
+
+        # Old app instances keep writing text while the migration runs
+        stop = threading.Event()
+        engine = db.engine
+
+        def write_text():
+            rng = random.Random(1)
+            while not stop.is_set():
+                with engine.begin() as conn:
+                    if rng.random() < 0.2:
+                        _insert_legacy(conn, task.id, [json.dumps({"new": True})])
+                        question_id = conn.execute(text("SELECT MAX(id) FROM questions")).scalar()
+                        expected[question_id] = {"new": True}
+                    else:
+                        question_id, value = rng.randint(1, len(rows)), {"written": rng.random()}
+                        conn.execute(text("UPDATE questions SET question_data = :data WHERE id = :id"),
+                                     {"data": json.dumps(value), "id": question_id})
+                        expected[question_id] = value
+
+        writer = threading.Thread(target=write_text)
+        writer.start()
+        try:
+            migrate_question_data(chunk_size=50)
+        finally:
+            stop.set()
+            writer.join()
+
+        columns = {c["name"]: c["type"] for c in inspect(db.engine).get_columns("questions")}
+        assert isinstance(columns["question_data"], JSONB) and "question_data_text" in columns
+        stored = dict(db.session.execute(text("SELECT id, question_data FROM questions")).all())
+        assert stored == expected
+        assert len(expected) > len(rows)  # the writer got inserts in
+
+        # Text written as a JSON string into the new column is unwrapped on the next start
+        db.session.execute(text("UPDATE questions SET question_data = to_jsonb(CAST(:data AS text)) WHERE id = 1"),
+                           {"data": json.dumps({"late": 1})})
+        db.session.commit()
+        migrate_question_data(chunk_size=50)
+        assert db.session.execute(text("SELECT question_data FROM questions WHERE id = 1")).scalar() == {"late": 1}
+
+        db.session.remove()
+        db.drop_all()
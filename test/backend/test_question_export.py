@@ -0,0 +1,98 @@
+"""
+Tests for backend/question_export.py and the task export endpoints
+Coverage focus:
+- Streamed NDJSON of one task or all tasks, readable back by the batch endpoint
+- Zip archives with the referenced media files
+- Teacher-only access and unknown tasks
+"""
+
+import io
+import json
+import os
+import zipfile
+
+from models import db, Question, Task
+from question_export import iter_export_ndjson
+
+
+def _lines(data):
+    return [json.loads(line) for line in data.decode("utf-8").splitlines()]
+
+
+def _add_questions(task, count):
+    for i in range(count):
+        db.session.add(Question(task_id=task.id, question=f"Q{i}", question_type="fill_blank",
+                                question_data={"blank_answers": [f"a{i}"]}, difficulty="Easy", score=1))
+    db.session.commit()
+
+
+def test_export_task_streams_ndjson(client, test_task):
+    _add_questions(test_task, 3)
+    res = client.get(f"/api/tasks/{test_task.id}/export?role=tea")
+    assert res.status_code == 200 and res.is_streamed
+    assert res.mimetype == "application/x-ndjson"
+    assert "task_%d_export.ndjson" % test_task.id in res.headers["Content-Disposition"]
+
+    records = _lines(res.data)
+    assert records[0]["record"] == "task" and records[0]["name"] == "Test Task"
+    assert [r["question"] for r in records[1:]] == ["Q0", "Q1", "Q2"]
+    assert records[1]["question_data"] == {"blank_answers": ["a0"]}
+
+
+def test_exported_questions_round_trip_through_batch(client, test_task):
+    _add_questions(test_task, 2)
+    records = _lines(client.get(f"/api/tasks/{test_task.id}/export?role=tea").data)
+    copy = Task(name="Copy", introduction="copy")
+    db.session.add(copy)
+    db.session.commit()
+
+    res = client.post(f"/api/tasks/{copy.id}/questions/batch",
+                      json={"questions": [r for r in records if r["record"] == "question"]})
+    assert res.status_code == 201
+    assert [q.question_data for q in Question.query.filter_by(task_id=copy.id).order_by(Question.id)] == [
+        {"blank_answers": ["a0"]}, {"blank_answers": ["a1"]}]
+
+
+def test_export_all_tasks_in_small_chunks(test_task):
+    other = Task(name="Other", introduction="other")
+    db.session.add(other)
+    db.session.commit()
+    _add_questions(other, 5)
+    _add_questions(test_task, 5)
+
+    chunks = list(iter_export_ndjson(yield_per=2, chunk_bytes=100))
+    assert len(chunks) > 1
+    records = _lines(b"".join(chunks))
+    assert [r["record"] for r in records] == ["task"] * 2 + ["question"] * 10
+    # Questions are grouped by task
+    assert [r["task_id"] for r in records[2:]] == [test_task.id] * 5 + [other.id] * 5
+
+
+def test_export_zip_includes_media(client, app, test_task):
+    _add_questions(test_task, 1)
+    question = Question.query.filter_by(task_id=test_task.id).first()
+    question.image_path = f"task_{test_task.id}/diagram.png"
+    db.session.commit()
+    image_dir = os.path.join(app.config["UPLOAD_FOLDER"], f"task_{test_task.id}")
+    os.makedirs(image_dir, exist_ok=True)
+    with open(os.path.join(image_dir, "diagram.png"), "wb") as f:
+        f.write(b"\x89PNG image bytes")
+
+    try:
+        res = client.get(f"/api/tasks/{test_task.id}/export?role=tea&format=zip")
+        assert res.status_code == 200 and res.mimetype == "application/zip"
+        with zipfile.ZipFile(io.BytesIO(res.data)) as archive:
+            assert archive.read(f"media/questions/task_{test_task.id}/diagram.png") == b"\x89PNG image bytes"
+            assert [r["record"] for r in _lines(archive.read("questions.ndjson"))] == ["task", "question"]
+
+        res = client.get(f"/api/tasks/{test_task.id}/export?role=tea&format=zip&media=false")
+        with zipfile.ZipFile(io.BytesIO(res.data)) as archive:
+            assert archive.namelist() == ["questions.ndjson"]
+    finally:
+        os.remove(os.path.join(image_dir, "diagram.png"))
+
+
+def test_export_requires_teacher_and_existing_task(client, test_task):
+    assert client.get(f"/api/tasks/{test_task.id}/export").status_code == 403
+    assert client.get("/api/tasks/export?role=stu").status_code == 403
+    assert client.get("/api/tasks/99999/export?role=tea").status_code == 404
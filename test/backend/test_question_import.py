@@ -0,0 +1,96 @@
+"""
+Tests for backend/question_import.py and the question bank import endpoint
+Coverage focus:
+- Spreadsheet rows of every question type mapped onto the shared validation
+- Chunked commits, per-row errors with row numbers, unsupported files
+- Rows beyond the QUESTION_TASK_MAX questions-per-task limit are reported, not inserted
+"""
+
+import io
+import json
+
+import pytest
+
+from models import db, Question, Task
+from question_import import ImportFormatError, import_questions, iter_csv_rows, row_values
+
+CSV = (
+    "question,question_type,option_a,option_b,option_c,option_d,correct_answer,options,correct_answers,"
+    "blank_answers,puzzle_solution,puzzle_fragments,left_items,right_items,correct_matches,score\n"
+    "Single,single_choice,a,b,c,d,b,,,,,,,,,2\n"
+    "Multiple,multiple_choice,,,,,,x|y|z,0|2,,,,,,,\n"
+    "Blank,fill_blank,,,,,,,,mole,,,,,,\n"
+    "Puzzle,puzzle_game,,,,,,,,,a b,b|a,,,,\n"
+    "Match,matching_task,,,,,,,,,,,l1|l2,r1|r2,0-1|1-0,\n"
+)
+
+
+def _upload(client, task_id, content, filename="bank.csv"):
+    return client.post(f"/api/tasks/{task_id}/questions/import",
+                       data={"file": (io.BytesIO(content.encode("utf-8")), filename)},
+                       content_type="multipart/form-data")
+
+
+def test_row_values_splits_list_columns():
+    values = row_values({"question": " Q ", "options": "x | y", "correct_matches": "0-1|1:0", "description": ""})
+    assert values == {"question": "Q", "options": ["x", "y"],
+                      "correct_matches": [{"left": "0", "right": "1"}, {"left": "1", "right": "0"}]}
+
+
+def test_import_every_type(client, test_task):
+    res = _upload(client, test_task.id, CSV)
+    assert res.status_code == 201
+    assert json.loads(res.data) == {"imported": 5, "failed": 0, "chunks": 1, "errors": [],
+                                    "errors_truncated": False}
+
+    questions = Question.query.filter_by(task_id=test_task.id).order_by(Question.id).all()
+    assert [q.question_type for q in questions] == [
+        "single_choice", "multiple_choice", "fill_blank", "puzzle_game", "matching_task"]
+    assert questions[0].correct_answer == "B" and questions[0].score == 2
+    assert questions[1].question_data == {"options": ["x", "y", "z"], "correct_answers": [0, 2]}
+    assert questions[4].question_data["correct_matches"] == [{"left": 0, "right": 1}, {"left": 1, "right": 0}]
+    assert db.session.get(Task, test_task.id).content_version > 0
+
+
+def test_import_commits_in_chunks_and_reports_bad_rows(test_task):
+    content = "question,question_type,blank_answers\n" + "".join(
+        f"Q{i},fill_blank,{'' if i % 4 == 0 else 'x'}\n" for i in range(1, 11))
+    result = import_questions(test_task.id, iter_csv_rows(io.BytesIO(content.encode())), chunk_size=3)
+
+    assert (result.imported, result.failed, result.chunks) == (8, 2, 3)
+    # Header is line 1, so Q4 and Q8 are on lines 5 and 9
+    assert result.errors == [{"row": 5, "error": "At least one blank answer required"},
+                             {"row": 9, "error": "At least one blank answer required"}]
+    assert Question.query.filter_by(task_id=test_task.id).count() == 8
+
+
+def test_import_stops_at_questions_per_task_limit(app, test_task):
+    app.config["QUESTION_TASK_MAX"] = 6
+    content = "question,question_type,blank_answers\n" + "".join(f"Q{i},fill_blank,x\n" for i in range(1, 5))
+    first = import_questions(test_task.id, iter_csv_rows(io.BytesIO(content.encode())), chunk_size=3)
+    second = import_questions(test_task.id, iter_csv_rows(io.BytesIO(content.encode())), chunk_size=3)
+
+    assert (first.imported, first.failed) == (4, 0)
+    assert (second.imported, second.failed) == (2, 2)
+    assert second.errors == [{"row": 4, "error": "Maximum 6 questions allowed per task"},
+                             {"row": 5, "error": "Maximum 6 questions allowed per task"}]
+    assert Question.query.filter_by(task_id=test_task.id).count() == 6
+
+
+@pytest.mark.parametrize("filename, content, message", [
+    ("bank.txt", "question\nQ\n", "Unsupported file type"),
+    ("bank.csv", "", "empty"),
+])
+def test_import_rejects_unreadable_files(client, test_task, filename, content, message):
+    res = _upload(client, test_task.id, content, filename)
+    assert res.status_code == 400
+    assert message in json.loads(res.data)["error"]
+
+
+def test_import_invalid_utf8_is_a_format_error(test_task):
+    with pytest.raises(ImportFormatError):
+        import_questions(test_task.id, iter_csv_rows(io.BytesIO(b"question\n\xff\xfe\n")))
+
+
+def test_import_unknown_task(client):
+    assert _upload(client, 99999, CSV).status_code == 404
@@ -0,0 +1,104 @@
+"""
+Tests for backend/question_input.py and the batch question endpoint
+Coverage focus:
+- Shared validation for all five question types, list-typed fields and in-range answer indices
+- Batch creation of every type with bulk inserts, ids in input order, all-or-nothing errors
+- Batch creation stops at the QUESTION_TASK_MAX questions-per-task limit
+"""
+
+import json
+
+import pytest
+
+from models import db, Question
+from question_input import QuestionInputError, validate_question
+from sql_stats import count_statements
+
+QUESTIONS = [
+    {"question": "Single", "option_a": "a", "option_b": "b", "option_c": "c", "option_d": "d",
+     "correct_answer": "c", "difficulty": "easy", "score": 1},
+    {"question": "Multiple", "question_type": "multiple_choice", "options": ["x", "y", "z"],
+     "correct_answers": [0, "2"]},
+    {"question": "Blank", "question_type": "fill_blank", "blank_answers": ["mole"]},
+    {"question": "Puzzle", "question_type": "puzzle_game", "puzzle_solution": "a b",
+     "puzzle_fragments": ["b", "a"]},
+    {"question": "Match", "question_type": "matching_task", "question_data": {
+        "left_items": ["l1", "l2"], "right_items": ["r1", "r2"], "correct_matches": [{"left": 0, "right": 1}]}},
+]
+
+
+def test_validate_every_type():
+    columns = [validate_question(q) for q in QUESTIONS]
+    assert columns[0]["correct_answer"] == "C" and columns[0]["question_data"] is None
+    assert columns[1]["question_data"] == {"options": ["x", "y", "z"], "correct_answers": [0, 2]}
+    assert columns[2]["question_data"] == {"blank_answers": ["mole"]}
+    assert columns[3]["question_data"] == {"puzzle_solution": "a b", "puzzle_fragments": ["b", "a"]}
+    assert columns[4]["question_data"]["correct_matches"] == [{"left": 0, "right": 1}]
+    assert columns[1]["difficulty"] == "Easy" and columns[1]["score"] == 3
+
+
+@pytest.mark.parametrize("values, message", [
+    ({}, "Question text is required"),
+    ({"question": "Q", "score": "x"}, "Score must be a number"),
+    ({"question": "Q", "option_a": "a"}, "All options are required"),
+    ({"question": "Q", "question_type": "multiple_choice", "options": ["x", "y"], "correct_answers": ["?"]},
+     "Correct answers must be option indices"),
+    ({"question": "Q", "question_type": "multiple_choice", "options": ["x", "y"], "correct_answers": [2]},
+     "Correct answers must be indices of the options"),
+    ({"question": "Q", "question_type": "multiple_choice", "options": ["x", "y"], "correct_answers": [-1]},
+     "Correct answers must be indices of the options"),
+    ({"question": "Q", "question_type": "multiple_choice", "options": "xy", "correct_answers": [0]},
+     "Options must be a list"),
+    ({"question": "Q", "question_type": "multiple_choice", "options": ["x", "y"], "correct_answers": 0},
+     "Correct answers must be a list"),
+    ({"question": "Q", "question_type": "fill_blank"}, "At least one blank answer"),
+    ({"question": "Q", "question_type": "fill_blank", "blank_answers": {"a": 1}}, "Blank answers must be a list"),
+    ({"question": "Q", "question_type": "puzzle_game", "puzzle_solution": "a", "puzzle_fragments": "a"},
+     "Puzzle fragments must be a list"),
+    ({"question": "Q", "question_type": "matching_task", "left_items": ["a", "b"], "right_items": 12,
+      "correct_matches": [{"left": 0, "right": 0}]}, "Right items must be a list"),
+    ({"question": "Q", "question_type": "matching_task", "left_items": ["a", "b"], "right_items": ["c", "d"],
+      "correct_matches": [{"left": 0, "right": 2}]}, "Correct matches must be indices of the items"),
+    ({"question": "Q", "question_type": "essay"}, "Invalid question type"),
+])
+def test_validation_errors(values, message):
+    with pytest.raises(QuestionInputError, match=message):
+        validate_question(values)
+
+
+def test_batch_creates_all_types_in_bulk(client, app, test_task):
+    app.config["QUESTION_BATCH_CHUNK_SIZE"] = 4
+    with count_statements(db.engine) as counter:
+        res = client.post(f"/api/tasks/{test_task.id}/questions/batch",
+                          json={"questions": QUESTIONS * 4, "created_by": None})
+    assert res.status_code == 201
+    ids = json.loads(res.data)["ids"]
+    assert len(ids) == 20 and ids == sorted(ids)
+    assert counter.count < 20  # one INSERT per chunk, not one per question
+
+    created = {q.id: q for q in Question.query.filter(Question.id.in_(ids))}
+    assert [created[i].question for i in ids[:5]] == ["Single", "Multiple", "Blank", "Puzzle", "Match"]
+    assert created[ids[1]].question_data["correct_answers"] == [0, 2]
+
+    listed = json.loads(client.get(f"/api/v2/tasks/{test_task.id}/questions").data)
+    assert len(listed) == 20
+
+
+def test_batch_is_all_or_nothing(client, app, test_task):
+    bad = QUESTIONS + [{"question": "Broken", "question_type": "puzzle_game"}, "not an object"]
+    res = client.post(f"/api/tasks/{test_task.id}/questions/batch", json={"questions": bad})
+    assert res.status_code == 400
+    assert json.loads(res.data)["errors"] == ["Question 6: Puzzle solution is required",
+                                              "Question 7: Question text is required"]
+    assert Question.query.filter_by(task_id=test_task.id).count() == 0
+
+
+def test_batch_respects_questions_per_task_limit(client, app, test_task):
+    app.config["QUESTION_TASK_MAX"] = 12
+    url = f"/api/tasks/{test_task.id}/questions/batch"
+    assert client.post(url, json={"questions": QUESTIONS * 2}).status_code == 201
+    res = client.post(url, json={"questions": QUESTIONS})
+    assert res.status_code == 400 and json.loads(res.data)["error"] == (
+        "Maximum 12 questions allowed per task, room for 2 more")
+    assert client.post(url, json={"questions": QUESTIONS[:2]}).status_code == 201
+    assert Question.query.filter_by(task_id=test_task.id).count() == 12
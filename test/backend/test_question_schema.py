@@ -0,0 +1,69 @@
+"""
+Tests for backend/question_schema.py
+Coverage focus:
+- Compact v2 projection per question type, with and without answer keys
+- GET /api/v2/tasks/<id>/questions student and teacher views
+"""
+
+import json
+from types import SimpleNamespace
+
+from models import db, Question
+from question_schema import compact_question
+
+
+def _question(**fields):
+    defaults = dict(id=1, question="Q?", question_type="single_choice", question_data=None, correct_answer=None,
+                    option_a=None, option_b=None, option_c=None, option_d=None, difficulty="easy", score=2,
+                    description=None, image_path=None, video_path=None, video_type=None, video_url=None)
+    return SimpleNamespace(**dict(defaults, **fields))
+
+
+def test_single_choice_uses_option_list():
+    q = _question(option_a="a", option_b="b", option_c="c", correct_answer="B", image_path="t/x.png")
+    assert compact_question(q) == {"id": 1, "type": "single_choice", "question": "Q?", "difficulty": "easy",
+                                   "score": 2, "options": ["a", "b", "c"], "image_url": "/uploads/questions/t/x.png"}
+    assert compact_question(q, include_answers=True)["correct_answer"] == "B"
+
+
+def test_answer_keys_only_for_teachers():
+    multiple = _question(question_type="multiple_choice",
+                         question_data={"options": ["x", "y"], "correct_answers": [1]})
+    assert compact_question(multiple) == {"id": 1, "type": "multiple_choice", "question": "Q?",
+                                          "difficulty": "easy", "score": 2, "options": ["x", "y"]}
+    assert compact_question(multiple, include_answers=True)["data"] == {"correct_answers": [1]}
+
+    blank = _question(question_type="fill_blank", question_data={"blank_answers": ["a", "b"]})
+    assert compact_question(blank)["blank_count"] == 2 and "data" not in compact_question(blank)
+
+    puzzle = _question(question_type="puzzle_game",
+                       question_data={"puzzle_solution": "a b", "puzzle_fragments": ["b", "a"]})
+    assert compact_question(puzzle)["data"] == {"puzzle_fragments": ["b", "a"]}
+
+    matching = _question(question_type="matching_task", question_data={
+        "left_items": ["l"], "right_items": ["r"], "correct_matches": [{"left": 0, "right": 0}]})
+    assert compact_question(matching)["data"] == {"left_items": ["l"], "right_items": ["r"]}
+
+    broken = _question(question_type="matching_task", question_data=None)
+    assert "data" not in compact_question(broken)
+
+
+def test_v2_endpoint_views(client, app, test_task):
+    db.session.add(Question(task_id=test_task.id, question="Pick", question_type="multiple_choice",
+                            question_data={"options": ["x", "y", "z"], "correct_answers": [0, 2]},
+                            difficulty="easy", score=1))
+    db.session.commit()
+    url = f"/api/v2/tasks/{test_task.id}/questions"
+
+    student = client.get(url)
+    teacher = client.get(url + "?role=tea")
+    assert student.status_code == 200 and teacher.status_code == 200
+    assert json.loads(student.data)[0] == {"id": json.loads(student.data)[0]["id"], "type": "multiple_choice",
+                                           "question": "Pick", "difficulty": "easy", "score": 1,
+                                           "options": ["x", "y", "z"]}
+    assert json.loads(teacher.data)[0]["data"] == {"correct_answers": [0, 2]}
+    assert student.headers["ETag"] != teacher.headers["ETag"]
+    assert len(student.data) < len(client.get(f"/api/tasks/{test_task.id}/questions").data)
+
+    assert client.get(url, headers={"If-None-Match": student.headers["ETag"]}).status_code == 304
+    assert client.get("/api/v2/tasks/999999/questions").status_code == 404
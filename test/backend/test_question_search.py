@@ -0,0 +1,104 @@
+"""
+Tests for backend/question_search.py and the question search endpoint
+Coverage focus:
+- Index kept in sync by the batch, single, update, delete and task delete routes
+- Ranking, prefix matching, filters, pagination and query sanitizing
+- Building the index for an existing questions table
+"""
+
+import json
+
+from sqlalchemy import text
+
+from models import db, Question, Task
+from question_search import SEARCH_TABLE, create_search_index, search_questions, search_terms
+
+
+def _batch(client, task_id, questions):
+    res = client.post(f"/api/tasks/{task_id}/questions/batch", json={"questions": questions})
+    assert res.status_code == 201
+    return json.loads(res.data)["ids"]
+
+
+def _search(client, query, **params):
+    res = client.get("/api/questions/search", query_string=dict(q=query, role="tea", **params))
+    assert res.status_code == 200
+    return json.loads(res.data)
+
+
+def _blank(question, description=None):
+    return {"question": question, "question_type": "fill_blank", "blank_answers": ["x"], "description": description}
+
+
+def test_search_ranks_question_text_over_options(client, test_task):
+    ids = _batch(client, test_task.id, [
+        {"question": "Pick the gas", "question_type": "multiple_choice",
+         "options": ["Oxygen", "Iron"], "correct_answers": [0]},
+        _blank("Oxygen is needed for ___"),
+        _blank("Unrelated"),
+    ])
+    body = _search(client, "oxyg")
+    assert body["total"] == 2
+    assert [r["id"] for r in body["results"]] == [ids[1], ids[0]]
+    assert body["results"][0]["task_name"] == "Test Task"
+    assert body["results"][0]["data"] == {"blank_answers": ["x"]}
+
+
+def test_index_follows_update_and_delete(client, test_task):
+    [question_id] = _batch(client, test_task.id, [_blank("Photosynthesis in plants")])
+    res = client.put(f"/api/questions/{question_id}", json={"question": "Respiration in cells"})
+    assert res.status_code == 200
+    assert _search(client, "photosynthesis")["total"] == 0
+    assert _search(client, "respiration cells")["total"] == 1
+
+    assert client.delete(f"/api/questions/{question_id}").status_code == 200
+    assert _search(client, "respiration")["total"] == 0
+
+
+def test_single_question_and_task_delete(client, test_task):
+    res = client.post(f"/api/tasks/{test_task.id}/questions", data={
+        "question": "Velocity units", "question_type": "single_choice",
+        "option_a": "m/s", "option_b": "kg", "option_c": "N", "option_d": "J", "correct_answer": "A"})
+    assert res.status_code == 201
+    assert _search(client, "velocity")["total"] == 1
+
+    assert client.delete(f"/api/tasks/{test_task.id}").status_code == 200
+    assert db.session.execute(text(f"SELECT COUNT(*) FROM {SEARCH_TABLE}")).scalar() == 0
+
+
+def test_filters_and_pagination(client, test_task):
+    other = Task(name="Other", introduction="other")
+    db.session.add(other)
+    db.session.commit()
+    ids = _batch(client, test_task.id, [_blank(f"Energy question {i}") for i in range(5)])
+    _batch(client, other.id, [_blank("Energy elsewhere")])
+
+    assert _search(client, "energy")["total"] == 6
+    page = _search(client, "energy", task_id=test_task.id, per_page=2, page=3)
+    assert (page["total"], page["page"], page["per_page"]) == (5, 3, 2)
+    assert len(page["results"]) == 1 and page["results"][0]["id"] in ids
+    assert _search(client, "energy", type="matching_task")["total"] == 0
+    assert _search(client, "energy", page=9)["results"] == []
+
+
+def test_query_operators_are_plain_words(client, test_task):
+    _batch(client, test_task.id, [_blank("Mole AND mass", description="NEAR the end")])
+    assert search_terms('mole" OR (mass* NEAR') == ["mole", "or", "mass", "near"]
+    assert _search(client, 'mole" (mass*')["total"] == 1
+    assert _search(client, "end")["total"] == 1
+
+
+def test_search_requires_teacher_and_query(client):
+    assert client.get("/api/questions/search?q=x").status_code == 403
+    assert client.get("/api/questions/search?q=%20&role=tea").status_code == 400
+
+
+def test_create_search_index_fills_existing_questions(test_task):
+    db.session.execute(text(f"DROP TABLE {SEARCH_TABLE}"))
+    db.session.add_all([Question(task_id=test_task.id, question=f"Catalyst {i}", question_type="fill_blank",
+                                 question_data={"blank_answers": ["x"]}, difficulty="Easy", score=1)
+                        for i in range(3)])
+    db.session.commit()
+
+    create_search_index(chunk_size=2)
+    assert search_questions("catalyst")[0] == 3
@@ -492,8 +492,9 @@ def test_create_max_questions_limit(client, app, test_task, auth_headers_teacher
         assert r.status_code == 400
 
 
-def test_batch_edge_cases(client, test_task, auth_headers_teacher):
-    """Extra batch endpoint coverage: no questions and >100 limit, plus 404 for invalid task."""
+def test_batch_edge_cases(client, app, test_task, auth_headers_teacher):
+    """Extra batch endpoint coverage: no questions and >QUESTION_BATCH_MAX limit, plus 404 for invalid task."""
+    app.config["QUESTION_BATCH_MAX"] = 100
     # No questions provided
     r1 = client.post(
         f"/api/tasks/{test_task.id}/questions/batch",
@@ -882,8 +883,9 @@ def test_create_single_choice_with_video_success(client, test_task, auth_headers
         assert res.status_code == 201
 
 
-def test_create_questions_batch_limit_and_empty(client, test_task, auth_headers_teacher):
-    """Hit 'no questions' and '>100 questions' branches for batch creation."""
+def test_create_questions_batch_limit_and_empty(client, app, test_task, auth_headers_teacher):
+    """Hit 'no questions' and '>QUESTION_BATCH_MAX questions' branches for batch creation."""
+    app.config["QUESTION_BATCH_MAX"] = 100
     # Empty list
     r1 = client.post(
         f"/api/tasks/{test_task.id}/questions/batch",
@@ -915,3 +917,18 @@ def test_create_questions_batch_limit_and_empty(client, test_task, auth_headers_
         assert r2.status_code == 400
 
 
+
+
+def test_check_answer_for_question_missing_from_cached_plan(client, app, test_task):
+    """A question added without a version bump is graded on its own instead of failing."""
+    from grading import get_grading_plan
+
+    get_grading_plan(test_task.id)  # cache a plan without the question
+    q = Question(task_id=test_task.id, question="Capital?", question_type="fill_blank",
+                 question_data={"blank_answers": ["Paris"]}, difficulty="easy", score=2)
+    db.session.add(q)
+    db.session.commit()
+
+    res = client.post(f"/api/questions/{q.id}/check", json={"answer": ["paris"]})
+    assert res.status_code == 200
+    assert json.loads(res.data)["correct"] is True
@@ -0,0 +1,139 @@
+"""
+Tests for backend/regrade.py
+Coverage focus:
+- Regrade triggered by update_question when the answer key changes
+- Chunked replay of stored answers, aggregates and achievements updated
+- Status endpoint and manual trigger, legacy results without stored answers
+- Recovery of jobs left running by a dead worker, resubmissions during a chunk
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+
+from models import db, Task, Question, Achievement, StudentAchievement, StudentTaskResult, StudentStats, RegradeJob
+from background import shutdown_executors
+from grading import compile_grading_plan
+from regrade import run_regrade_job, sweep_regrade_jobs, start_regrade_sweeper, _regrade_chunk
+
+
+def _task_with_questions(app, count=3):
+    task = Task(name="Regrade Task")
+    db.session.add(task)
+    db.session.commit()
+    qs = [Question(task_id=task.id, question=f"Q{i}?", question_type="single_choice",
+                   option_a="A", option_b="B", correct_answer="A", difficulty="easy", score=2)
+          for i in range(count)]
+    db.session.add_all(qs)
+    db.session.add(Achievement(task_id=task.id, name="Perfect Score", condition="all correct"))
+    db.session.commit()
+    return task.id, [q.id for q in qs]
+
+
+def test_fixing_answer_key_regrades_stored_results(client, app, test_student):
+    app.config["REGRADE_CHUNK_SIZE"] = 1
+    sid = test_student.student_id
+    t_id, q_ids = _task_with_questions(app)
+
+    # Student answers B on the last question, which the teacher later fixes to B
+    answers = {str(q_ids[0]): "A", str(q_ids[1]): "A", str(q_ids[2]): "B"}
+    first = json.loads(client.post(f"/api/tasks/{t_id}/submit", json={"student_id": sid, "answers": answers}).data)
+    assert first["total_score"] == 4
+
+    res = client.put(f"/api/questions/{q_ids[2]}", json={"correct_answer": "B"})
+    job_id = json.loads(res.data)["regrade_job_id"]
+    shutdown_executors(app)  # wait for the background job
+
+    status = json.loads(client.get(f"/api/regrade-jobs/{job_id}").data)
+    assert status["status"] == "done"
+    assert (status["total"], status["processed"], status["changed"]) == (1, 1, 1)
+
+    db.session.expire_all()
+    result = StudentTaskResult.query.filter_by(student_id=sid, task_id=t_id).first()
+    assert result.total_score == 6 and result.correct_count == 3
+    stats = StudentStats.query.filter_by(student_id=sid).first()
+    assert stats.total_score == 6 and stats.correct_count == 3 and stats.tasks_completed == 1
+    assert StudentAchievement.query.filter_by(student_id=sid, achievement_name="Perfect Score").count() == 1
+
+
+def test_non_grading_edit_does_not_regrade(client, app):
+    t_id, q_ids = _task_with_questions(app, 1)
+    res = client.put(f"/api/questions/{q_ids[0]}", json={"description": "just text"})
+    assert "regrade_job_id" not in json.loads(res.data)
+
+
+def test_text_edit_resending_answer_key_does_not_regrade(client, app):
+    t_id, q_ids = _task_with_questions(app, 1)
+    # The edit pages send the unchanged answer key along with every save
+    body = {"question": "Fixed typo?", "question_type": "single_choice", "score": 2, "correct_answer": "A"}
+    res = client.put(f"/api/questions/{q_ids[0]}", json=body)
+    assert res.status_code == 200 and "regrade_job_id" not in json.loads(res.data)
+    assert RegradeJob.query.count() == 0
+
+    res = client.put(f"/api/questions/{q_ids[0]}", json=dict(body, correct_answer="B"))
+    assert "regrade_job_id" in json.loads(res.data)
+
+
+def test_manual_regrade_skips_legacy_results(client, app, test_student):
+    app.config["REGRADE_WORKERS"] = 0
+    t_id, _ = _task_with_questions(app, 1)
+    db.session.add(StudentTaskResult(student_id=test_student.student_id, student_name=test_student.real_name,
+                                     task_id=t_id, task_name="Regrade Task", total_score=2))
+    db.session.commit()
+
+    res = client.post(f"/api/tasks/{t_id}/regrade")
+    assert res.status_code == 202
+    job_id = json.loads(res.data)["job"]["id"]
+    assert json.loads(client.get(f"/api/regrade-jobs/{job_id}").data)["status"] == "queued"
+
+    run_regrade_job(job_id)
+    status = json.loads(client.get(f"/api/regrade-jobs/{job_id}").data)
+    assert status["status"] == "done" and status["skipped"] == 1 and status["changed"] == 0
+
+
+def test_regrade_not_found(client):
+    assert client.post("/api/tasks/99999/regrade").status_code == 404
+    assert client.get("/api/regrade-jobs/99999").status_code == 404
+
+
+def test_sweep_resumes_job_left_running(client, app, test_student):
+    sid = test_student.student_id
+    t_id, q_ids = _task_with_questions(app)
+    answers = {str(q): "B" for q in q_ids}
+    client.post(f"/api/tasks/{t_id}/submit", json={"student_id": sid, "answers": answers})
+    Question.query.update({"correct_answer": "B"})
+    hour_ago = datetime.now(timezone.utc) - timedelta(hours=1)
+    stale = RegradeJob(task_id=t_id, status="running", processed=1, started_at=hour_ago, heartbeat_at=hour_ago)
+    alive = RegradeJob(task_id=t_id, status="running", started_at=hour_ago, heartbeat_at=datetime.now(timezone.utc))
+    db.session.add_all([stale, alive])
+    db.session.commit()
+
+    assert sweep_regrade_jobs(app) == 1
+    shutdown_executors(app)
+    db.session.expire_all()
+    assert (stale.status, stale.processed, stale.changed) == ("done", 1, 1)
+    assert alive.status == "running"
+    assert StudentTaskResult.query.filter_by(student_id=sid, task_id=t_id).first().total_score == 6
+
+    app.config["REGRADE_WORKERS"] = 0
+    assert start_regrade_sweeper(app) is None
+
+
+def test_chunk_leaves_resubmitted_result_alone(client, app, test_student):
+    sid = test_student.student_id
+    t_id, q_ids = _task_with_questions(app)
+    client.post(f"/api/tasks/{t_id}/submit", json={"student_id": sid, "answers": {str(q): "B" for q in q_ids}})
+    Question.query.update({"correct_answer": "B"})
+    db.session.commit()
+    results = StudentTaskResult.query.filter_by(task_id=t_id).all()
+
+    # The student resubmits between the chunk load and its write
+    db.session.execute(update(StudentTaskResult).where(StudentTaskResult.id == results[0].id)
+                       .values(completed_at=datetime.now(timezone.utc) + timedelta(minutes=1), total_score=2)
+                       .execution_options(synchronize_session=False))
+    assert _regrade_chunk(compile_grading_plan(t_id), results, datetime.now(timezone.utc)) == (0, 0)
+    db.session.commit()
+    db.session.expire_all()
+    assert StudentTaskResult.query.filter_by(task_id=t_id).first().total_score == 2
+    assert StudentStats.query.filter_by(student_id=sid).first().total_score == 0
@@ -0,0 +1,97 @@
+"""
+Tests for backend/singleflight.py
+Coverage focus:
+- Concurrent calls with one key run once and share the result or exception
+- Callers fall back to their own call when the running one times out
+- Concurrent cold-cache question list requests query once
+"""
+
+import json
+import threading
+import time
+
+import questions
+from models import db, Question
+from singleflight import SingleFlight, get_single_flight
+
+
+def _run_concurrently(count, target):
+    results = [None] * count
+    errors = [None] * count
+
+    def worker(index):
+        try:
+            results[index] = target()
+        except Exception as e:
+            errors[index] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return b"payload"
+
+    results, errors = _run_concurrently(8, lambda: flight.do(("questions", 1), slow))
+    assert results == [b"payload"] * 8 and errors == [None] * 8
+    assert len(calls) == 1
+    assert flight.stats() == {"in_flight": 0,
+                              "endpoints": {"questions": {"executions": 1, "coalesced": 7, "timeouts": 0}}}
+
+    # Finished calls are not cached
+    assert flight.do(("questions", 1), lambda: b"fresh") == b"fresh"
+
+
+def test_errors_are_shared_and_not_remembered():
+    flight = SingleFlight()
+
+    def failing():
+        time.sleep(0.1)
+        raise ValueError("boom")
+
+    _, errors = _run_concurrently(4, lambda: flight.do(("tasks", "stu"), failing))
+    assert all(isinstance(e, ValueError) for e in errors)
+    assert flight.do(("tasks", "stu"), lambda: "ok") == "ok"
+
+
+def test_waiters_time_out_and_run_themselves():
+    flight = SingleFlight(timeout=0.05)
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: flight.do(("tasks", "tea"), release.wait))
+    leader.start()
+    time.sleep(0.02)
+    assert flight.do(("tasks", "tea"), lambda: "own") == "own"
+    release.set()
+    leader.join()
+    assert flight.stats()["endpoints"]["tasks"]["timeouts"] == 1
+
+
+def test_cold_question_list_is_built_once(app, test_task, monkeypatch):
+    db.session.add(Question(task_id=test_task.id, question="Herd?", question_type="single_choice",
+                            option_a="A", option_b="B", correct_answer="A", difficulty="easy", score=1))
+    db.session.commit()
+    builds = []
+    original = questions._question_list
+
+    def slow_list(task_id):
+        builds.append(task_id)
+        time.sleep(0.3)
+        return original(task_id)
+
+    monkeypatch.setattr(questions, "_question_list", slow_list)
+    url = f"/api/tasks/{test_task.id}/questions"
+    results, errors = _run_concurrently(6, lambda: app.test_client().get(url))
+    assert errors == [None] * 6
+    assert all(r.status_code == 200 and json.loads(r.data)[0]["question"] == "Herd?" for r in results)
+    assert len(builds) == 1
+    assert get_single_flight(app).stats()["endpoints"]["questions"]["coalesced"] >= 1
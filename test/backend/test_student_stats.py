@@ -0,0 +1,141 @@
+"""
+Tests for backend/student_stats.py and backend/schema_upgrades.py
+Coverage focus:
+- Aggregates maintained incrementally by submit_task (first submit and resubmit)
+- Lazy rebuild from legacy results without per-result counts, stored by the next submission
+- One aggregates-row lock per submission
+- Aggregates dropped when a task (and its results) is deleted
+- Concurrent first submissions of one student counted once
+- Adding columns missing from older tables
+"""
+
+import json
+
+from sqlalchemy import inspect, text
+
+import student_stats
+from models import db, Task, Question, StudentTaskResult, StudentStats
+from schema_upgrades import upgrade_schema
+
+
+def _task_with_questions(app, name, count, score=2):
+    with app.app_context():
+        task = Task(name=name)
+        db.session.add(task)
+        db.session.commit()
+        qs = [
+            Question(task_id=task.id, question=f"Q{i}?", question_type="single_choice",
+                     option_a="A", option_b="B", correct_answer="A", difficulty="easy", score=score)
+            for i in range(count)
+        ]
+        db.session.add_all(qs)
+        db.session.commit()
+        return task.id, [q.id for q in qs]
+
+
+def _stats(student_id):
+    db.session.expire_all()
+    return StudentStats.query.filter_by(student_id=student_id).first()
+
+
+def test_submit_updates_and_replaces_aggregates(client, app, test_student):
+    sid = test_student.student_id
+    t_id, q_ids = _task_with_questions(app, "Stats Task", 4)
+
+    # 3 of 4 correct
+    answers = {str(q): "A" for q in q_ids[:3]}
+    answers[str(q_ids[3])] = "B"
+    assert client.post(f"/api/tasks/{t_id}/submit", json={"student_id": sid, "answers": answers}).status_code == 200
+
+    stats = _stats(sid)
+    assert (stats.questions_answered, stats.correct_count, stats.total_score, stats.possible_score, stats.tasks_completed) == (4, 3, 6, 8, 1)
+
+    # Resubmitting the same task replaces its contribution instead of adding to it
+    answers = {str(q): "A" for q in q_ids}
+    client.post(f"/api/tasks/{t_id}/submit", json={"student_id": sid, "answers": answers})
+    stats = _stats(sid)
+    assert (stats.questions_answered, stats.correct_count, stats.total_score, stats.possible_score, stats.tasks_completed) == (4, 4, 8, 8, 1)
+
+    profile = json.loads(client.get(f"/api/students/{sid}/profile").data)["statistics"]
+    assert profile["accuracy_rate"] == 100.0
+    assert profile["average_score"] == 100.0
+    assert profile["completed_tasks"] == 1
+
+
+def test_profile_rebuilds_from_legacy_results(client, app, test_student):
+    sid = test_student.student_id
+    t_id, _ = _task_with_questions(app, "Legacy Task", 2, score=5)
+    db.session.add(StudentTaskResult(student_id=sid, student_name=test_student.real_name,
+                                     task_id=t_id, task_name="Legacy Task", total_score=5))
+    db.session.commit()
+    assert _stats(sid) is None
+
+    profile = json.loads(client.get(f"/api/students/{sid}/profile").data)["statistics"]
+    assert profile["accuracy_rate"] == 50.0
+    assert profile["total_questions_answered"] == 2
+
+    # The read does not commit; the next submission stores the rebuilt row
+    db.session.rollback()
+    assert _stats(sid) is None
+    t2_id, q_ids = _task_with_questions(app, "Next Task", 1)
+    client.post(f"/api/tasks/{t2_id}/submit", json={"student_id": sid, "answers": {str(q_ids[0]): "A"}})
+    stats = _stats(sid)
+    assert (stats.tasks_completed, stats.questions_answered, stats.correct_count) == (2, 3, 2)
+
+
+def test_submit_locks_aggregates_once(client, app, test_student, monkeypatch):
+    sid = test_student.student_id
+    t_id, q_ids = _task_with_questions(app, "Lock Task", 2)
+    locked = []
+    insert_ignore = student_stats.insert_ignore
+    monkeypatch.setattr(student_stats, "insert_ignore",
+                        lambda model, *args, **kwargs: locked.append(model) or insert_ignore(model, *args, **kwargs))
+
+    for _ in range(2):
+        client.post(f"/api/tasks/{t_id}/submit", json={"student_id": sid, "answers": {str(q_ids[0]): "A"}})
+        assert locked.count(StudentStats) == 1
+        locked.clear()
+
+
+def test_delete_task_drops_affected_aggregates(client, app, test_student):
+    sid = test_student.student_id
+    t_id, q_ids = _task_with_questions(app, "Doomed Task", 1)
+    client.post(f"/api/tasks/{t_id}/submit", json={"student_id": sid, "answers": {str(q_ids[0]): "A"}})
+    assert _stats(sid) is not None
+
+    assert client.delete(f"/api/tasks/{t_id}").status_code == 200
+    assert _stats(sid) is None
+
+    profile = json.loads(client.get(f"/api/students/{sid}/profile").data)["statistics"]
+    assert profile["completed_tasks"] == 0
+
+
+def test_upgrade_schema_adds_missing_columns(app):
+    with db.engine.begin() as conn:
+        conn.execute(text("ALTER TABLE student_task_results DROP COLUMN max_score"))
+
+    upgrade_schema()
+    upgrade_schema()  # idempotent
+
+    columns = {c["name"] for c in inspect(db.engine).get_columns("student_task_results")}
+    assert "max_score" in columns
+
+
+def test_concurrent_first_submissions_count_once(client, app, test_student):
+    from submission_queue import sweep_submission_queue
+    from background import shutdown_executors
+    from models import SubmissionTicket
+
+    app.config["SUBMISSION_WORKERS"] = 4
+    t_id, q_ids = _task_with_questions(app, "Race", 2)
+    payload = json.dumps({"student_id": test_student.student_id, "answers": {str(q_ids[0]): "A"}})
+    db.session.add_all([SubmissionTicket(id=f"t{i}", task_id=t_id, student_id=test_student.student_id,
+                                         payload_json=payload, status="queued") for i in range(4)])
+    db.session.commit()
+
+    assert sweep_submission_queue(app) == 4
+    shutdown_executors(app)
+    db.session.expire_all()
+    assert {t.status for t in SubmissionTicket.query} == {"done"}
+    stats = _stats(test_student.student_id)
+    assert (stats.tasks_completed, stats.questions_answered, stats.total_score) == (1, 1, 2)
@@ -0,0 +1,109 @@
+"""
+Tests for backend/submission_queue.py (asynchronous submit mode)
+Coverage focus:
+- 202 Accepted with a ticket, processed by the in-process worker pool
+- Per-request opt-in with "Prefer: respond-async"
+- External runner path (no in-process workers) and error results
+- Polling unknown tickets
+- Sweeping tickets left queued or processing by a previous process
+"""
+
+import json
+
+from models import db, Task, Question, Student, StudentTaskResult, SubmissionTicket
+from background import shutdown_executors
+from submission_queue import process_pending_tickets
+
+
+def _task_with_question(app):
+    task = Task(name="Async Task")
+    db.session.add(task)
+    db.session.commit()
+    q = Question(task_id=task.id, question="Q?", question_type="single_choice",
+                 option_a="A", option_b="B", correct_answer="A", difficulty="easy", score=3)
+    db.session.add(q)
+    db.session.commit()
+    return task.id, q.id
+
+
+def test_async_submit_returns_ticket_and_result(client, app, test_student):
+    app.config["SUBMISSION_MODE"] = "async"
+    t_id, q_id = _task_with_question(app)
+
+    res = client.post(f"/api/tasks/{t_id}/submit",
+                      json={"student_id": test_student.student_id, "answers": {str(q_id): "A"}})
+    assert res.status_code == 202
+    ticket_id = json.loads(res.data)["ticket_id"]
+    assert res.headers["Location"] == f"/api/submissions/{ticket_id}"
+
+    shutdown_executors(app)  # wait for the worker to finish
+
+    poll = json.loads(client.get(f"/api/submissions/{ticket_id}").data)
+    assert poll["status"] == "done"
+    assert poll["status_code"] == 200
+    assert poll["result"]["total_score"] == 3
+    db.session.expire_all()
+    assert StudentTaskResult.query.filter_by(task_id=t_id).count() == 1
+
+
+def test_prefer_header_and_external_runner(client, app, test_student):
+    app.config["SUBMISSION_WORKERS"] = 0
+    t_id, q_id = _task_with_question(app)
+
+    res = client.post(f"/api/tasks/{t_id}/submit",
+                      json={"student_id": test_student.student_id, "answers": {str(q_id): "B"}},
+                      headers={"Prefer": "respond-async"})
+    assert res.status_code == 202
+    ticket_id = json.loads(res.data)["ticket_id"]
+    assert json.loads(client.get(f"/api/submissions/{ticket_id}").data)["status"] == "queued"
+
+    assert process_pending_tickets() == 1
+    poll = json.loads(client.get(f"/api/submissions/{ticket_id}").data)
+    assert poll["status"] == "done"
+    assert poll["result"]["total_score"] == 0
+
+
+def test_async_errors_are_stored_on_ticket(client, app):
+    app.config.update(SUBMISSION_MODE="async", SUBMISSION_WORKERS=0)
+
+    bad = client.post("/api/tasks/1/submit", json={"answers": "nope"})
+    assert bad.status_code == 400  # malformed payloads are rejected before enqueueing
+
+    res = client.post("/api/tasks/1/submit", json={"student_id": "NO_SUCH", "answers": {}})
+    ticket_id = json.loads(res.data)["ticket_id"]
+    process_pending_tickets()
+    poll = json.loads(client.get(f"/api/submissions/{ticket_id}").data)
+    assert poll["status_code"] == 404
+    assert SubmissionTicket.query.count() == 1
+
+
+def test_unknown_ticket(client):
+    assert client.get("/api/submissions/doesnotexist").status_code == 404
+
+
+def test_sweep_resumes_tickets_left_by_a_previous_process(client, app, test_student):
+    from datetime import datetime, timedelta, timezone
+    from submission_queue import start_submission_sweeper, sweep_submission_queue
+
+    t_id, q_id = _task_with_question(app)
+    other = Student(real_name="Other", student_id="7654321", username="7654321@stu.com", password="x")
+    db.session.add(other)
+    long_ago = datetime.now(timezone.utc) - timedelta(hours=1)
+
+    def ticket(ticket_id, student_id, **fields):
+        payload = json.dumps({"student_id": student_id, "answers": {str(q_id): "A"}})
+        return SubmissionTicket(id=ticket_id, task_id=t_id, student_id=student_id, payload_json=payload,
+                                created_at=long_ago, **fields)
+
+    # One ticket never reached a worker, the other's worker died mid-processing
+    db.session.add_all([ticket("queued", test_student.student_id, status="queued"),
+                        ticket("stale", "7654321", status="processing", started_at=long_ago)])
+    db.session.commit()
+
+    assert sweep_submission_queue(app) == 2
+    shutdown_executors(app)
+    db.session.expire_all()
+    assert {t.id: t.status for t in SubmissionTicket.query} == {"queued": "done", "stale": "done"}
+
+    app.config["SUBMISSION_WORKERS"] = 0
+    assert start_submission_sweeper(app) is None  # the external runner sweeps instead
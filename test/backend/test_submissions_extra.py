@@ -386,3 +386,37 @@ def test_submit_progress_delete_exception_is_ignored(client, app, test_student,
     r = client.post(f"/api/tasks/{t_id}/submit", json=payload)
     assert r.status_code == 200
 
+
+
+def test_submit_statement_count_independent_of_question_count(client, app):
+    """Questions are loaded in one query, so SQL statements do not grow with task size."""
+    from models import Student
+
+    counts = []
+    for size in (1, 20):
+        with app.app_context():
+            student = Student(
+                real_name=f"Count {size}",
+                student_id=f"70000{size:02d}",
+                username=f"70000{size:02d}@stu.com",
+                password="x",
+            )
+            t = Task(name=f"Count Task {size}")
+            db.session.add_all([student, t])
+            db.session.commit()
+            qs = [
+                Question(task_id=t.id, question=f"Q{i}?", question_type="single_choice",
+                         option_a="A", option_b="B", correct_answer="A", difficulty="easy", score=1)
+                for i in range(size)
+            ]
+            db.session.add_all(qs)
+            db.session.commit()
+            t_id, s_id = t.id, student.student_id
+            answers = {str(q.id): "A" for q in qs}
+
+        res = client.post(f"/api/tasks/{t_id}/submit", json={"student_id": s_id, "answers": answers})
+        assert res.status_code == 200
+        assert json.loads(res.data)["total_score"] == size
+        counts.append(int(res.headers["X-SQL-Statement-Count"]))
+
+    assert counts[0] == counts[1]
@@ -0,0 +1,75 @@
+"""
+Tests for backend/task_content.py
+Coverage focus:
+- Task and question reads carry ETag / Last-Modified and answer 304 when current
+- Task and question mutations bump the content version
+- The 304 path reads only the version columns
+"""
+
+import json
+
+from models import db, Task
+from sql_stats import count_statements
+
+
+def _create_question(client, task_id, text="Q1?"):
+    return client.post(f"/api/tasks/{task_id}/questions", data={
+        "question": text, "question_type": "single_choice",
+        "option_a": "A", "option_b": "B", "option_c": "C", "option_d": "D", "correct_answer": "A", "difficulty": "easy", "description": "d"
+    })
+
+
+def test_detail_and_questions_revalidate(client, app, test_task):
+    t_id = test_task.id
+    for url in (f"/api/tasks/{t_id}", f"/api/tasks/{t_id}/questions"):
+        first = client.get(url)
+        etag = first.headers["ETag"]
+        assert first.headers["Last-Modified"]
+
+        with count_statements(db.engine) as counter:
+            cached = client.get(url, headers={"If-None-Match": etag})
+        assert cached.status_code == 304 and cached.data == b""
+        assert cached.headers["ETag"] == etag
+        assert counter.count == 1
+
+        by_date = client.get(url, headers={"If-Modified-Since": first.headers["Last-Modified"]})
+        assert by_date.status_code == 304
+
+    assert client.get(f"/api/tasks/{t_id}").headers["ETag"] != client.get(f"/api/tasks/{t_id}/questions").headers["ETag"]
+
+
+def test_mutations_bump_content_version(client, app, test_task):
+    t_id = test_task.id
+    url = f"/api/tasks/{t_id}/questions"
+    etag = client.get(url).headers["ETag"]
+
+    assert _create_question(client, t_id).status_code == 201
+    fresh = client.get(url, headers={"If-None-Match": etag})
+    assert fresh.status_code == 200 and fresh.headers["ETag"] != etag
+    question_id = json.loads(fresh.data)[-1]["id"]
+
+    etag = fresh.headers["ETag"]
+    client.put(f"/api/questions/{question_id}", json={"question": "Changed?"})
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 200
+
+    detail_etag = client.get(f"/api/tasks/{t_id}").headers["ETag"]
+    client.put(f"/api/tasks/{t_id}", json={"introduction": "new intro"})
+    assert client.get(f"/api/tasks/{t_id}", headers={"If-None-Match": detail_etag}).status_code == 200
+
+    version = db.session.get(Task, t_id).content_version
+    client.delete(f"/api/questions/{question_id}")
+    db.session.expire_all()
+    assert db.session.get(Task, t_id).content_version == version + 1
+
+
+def test_task_list_revalidates_per_role(client, app, test_task):
+    etag = client.get("/api/tasks").headers["ETag"]
+    assert client.get("/api/tasks", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/api/tasks?role=tea", headers={"If-None-Match": etag}).status_code == 200
+
+    client.put(f"/api/tasks/{test_task.id}", json={"introduction": "changed"})
+    assert client.get("/api/tasks", headers={"If-None-Match": etag}).status_code == 200
+
+    etag = client.get("/api/tasks").headers["ETag"]
+    client.post("/api/tasks", json={"name": "Another Task", "introduction": "i"})
+    assert client.get("/api/tasks", headers={"If-None-Match": etag}).status_code == 200
@@ -1,7 +1,7 @@
 """
 Additional tests to increase coverage for backend/tasks.py.
 Covered endpoints:
-- get_tasks (student vs teacher visibility)
+- get_tasks (student vs teacher visibility, question counts in one query)
 - create_task (success and error cases)
 - get_task_detail (200 and 404)
 - update_task (publish_at parse, video fields set/clear)
@@ -25,6 +25,7 @@ from models import (
     Achievement,
     StudentAchievement,
 )
+from sql_stats import count_statements
 
 
 def test_get_tasks_student_vs_teacher_visibility(client, app, test_task):
@@ -59,6 +60,34 @@ def test_get_tasks_student_vs_teacher_visibility(client, app, test_task):
     assert this.get("image_url") and this.get("video_type") == "youtube"
 
 
+def test_get_tasks_counts_questions_in_one_query(client, app):
+    def add_tasks(count, questions_each):
+        for _ in range(count):
+            task = Task(name=f"Counted {Task.query.count()}", introduction="i")
+            db.session.add(task)
+            db.session.flush()
+            for n in range(questions_each):
+                db.session.add(Question(task_id=task.id, question=f"Q{n}", question_type="single_choice",
+                                        option_a="A", option_b="B", correct_answer="A", difficulty="easy", score=1))
+        db.session.commit()
+
+    add_tasks(2, 3)
+    with count_statements(db.engine) as small:
+        client.get("/api/tasks")
+    add_tasks(6, 10)
+    with count_statements(db.engine) as large:
+        tasks = json.loads(client.get("/api/tasks").data)
+    assert large.count == small.count
+    counts = sorted(t["question_count"] for t in tasks if t["name"].startswith("Counted"))
+    assert counts == [3, 3] + [10] * 6
+
+    empty = Task(name="No Questions", introduction="i")
+    db.session.add(empty)
+    db.session.commit()
+    assert json.loads(client.get("/api/tasks").data)[-1]["question_count"] == 0
+    assert json.loads(client.get(f"/api/tasks/{tasks[0]['id']}").data)["question_count"] == 3
+
+
 def test_create_task_success_and_errors(client):
     # Missing name
     r1 = client.post("/api/tasks", json={"introduction": "x"})
@@ -314,3 +343,69 @@ def test_delete_task_video_and_delete_task_cascade(client, app, test_task, test_
     # Ensure detail 404 afterwards
     assert client.get(f"/api/tasks/{test_task.id}").status_code == 404
 
+
+
+def test_patch_progress_merges_deltas(client, app, test_student):
+    """PATCH merges changed answers into the saved progress and versions every save."""
+    with app.app_context():
+        t = Task(name="Delta Task")
+        db.session.add(t)
+        db.session.commit()
+        t_id = t.id
+    sid = test_student.student_id
+    url = f"/api/tasks/{t_id}/progress"
+
+    res = client.patch(url, json={"student_id": sid, "answers": {"1": "A"}, "current_question_index": 1})
+    assert res.status_code == 200 and res.get_json()["version"] == 1
+
+    client.post(f"/api/tasks/{t_id}/save-progress", json={"student_id": sid, "current_question_index": 2,
+                                                           "answers": {"1": "A", "2": ["long answer"]}})
+    res = client.patch(url, json={"student_id": sid, "answers": {"2": None, "3": "C"}, "base_version": 2})
+    assert res.get_json()["version"] == 3
+
+    body = client.get(f"{url}?student_id={sid}").get_json()
+    assert body["answers"] == {"1": "A", "3": "C"}
+    assert (body["current_question_index"], body["version"]) == (2, 3)
+
+    res = client.patch(url, json={"student_id": sid, "answers": {"1": "B"}, "base_version": 1})
+    assert res.status_code == 409 and res.get_json()["version"] == 3
+
+    assert client.patch(url, json={"student_id": sid, "answers": ["A"]}).status_code == 400
+    assert client.patch(url, json={"answers": {}}).status_code == 400
+    assert client.patch("/api/tasks/99999/progress", json={"student_id": sid, "answers": {}}).status_code == 404
+
+
+def test_progress_etags_and_preconditions(client, app, test_student):
+    """Progress versions are ETags: 304 on If-None-Match, 412 on a stale If-Match."""
+    with app.app_context():
+        t = Task(name="ETag Task")
+        db.session.add(t)
+        db.session.commit()
+        t_id = t.id
+    sid = test_student.student_id
+    save_url, url = f"/api/tasks/{t_id}/save-progress", f"/api/tasks/{t_id}/progress"
+    save = lambda index, **headers: client.post(save_url, headers=headers,
+                                                json={"student_id": sid, "current_question_index": index})
+
+    first = save(1, **{"If-Match": '"progress-v0"'})
+    assert first.headers["ETag"] == '"progress-v1"'
+    assert save(2).headers["ETag"] == '"progress-v2"'
+
+    res = client.get(f"{url}?student_id={sid}")
+    assert res.headers["ETag"] == '"progress-v2"'
+    res = client.get(f"{url}?student_id={sid}", headers={"If-None-Match": '"progress-v2"'})
+    assert res.status_code == 304 and res.data == b""
+
+    # The other tab still holds version 1: its save is rejected and nothing changes
+    stale = save(9, **{"If-Match": '"progress-v1"'})
+    assert stale.status_code == 412 and stale.headers["ETag"] == '"progress-v2"'
+    assert save(3, **{"If-Match": '"progress-v2"'}).headers["ETag"] == '"progress-v3"'
+    assert save(4, **{"If-Match": "*"}).status_code == 200
+
+    res = client.patch(url, headers={"If-Match": '"progress-v3"'}, json={"student_id": sid, "answers": {"1": "A"}})
+    assert res.status_code == 412
+    res = client.patch(url, headers={"If-Match": '"progress-v4"'}, json={"student_id": sid, "answers": {"1": "A"}})
+    assert res.status_code == 200 and res.headers["ETag"] == '"progress-v5"'
+
+    body = client.get(f"{url}?student_id={sid}", headers={"If-None-Match": '"progress-v2"'}).get_json()
+    assert (body["current_question_index"], body["version"]) == (4, 5)
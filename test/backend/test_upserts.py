@@ -0,0 +1,109 @@
+"""
+Tests for backend/upserts.py and the unique (student, task/achievement) constraints
+Coverage focus:
+- Submit writes result, aggregates, achievements and progress delete in one commit
+- Upserts keep one row per student and task; started_at kept when not resent
+- insert_ignore on achievements, unique indexes added to old tables with duplicates removed
+"""
+
+import json
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import event, inspect, text
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Task, Question, Achievement, StudentAchievement, StudentTaskResult, StudentTaskProcess
+from schema_upgrades import upgrade_schema
+from upserts import insert_ignore
+
+
+def _task(app):
+    task = Task(name="Upsert Task")
+    db.session.add(task)
+    db.session.commit()
+    q = Question(task_id=task.id, question="Q?", question_type="single_choice",
+                 option_a="A", option_b="B", correct_answer="A", difficulty="easy", score=1)
+    db.session.add_all([q, Achievement(task_id=task.id, name="Perfect Score", condition="all correct")])
+    db.session.commit()
+    return task.id, q.id
+
+
+def test_submit_is_one_transaction(client, app, test_student):
+    sid = test_student.student_id
+    t_id, q_id = _task(app)
+    client.post(f"/api/tasks/{t_id}/save-progress", json={"student_id": sid, "current_question_index": 1})
+
+    commits = []
+    listener = lambda conn: commits.append(1)
+    event.listen(db.engine, "commit", listener)
+    try:
+        started = "2026-01-01T10:00:00Z"
+        client.post(f"/api/tasks/{t_id}/submit", json={"student_id": sid, "answers": {str(q_id): "A"}, "started_at": started})
+        assert len(commits) == 1
+        client.post(f"/api/tasks/{t_id}/submit", json={"student_id": sid, "answers": {str(q_id): "B"}})
+    finally:
+        event.remove(db.engine, "commit", listener)
+
+    db.session.expire_all()
+    results = StudentTaskResult.query.filter_by(student_id=sid, task_id=t_id).all()
+    assert len(results) == 1
+    assert results[0].total_score == 0
+    assert results[0].started_at.replace(tzinfo=None) == datetime(2026, 1, 1, 10, 0)
+    assert StudentTaskProcess.query.filter_by(student_id=sid).count() == 0
+    assert StudentAchievement.query.filter_by(student_id=sid).count() == 1
+
+
+def test_save_progress_upserts(client, app, test_student):
+    sid = test_student.student_id
+    t_id, _ = _task(app)
+    for index in (1, 2):
+        client.post(f"/api/tasks/{t_id}/save-progress", json={"student_id": sid, "current_question_index": index})
+    rows = StudentTaskProcess.query.filter_by(student_id=sid, task_id=t_id).all()
+    assert len(rows) == 1 and rows[0].current_question_index == 2
+    assert json.loads(client.get(f"/api/tasks/{t_id}/progress?student_id={sid}").data)["current_question_index"] == 2
+
+
+def test_unique_constraints_and_insert_ignore(app, test_student):
+    sid = test_student.student_id
+    t_id, _ = _task(app)
+    achievement = Achievement.query.filter_by(task_id=t_id).first()
+    row = {"student_id": sid, "student_name": "x", "achievement_id": achievement.id,
+           "achievement_name": achievement.name, "unlocked_at": datetime.now(timezone.utc)}
+
+    insert_ignore(StudentAchievement, [row, dict(row)], ["student_id", "achievement_id"])
+    db.session.commit()
+    assert StudentAchievement.query.filter_by(student_id=sid).count() == 1
+
+    for _ in range(2):
+        db.session.add(StudentTaskResult(student_id=sid, student_name="x", task_id=t_id, task_name="t", total_score=0))
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+    db.session.rollback()
+
+
+def test_upgrade_schema_dedupes_and_adds_unique_indexes(app, test_student):
+    sid = test_student.student_id
+    t_id, _ = _task(app)
+    with db.engine.begin() as conn:
+        conn.execute(text("DROP TABLE student_task_processes"))
+        conn.execute(text(
+            "CREATE TABLE student_task_processes (id INTEGER PRIMARY KEY, student_id VARCHAR(20) NOT NULL, "
+            "student_name VARCHAR(80) NOT NULL, task_id INTEGER NOT NULL, task_name VARCHAR(80) NOT NULL, "
+            "current_question_index INTEGER NOT NULL, answers_json TEXT, saved_at DATETIME NOT NULL, "
+            "updated_at DATETIME NOT NULL)"
+        ))
+        for index in (1, 5):
+            conn.execute(text(
+                "INSERT INTO student_task_processes (student_id, student_name, task_id, task_name, "
+                "current_question_index, saved_at, updated_at) VALUES (:s, 'x', :t, 't', :i, '2026-01-01', '2026-01-01')"
+            ), {"s": sid, "t": t_id, "i": index})
+
+    upgrade_schema()
+    upgrade_schema()  # idempotent
+
+    rows = StudentTaskProcess.query.filter_by(student_id=sid).all()
+    assert [r.current_question_index for r in rows] == [5]
+    assert rows[0].version == 0  # column added by the upgrade
+    indexes = {i["name"] for i in inspect(db.engine).get_indexes("student_task_processes") if i["unique"]}
+    assert "uq_student_task_processes_student_task" in indexes